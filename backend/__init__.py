@@ -0,0 +1,39 @@
+import importlib
+
+# The SOLA backend as a package; its modules import each other relatively
+# and run as `python -m backend.<module>` from the repository root. The
+# names below load their module on first use, so `import backend` itself
+# loads nothing heavy:
+#
+#   import backend
+#   tasks, availability = backend.load_plan('plan.json')
+#   schedule = backend.list_schedule(tasks, availability)
+
+_exports = {
+    'load_plan': 'sola',
+    'main': 'sola',
+    'validate_plan': 'validation',
+    'list_schedule': 'list_scheduler',
+    'ListSchedule': 'list_scheduler',
+    'solve_decomposed': 'decompose',
+    'DecomposedSession': 'decompose',
+    'SchedulingSession': 'incremental',
+    'AnytimeSolve': 'anytime',
+    'RollingScheduler': 'rolling',
+    'create_behavior_tree': 'binaryTree',
+    'compile_tree': 'binaryTree',
+    'BehaviorTree': 'binaryTree',
+    'generate_instance': 'workload',
+    'GanttRenderer': 'gantt',
+    'TimeBase': 'timebase',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _exports[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,6 @@
+import sys
+
+from .sola import main
+
+# python -m backend <command> ... from the repository root
+sys.exit(main())
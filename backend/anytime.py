@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+# Default latency budget of an anytime solve, in milliseconds
+SOLVE_BUDGET_MS = int(os.environ.get('SOLA_SOLVE_BUDGET_MS', '500'))
+
+
+class AnytimeSolve:
+    """Runs SchedulingSession.improve (or DecomposedSession.improve) on a
+    background thread.
+
+    best is always the shortest schedule known so far, starting with the
+    heuristic one, so a caller can show something at any moment and poll
+    version to see when it got better. budget (seconds) is a hard deadline:
+    when it passes, or on cancel, wait and result return at once with best.
+
+    z3 is never interrupted: an interrupt reaches every check in the
+    process (other sessions' solves included), so the search ends at its
+    next check's timeout, which improve keeps within the budget. join
+    waits for that.
+    """
+
+    def __init__(self, session, task_list, heuristic=None, report=None, budget=None):
+        self.session = session
+        self.best = heuristic
+        self.version = 0
+        self.started = time.monotonic()
+        self.deadline = None if budget is None else self.started + budget
+        self.improvements = []  # (seconds since start, makespan) of every solver schedule
+        self.error = None
+        self.cancelled = False
+        self.stop_event = threading.Event()
+        self.done = threading.Event()     # the search thread has ended
+        self.settled = threading.Event()  # ended, cancelled or past the deadline
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, args=(list(task_list), heuristic, report, budget),
+                                       name="anytime-solve", daemon=True)
+        self.timer = None
+        if budget is not None:
+            self.timer = threading.Timer(budget, self._stop)
+            self.timer.daemon = True
+        self.thread.start()
+        if self.timer is not None:
+            self.timer.start()
+
+    def _run(self, task_list, heuristic, report, budget):
+        try:
+            for schedule in self.session.improve(task_list, heuristic, report, budget, self.stop_event):
+                with self.lock:
+                    if self.best is None or schedule.horizon <= self._horizon(self.best, schedule):
+                        self.best = schedule
+                        self.version += 1
+                    self.improvements.append((time.monotonic() - self.started, schedule.horizon))
+        except Exception as e:
+            self.error = e
+        finally:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.done.set()
+            self.settled.set()
+
+    @staticmethod
+    def _horizon(schedule, other):
+        # schedule's makespan in other's time units (they may have different origins)
+        return other.timebase.offset_ceil(schedule.timebase.to_epoch(schedule.horizon))
+
+    def _stop(self):
+        self.stop_event.set()
+        self.settled.set()
+
+    def cancel(self):
+        self.cancelled = True
+        self._stop()
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def optimal(self):
+        return self.done.is_set() and self.error is None and self.session.optimal
+
+    @property
+    def infeasible(self):
+        return self.done.is_set() and self.session.solution is False
+
+    def wait(self, timeout=None):
+        """Wait until the solve ends or is cancelled, timeout passes or the
+        deadline is reached, whichever comes first. True if the solve has
+        ended or was cancelled."""
+        if self.deadline is not None:
+            remaining = self.deadline - time.monotonic()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return self.settled.wait(max(timeout, 0) if timeout is not None else None)
+
+    def result(self):
+        """The best schedule once the solve ends or the budget runs out."""
+        self.wait()
+        with self.lock:
+            return self.best
+
+    def join(self):
+        """Stop the search and wait for the thread, so the session can be
+        used again."""
+        self._stop()
+        self.thread.join()
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+
+    from .incremental import SchedulingSession
+    from .list_scheduler import list_schedule
+    from .validation import validate_plan
+
+    # Makespan reached within a few budgets on the demo plan, repeated so
+    # the solver has something to improve on.
+    #
+    #   python -m backend.anytime [copies]
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'JSON.json')) as f:
+        data = json.load(f)['scheduler']
+    tasks = []
+    for k in range(copies):
+        for task in data['tasks']:
+            task = dict(task, taskId=f"{task['taskId']}-{k}", taskName=f"{task['taskName']} {k}",
+                        dependencies=[f"{dep}-{k}" for dep in task['dependencies']])
+            tasks.append(task)
+    # wide-open windows so every copy fits somewhere
+    availability = {equip: [{"availableFrom": "2024-01-01T00:00:00Z", "availableTo": "2100-01-01T00:00:00Z"}]
+                    for equip in data['equipmentAvailability']}
+    report = validate_plan(tasks, availability)
+    heuristic = list_schedule(tasks, availability)
+    print(f"{len(tasks)} tasks, heuristic makespan {heuristic.horizon}, lower bound {report.lower_bound}")
+    for budget_ms in (50, 200, 500, 2000):
+        session = SchedulingSession(availability)
+        job = AnytimeSolve(session, tasks, heuristic, report, budget_ms / 1000)
+        best = job.result()
+        waited = time.monotonic() - job.started
+        job.join()
+        steps = ', '.join(f"{horizon}@{t * 1000:.0f}ms" for t, horizon in job.improvements)
+        print(f"  budget {budget_ms:5d} ms: returned after {waited * 1000:6.1f} ms, makespan {best.horizon}"
+              f"{' (optimal)' if job.optimal else ''} [{steps}]")
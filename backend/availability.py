@@ -0,0 +1,155 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from .timebase import to_epoch
+
+
+def _merge(windows):
+    # sort and coalesce overlapping/touching windows so they are disjoint
+    merged = []
+    for start, end in sorted(windows):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class _MaxTree:
+    """Segment tree over window lengths, to find the first window at or
+    after a position that is at least a given length long."""
+
+    def __init__(self, values):
+        size = 1
+        while size < len(values):
+            size *= 2
+        self.size = size
+        self.tree = [-1] * (2 * size)
+        self.tree[size:size + len(values)] = values
+        for i in range(size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def first_at_least(self, lo, value):
+        if lo >= self.size or self.tree[1] < value:
+            return -1
+        # climb from the leaf until a right sibling can hold the answer
+        i = lo + self.size
+        if self.tree[i] >= value:
+            return lo
+        while True:
+            if i & 1 == 0 and self.tree[i + 1] >= value:
+                i += 1
+                break
+            i //= 2
+            if i <= 1:
+                return -1
+        while i < self.size:
+            i = 2 * i if self.tree[2 * i] >= value else 2 * i + 1
+        return i - self.size
+
+
+class AvailabilityIndex:
+    """Per-equipment index of the equipmentAvailability windows, stored as
+    disjoint, sorted [start, end) epoch-second pairs. Queries are a bisect
+    (plus a segment tree walk for next_free_slot)."""
+
+    def __init__(self, equipment_availability):
+        self.equipment = list(equipment_availability)
+        self.bits = {equip: 1 << i for i, equip in enumerate(self.equipment)}
+        self.starts = {}
+        self.ends = {}
+        self._lengths = {}
+        for equip, windows in equipment_availability.items():
+            merged = _merge((to_epoch(w['availableFrom']), to_epoch(w['availableTo'])) for w in windows)
+            self.starts[equip] = [start for start, _ in merged]
+            self.ends[equip] = [end for _, end in merged]
+            self._lengths[equip] = _MaxTree([end - start for start, end in merged])
+
+        # Sweep all window edges once so "what is free at t" is a single bisect
+        # into the elementary segments, each holding a bitmask of equipment.
+        edges = sorted({t for equip in self.equipment for t in self.starts[equip] + self.ends[equip]})
+        self._edges = edges
+        self._masks = []
+        for t in edges:
+            mask = 0
+            for equip in self.equipment:
+                if self._window(equip, t) >= 0:
+                    mask |= self.bits[equip]
+            self._masks.append(mask)
+
+    def _window(self, equip, t):
+        # index of the window containing t, or -1
+        i = bisect_right(self.starts[equip], t) - 1
+        if i >= 0 and t < self.ends[equip][i]:
+            return i
+        return -1
+
+    def is_free(self, equip, start, end):
+        """Is equip available over the whole of [start, end)?"""
+        if equip not in self.starts:
+            return False
+        i = bisect_right(self.starts[equip], start) - 1
+        return i >= 0 and end <= self.ends[equip][i] and start < self.ends[equip][i]
+
+    def covers(self, equip, starts, ends):
+        """Vectorized is_free over arrays of intervals."""
+        starts = np.asarray(starts)
+        if equip not in self.starts or not self.starts[equip]:
+            return np.zeros(len(starts), dtype=bool)
+        i = np.searchsorted(self.starts[equip], starts, side='right') - 1
+        window_ends = np.asarray(self.ends[equip])[np.maximum(i, 0)]
+        return (i >= 0) & (np.asarray(ends) <= window_ends) & (starts < window_ends)
+
+    def can_fit(self, equip, afters, durations):
+        """Vectorized next_free_slot(...) is not None over arrays."""
+        afters = np.asarray(afters)
+        durations = np.asarray(durations)
+        if equip not in self.starts or not self.starts[equip]:
+            return np.zeros(len(afters), dtype=bool)
+        starts = np.asarray(self.starts[equip])
+        ends = np.asarray(self.ends[equip])
+        # longest window at or after each position
+        longest_from = np.append(np.maximum.accumulate((ends - starts)[::-1])[::-1], -1)
+        i = np.searchsorted(starts, afters, side='right') - 1
+        in_current = (i >= 0) & (afters + durations <= ends[np.maximum(i, 0)])
+        return in_current | (longest_from[i + 1] >= durations)
+
+    def next_free_slot(self, equip, duration, after):
+        """Earliest t >= after such that equip is free over [t, t + duration),
+        or None if no window is long enough."""
+        if equip not in self.starts:
+            return None
+        starts, ends = self.starts[equip], self.ends[equip]
+        i = bisect_right(starts, after) - 1
+        if i >= 0 and after + duration <= ends[i]:
+            return after
+        j = self._lengths[equip].first_at_least(i + 1, duration)
+        if j < 0:
+            return None
+        return starts[j]
+
+    def free_mask_at(self, t):
+        i = bisect_right(self._edges, t) - 1
+        return self._masks[i] if i >= 0 else 0
+
+    def free_at(self, t):
+        """All equipment available at instant t."""
+        mask = self.free_mask_at(t)
+        return [equip for equip in self.equipment if mask & self.bits[equip]]
+
+    def unavailable_intervals(self, equip, origin, quantum):
+        """Gaps between the windows of equip as (lo, hi) offsets from origin in
+        units of quantum seconds, rounded outwards. None stands for an open
+        end before the first or after the last window."""
+        starts, ends = self.starts[equip], self.ends[equip]
+        lo = None
+        gaps = []
+        for start, end in zip(starts, ends):
+            gaps.append((lo, -((origin - start) // quantum)))
+            lo = (end - origin) // quantum
+        gaps.append((lo, None))
+        return gaps
@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Load test of the scheduler.py API: connect (snapshot) time against the
+# number of stored tasks, POST /tasks throughput and latency with N
+# concurrent clients, and fan-out delay of a broadcast to M Socket.IO
+# listeners. Results go to a JSON file that --compare diffs against an older
+# run.
+#
+#   python -m backend.bench_api [--clients 8] [--requests 2000] [--listeners 1,10,50]
+#                       [--snapshot 1000,10000] [--live] [--out FILE] [--compare FILE]
+#
+# By default everything runs in this process through the Flask and
+# Socket.IO test clients, which measures the server code alone. --live
+# serves the app on localhost and uses real HTTP and Socket.IO clients
+# (python-socketio's client needs requests and websocket-client), which
+# adds the network stack and the web server.
+
+FAR_FUTURE = 2051222400  # 2035-01-01, so the dispatcher never fires a benchmark task
+
+
+def make_task(task_id, i):
+    start = FAR_FUTURE + i * 60
+    return {
+        "taskId": task_id,
+        "taskName": f"Load test {i}",
+        "description": "load test",
+        "startTime": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(start)),
+        "endTime": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(start + 600)),
+        "equipment": [f"Bench {i % 8}"],
+        "assignedTo": "bench",
+        "priority": ("High", "Medium", "Low")[i % 3],
+        "dependencies": [],
+    }
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {'n': 0}
+    pick = lambda q: values[min(int(q * len(values)), len(values) - 1)]
+    return {'n': len(values), 'p50_ms': pick(0.5) * 1000, 'p99_ms': pick(0.99) * 1000, 'max_ms': values[-1] * 1000}
+
+
+class InProcess:
+    """Drives the app through app.test_client() / socketio.test_client()."""
+
+    def __init__(self, app, socketio):
+        self.app = app
+        self.socketio = socketio
+
+    def http_client(self):
+        client = self.app.test_client()
+
+        def request(method, path, body=None):
+            response = client.open(path, method=method, json=body)
+            return response.status_code
+
+        return request
+
+    def listener(self):
+        client = self.socketio.test_client(self.app)
+        arrivals = {}
+
+        def poll():
+            # test clients queue events; drain and stamp them
+            now = time.perf_counter()
+            for message in client.get_received():
+                if message['name'] == 'tasks_added':
+                    arrivals.setdefault(message['args'][0]['seq'], now)
+
+        client.poll = poll
+        client.arrivals = arrivals
+        return client
+
+    def connect_time(self):
+        started = time.perf_counter()
+        client = self.socketio.test_client(self.app)
+        pages = [m for m in client.get_received() if m['name'] == 'tasks_snapshot']
+        elapsed = time.perf_counter() - started
+        client.disconnect()
+        return elapsed, len(pages)
+
+    def close(self):
+        pass
+
+
+class Live:
+    """Serves the app on localhost and talks to it over the network."""
+
+    def __init__(self, app, socketio, port=5055):
+        import socketio as socketio_client  # python-socketio's client
+
+        self.client_module = socketio_client
+        self.url = f"http://127.0.0.1:{port}"
+        self.server = threading.Thread(target=socketio.run, args=(app,), daemon=True,
+                                       kwargs={'host': '127.0.0.1', 'port': port, 'allow_unsafe_werkzeug': True,
+                                               'use_reloader': False, 'log_output': False})
+        self.server.start()
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(self.url + '/dispatch/stats')
+                break
+            except OSError:
+                time.sleep(0.05)
+
+    def http_client(self):
+        def request(method, path, body=None):
+            data = None if body is None else json.dumps(body).encode('utf-8')
+            req = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(req) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        return request
+
+    def listener(self):
+        client = self.client_module.Client()
+        arrivals = {}
+
+        @client.on('tasks_added')
+        def on_added(data):
+            arrivals.setdefault(data['seq'], time.perf_counter())
+
+        client.connect(self.url, transports=['websocket'])
+        client.poll = lambda: None
+        client.arrivals = arrivals
+        return client
+
+    def connect_time(self):
+        client = self.client_module.Client()
+        done = threading.Event()
+        pages = []
+
+        @client.on('tasks_snapshot')
+        def on_page(data):
+            pages.append(data['page'])
+            if data['page'] == data['pages'] - 1:
+                done.set()
+
+        started = time.perf_counter()
+        client.connect(self.url, transports=['websocket'])
+        done.wait(60)
+        elapsed = time.perf_counter() - started
+        client.disconnect()
+        return elapsed, len(pages)
+
+    def close(self):
+        pass
+
+
+def bench_posts(driver, clients, total, first_id):
+    # total POST /tasks split over `clients` threads, each with its own client
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+
+    def run(k):
+        request = driver.http_client()
+        for i in range(k, total, clients):
+            started = time.perf_counter()
+            status = request('POST', '/tasks', make_task(f"P{first_id + i:07d}", first_id + i))
+            latencies[k].append(time.perf_counter() - started)
+            errors[k] += status != 200
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(run, range(clients)))
+    wall = time.perf_counter() - started
+    result = percentiles([t for per_client in latencies for t in per_client])
+    result.update(clients=clients, requests=total, errors=sum(errors), seconds=wall, rps=total / wall)
+    return result
+
+
+def bench_fanout(driver, listeners, rounds, first_id):
+    # one-task batches go out as an immediate tasks_added broadcast; the delay
+    # is from sending the request to each listener having the event
+    clients = [driver.listener() for _ in range(listeners)]
+    for client in clients:
+        client.poll()
+        client.arrivals.clear()
+    request = driver.http_client()
+    delays = []
+    for r in range(rounds):
+        sent = time.perf_counter()
+        request('POST', '/tasks:batch', [make_task(f"F{first_id + r:07d}", first_id + r)])
+        deadline = time.perf_counter() + 5
+        while time.perf_counter() < deadline:
+            for client in clients:
+                client.poll()
+            if all(client.arrivals for client in clients):
+                break
+            time.sleep(0.0005)
+        for client in clients:
+            if client.arrivals:
+                delays.append(min(client.arrivals.values()) - sent)
+            client.arrivals.clear()
+    for client in clients:
+        client.disconnect()
+    result = percentiles(delays)
+    result.update(listeners=listeners, rounds=rounds, missed=listeners * rounds - len(delays))
+    return result
+
+
+def bench_connect(driver, stored, target, first_id):
+    # top the store up to `target` tasks with batches, then time connects
+    missing = target - stored
+    request = driver.http_client()
+    for start in range(0, missing, 5000):
+        batch = [make_task(f"S{first_id + i:07d}", first_id + i) for i in range(start, min(start + 5000, missing))]
+        request('POST', '/tasks:batch', batch)
+    times = []
+    for _ in range(5):
+        elapsed, pages = driver.connect_time()
+        times.append(elapsed)
+    result = percentiles(times)
+    result.update(tasks=target, pages=pages)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+# (section, key field, metric) rows compared by --compare; lower is better
+# except for rps
+COMPARED = [
+    ('post_tasks', 'clients', 'rps'),
+    ('post_tasks', 'clients', 'p50_ms'),
+    ('post_tasks', 'clients', 'p99_ms'),
+    ('fanout', 'listeners', 'p50_ms'),
+    ('fanout', 'listeners', 'p99_ms'),
+    ('connect', 'tasks', 'p50_ms'),
+]
+
+
+def compare(old, new):
+    print(f"\nagainst {old['meta'].get('revision')} ({old['meta'].get('timestamp')}):")
+    for section, key, metric in COMPARED:
+        before = {row[key]: row for row in old.get(section, [])}
+        for row in new.get(section, []):
+            if row[key] in before and metric in row and metric in before[row[key]]:
+                a, b = before[row[key]][metric], row[metric]
+                change = (b - a) / a * 100 if a else 0.0
+                better = change > 0 if metric == 'rps' else change < 0
+                print(f"  {section:10s} {key}={row[key]:<6} {metric:7s} {a:10.2f} -> {b:10.2f}  "
+                      f"{change:+6.1f}% {'better' if better else 'worse' if change else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', default='1,8', help="concurrent HTTP clients, comma-separated")
+    parser.add_argument('--requests', type=int, default=2000, help="POST /tasks per client count")
+    parser.add_argument('--listeners', default='1,10,50', help="Socket.IO listeners, comma-separated")
+    parser.add_argument('--rounds', type=int, default=50, help="broadcasts per listener count")
+    parser.add_argument('--snapshot', default='1000,10000', help="stored task counts to time connects at")
+    parser.add_argument('--live', action='store_true', help="serve on localhost and use real clients")
+    parser.add_argument('--out', default=None, help="result file (default bench_api-<revision>.json)")
+    parser.add_argument('--compare', default=None, help="earlier result file to compare with")
+    args = parser.parse_args()
+
+    os.environ.setdefault('SOLA_TASK_STORE', 'memory')
+    from .scheduler import app, changes, socketio
+
+    driver = Live(app, socketio) if args.live else InProcess(app, socketio)
+    results = {
+        'meta': {
+            'mode': 'live' if args.live else 'in-process',
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'post_tasks': [],
+        'fanout': [],
+        'connect': [],
+    }
+    next_id = 0
+    # connects first, while the store holds only what they put there
+    for target in sorted(map(int, args.snapshot.split(','))):
+        stored = len(changes.tasks)
+        if target < stored:
+            continue
+        row = bench_connect(driver, stored, target, next_id)
+        next_id += target - stored
+        results['connect'].append(row)
+        print(f"connect   {target:7d} tasks: p50 {row['p50_ms']:7.2f} ms  max {row['max_ms']:7.2f} ms  "
+              f"({row['pages']} snapshot pages)")
+    for clients in map(int, args.clients.split(',')):
+        row = bench_posts(driver, clients, args.requests, next_id)
+        next_id += args.requests
+        results['post_tasks'].append(row)
+        print(f"POST /tasks  {clients:3d} clients: {row['rps']:8.0f} req/s  p50 {row['p50_ms']:6.2f} ms  "
+              f"p99 {row['p99_ms']:6.2f} ms  errors {row['errors']}")
+    for listeners in map(int, args.listeners.split(',')):
+        row = bench_fanout(driver, listeners, args.rounds, next_id)
+        next_id += args.rounds
+        results['fanout'].append(row)
+        print(f"fan-out    {listeners:4d} listeners: p50 {row['p50_ms']:6.2f} ms  p99 {row['p99_ms']:6.2f} ms  "
+              f"missed {row['missed']}")
+    driver.close()
+
+    out = args.out or f"bench_api-{results['meta']['revision'] or 'local'}.json"
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Scaling of the scheduling engines on generated instances (workload.py):
+# solve time, peak memory and makespan against the critical-path /
+# machine-load lower bound, per instance size. Every run is a separate
+# process so peak RSS is its own and a run past --timeout can be killed.
+# Writes the results as JSON plus a chart of the scaling curves, and prints
+# the largest size each engine handled within --limit seconds.
+#
+#   python -m backend.bench_scheduling [--engines list,smt] [--sizes 10,30,100,...]
+#                              [--seeds 3] [--timeout 30] [--limit 1]
+#                              [--equipment 8] [--depth 6] [--density 0.5] [--fragmentation 0]
+
+ENGINES = ('list', 'smt')
+DEFAULT_SIZES = {
+    'list': (10, 30, 100, 300, 1000, 3000, 10000),
+    'smt': (10, 20, 40, 80, 160, 320),
+}
+
+
+def _run(engine, size, seed, params, timeout, queue):
+    # child process: generate, validate, solve, report
+    from .validation import validate_plan
+    from .workload import generate_instance
+
+    data = generate_instance(size, seed=seed, **params)['scheduler']
+    tasks, availability = data['tasks'], data['equipmentAvailability']
+    report = validate_plan(tasks, availability)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    optimal = None
+    if engine == 'list':
+        from .list_scheduler import list_schedule
+
+        schedule = list_schedule(tasks, availability)
+    else:
+        from .anytime import AnytimeSolve
+        from .incremental import SchedulingSession
+        from .list_scheduler import list_schedule
+
+        heuristic = list_schedule(tasks, availability)
+        job = AnytimeSolve(SchedulingSession(availability), tasks, heuristic, report, budget=timeout)
+        schedule = job.result()
+        optimal = job.optimal
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # the schedule may count from another origin than the bound
+    makespan = report.timebase.offset_ceil(schedule.timebase.to_epoch(schedule.horizon))
+    queue.put({
+        'seconds': elapsed,
+        'peak_rss_mb': peak / 1024,
+        'solve_rss_mb': (peak - baseline) / 1024,
+        'makespan': makespan,
+        'lower_bound': report.lower_bound,
+        'gap': makespan / report.lower_bound - 1 if report.lower_bound else 0.0,
+        'optimal': optimal,
+    })
+
+
+def run(engine, size, seed, params, timeout):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, args=(engine, size, seed, params, timeout, queue))
+    process.start()
+    # the SMT engine stops itself at the timeout; allow for start-up and validation
+    process.join(timeout + 30)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return None
+    return queue.get() if not queue.empty() else None
+
+
+def chart(results, path):
+    fig = Figure(figsize=(14, 4.5))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(1, 3)
+    for engine in sorted({row['engine'] for row in results}):
+        rows = [row for row in results if row['engine'] == engine and row['completed']]
+        sizes = sorted({row['tasks'] for row in rows})
+        for ax, metric in zip(axes, ('seconds', 'solve_rss_mb', 'gap')):
+            means = [sum(row[metric] for row in rows if row['tasks'] == n) / sum(row['tasks'] == n for row in rows)
+                     for n in sizes]
+            ax.plot(sizes, means, marker='o', label=engine)
+    for ax, title in zip(axes, ('Solve time (s)', 'Solve memory (MB RSS)', 'Makespan over lower bound - 1')):
+        ax.set_xscale('log')
+        ax.set_xlabel('tasks')
+        ax.set_title(title)
+        ax.grid(True, which='both', linestyle=':')
+    axes[0].set_yscale('log')
+    axes[0].legend()
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    parser.add_argument('--sizes', default=None, help="task counts, comma-separated (default per engine)")
+    parser.add_argument('--seeds', type=int, default=3, help="instances per size")
+    parser.add_argument('--timeout', type=float, default=30, help="seconds per run")
+    parser.add_argument('--limit', type=float, default=1.0, help="solve time a size must stay under to be safe")
+    parser.add_argument('--equipment', type=int, default=8)
+    parser.add_argument('--per-task', default='1,2', help="min,max equipment per task")
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--fragmentation', type=int, default=0)
+    parser.add_argument('--out', default='bench_scheduling')
+    args = parser.parse_args()
+
+    params = {
+        'num_equipment': args.equipment,
+        'equipment_per_task': tuple(int(x) for x in args.per_task.split(',')),
+        'depth': args.depth,
+        'density': args.density,
+        'fragmentation': args.fragmentation,
+    }
+    results = []
+    safe = {}
+    for engine in args.engines.split(','):
+        sizes = [int(x) for x in args.sizes.split(',')] if args.sizes else DEFAULT_SIZES[engine]
+        safe[engine] = 0
+        for size in sizes:
+            rows = []
+            for seed in range(args.seeds):
+                result = run(engine, size, seed, params, args.timeout)
+                row = {'engine': engine, 'tasks': size, 'seed': seed, 'completed': result is not None}
+                row.update(result or {})
+                rows.append(row)
+            results.extend(rows)
+            done = [row for row in rows if row['completed']]
+            if not done:
+                print(f"{engine:5s} {size:6d} tasks: killed after {args.timeout + 30:.0f}s")
+                break
+            worst = max(row['seconds'] for row in done)
+            proven = sum(bool(row['optimal']) for row in done)
+            print(f"{engine:5s} {size:6d} tasks: {worst:8.3f}s worst, "
+                  f"{max(row['solve_rss_mb'] for row in done):7.1f} MB, "
+                  f"gap {sum(row['gap'] for row in done) / len(done) * 100:5.1f}%"
+                  f"{f', {proven}/{len(done)} optimal' if engine == 'smt' else ''}")
+            if len(done) == len(rows) and worst <= args.limit:
+                safe[engine] = size
+            if worst >= args.timeout:
+                # bigger instances only time out as well
+                break
+
+    with open(args.out + '.json', 'w') as f:
+        json.dump({'params': params, 'timeout': args.timeout, 'limit': args.limit,
+                   'safe': safe, 'results': results}, f, indent=2)
+    chart(results, args.out + '.png')
+    for engine, size in safe.items():
+        print(f"largest size solved within {args.limit}s by {engine}: {size} tasks")
+    print(f"results in {args.out}.json, chart in {args.out}.png")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from .binaryTree import create_behavior_tree
+from .list_scheduler import list_schedule
+from .task_table import TaskTable
+
+# Memory of N tasks as a list of JSON dicts against a TaskTable, and the
+# time list_schedule / create_behavior_tree take from either.
+#
+#   python -m backend.bench_task_table [num_tasks]
+
+
+def make_tasks(num_tasks):
+    # as they arrive over the API: every task is its own freshly parsed JSON
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'JSON.json')) as f:
+        data = json.load(f)['scheduler']
+    template = data['tasks']
+    lines = []
+    for i in range(num_tasks):
+        task = dict(template[i % len(template)])
+        task['taskId'] = f"T{i:06d}"
+        task['dependencies'] = [f"T{i - 1:06d}"] if i % len(template) else []
+        lines.append(json.dumps(task))
+    # wide-open windows so every task fits somewhere
+    availability = {equip: [{"availableFrom": "2024-01-01T00:00:00Z", "availableTo": "2100-01-01T00:00:00Z"}]
+                    for equip in data['equipmentAvailability']}
+    return [json.loads(line) for line in lines], availability
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    (tasks, availability), dict_bytes = measure(lambda: make_tasks(num_tasks))
+    table, table_bytes = measure(lambda: TaskTable.from_tasks(tasks, availability))
+    print(f"{num_tasks} tasks")
+    print(f"  list of dicts: {dict_bytes / 2**20:8.1f} MiB")
+    print(f"  TaskTable:     {table_bytes / 2**20:8.1f} MiB  ({dict_bytes / table_bytes:.1f}x smaller)")
+
+    print(f"  build table:            {timed(TaskTable.from_tasks, tasks, availability):.3f}s")
+    print(f"  list_schedule(dicts):   {timed(list_schedule, tasks, availability):.3f}s")
+    print(f"  list_schedule(table):   {timed(list_schedule, table, availability):.3f}s")
+    print(f"  behavior tree(dicts):   {timed(create_behavior_tree, tasks, availability):.3f}s")
+    print(f"  behavior tree(table):   {timed(create_behavior_tree, table, availability):.3f}s")
@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+import time
+
+from .binaryTree import (ActionNode, ConditionNode, ParallelNode, FAILURE, RUNNING, SUCCESS,
+                        BehaviorTree, compile_tree, create_behavior_tree)
+
+# Ticks per second of the flat CompiledTree against a recursive walk of the
+# Node objects, on a tree built from N copies of the example tasks; then the
+# cost of one task added and one removed, in place on a BehaviorTree against
+# rebuilding and recompiling the tree.
+#
+#   python -m backend.bench_tick [num_tasks] [seconds]
+
+
+def tick_recursive(node):
+    # Stateless reference: every tick starts from the root
+    if isinstance(node, ActionNode) or (isinstance(node, ConditionNode) and not node.children):
+        func = node.action if isinstance(node, ActionNode) else node.condition
+        result = func()
+        if result is RUNNING:
+            return RUNNING
+        return FAILURE if result is False else SUCCESS
+    if isinstance(node, ConditionNode) and not node.condition():
+        return FAILURE
+    if isinstance(node, ParallelNode):
+        results = [tick_recursive(child) for child in node.children]
+        if RUNNING in results:
+            return RUNNING
+        return SUCCESS if SUCCESS in results or not results else FAILURE
+    for child in node.children:
+        result = tick_recursive(child)
+        if result != SUCCESS:
+            return result
+    return SUCCESS
+
+
+def make_tasks(num_tasks):
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'JSON.json')) as f:
+        data = json.load(f)['scheduler']
+    template = data['tasks']
+    tasks = []
+    for i in range(num_tasks):
+        task = dict(template[i % len(template)])
+        task['taskId'] = f"T{i:05d}"
+        task['dependencies'] = [f"T{i - 1:05d}"] if i else []
+        tasks.append(task)
+    return tasks, data['equipmentAvailability']
+
+
+def build(num_tasks, running_at):
+    # Actions are no-ops so only tree-walking overhead is measured; the
+    # action of task running_at stays RUNNING forever, like a long robot move.
+    tasks, availability = make_tasks(num_tasks)
+    root = create_behavior_tree(tasks, availability)
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        stack.extend(node.children)
+        if isinstance(node, ActionNode):
+            node.action = lambda: None
+        elif isinstance(node, ConditionNode) and node.children:
+            node.condition = lambda: False
+        elif isinstance(node, ConditionNode):
+            node.condition = lambda: True
+    if running_at is not None:
+        task_node = root.children[0].children[running_at]
+        task_node.children[-1].action = lambda: RUNNING
+    return root
+
+
+def update_costs(num_tasks, rounds=200):
+    # seconds per add + delete pair, incremental and rebuilt
+    tasks, availability = make_tasks(num_tasks + 1)
+    extra = tasks.pop()
+    tree = BehaviorTree(tasks, availability)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        tree.insert(extra)
+        tree.remove(extra['taskId'])
+    incremental = (time.perf_counter() - start) / rounds
+
+    rebuilds = max(rounds // max(num_tasks // 100, 1), 2)
+    start = time.perf_counter()
+    for _ in range(rebuilds):
+        compile_tree(create_behavior_tree(tasks + [extra], availability))
+        compile_tree(create_behavior_tree(tasks, availability))
+    rebuilt = (time.perf_counter() - start) / rebuilds
+    return incremental, rebuilt
+
+
+def rate(tick, seconds):
+    ticks = 0
+    start = time.perf_counter()
+    while True:
+        tick()
+        ticks += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return ticks / elapsed
+
+
+if __name__ == '__main__':
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    print(f"{num_tasks} tasks")
+    for label, running_at in (("full pass", None), ("last task running", num_tasks - 1)):
+        root = build(num_tasks, running_at)
+        compiled = compile_tree(root)
+        recursive_rate = rate(lambda: tick_recursive(root), seconds)
+        compiled_rate = rate(compiled.tick, seconds)
+        print(f"{label:>18}: recursive {recursive_rate:10.1f} ticks/s   "
+              f"compiled {compiled_rate:10.1f} ticks/s   ({compiled_rate / recursive_rate:.1f}x)")
+    incremental, rebuilt = update_costs(num_tasks)
+    print(f"{'add + delete':>18}: rebuild {rebuilt * 1e3:10.3f} ms        "
+          f"in place {incremental * 1e3:10.3f} ms        ({rebuilt / incremental:.0f}x)")
@@ -1,6 +1,14 @@
 import json
 from collections import deque
 
+import numpy as np
+
+from . import metrics
+from .availability import AvailabilityIndex
+from .executor import DependencyExecutor
+from .task_table import TaskTable
+from .timebase import to_epoch
+
 class Node:
     def __init__(self, name):
         self.name = name
@@ -30,47 +38,607 @@ class ActionNode(Node):
         super().__init__(name)
         self.action = action
 
-def check_equipment_availability(equipment, availability):
-    # Placeholder function to simulate equipment availability check
-    return all(equip in availability for equip in equipment)
+def check_equipment_availability(equipment, availability, start, end):
+    # availability is an AvailabilityIndex; start/end are epoch seconds
+    return all(availability.is_free(equip, start, end) for equip in equipment)
+
+### Predicates
+# Everything a condition or action needs is bound when the tree is built,
+# so each evaluation is a couple of integer operations on TreeState.
+class TreeState:
+    """State shared by all predicates of one tree: free_mask has one bit per
+    piece of equipment that is currently free, done one bit per completed
+    task."""
+
+    def __init__(self, task_ids, availability_index):
+        self.equipment_bits = availability_index.bits
+        self.task_bits = {task_id: 1 << i for i, task_id in enumerate(task_ids)}
+        self.next_bit = len(self.task_bits)
+        self.free_bits = []  # bits of removed tasks, handed out again first
+        self.free_mask = sum(self.equipment_bits.values())
+        self.done = 0
+        self.urgent = deque()  # urgent task dicts waiting to run, oldest first
+
+    def add_task(self, task_id):
+        if self.free_bits:
+            bit = self.free_bits.pop()
+        else:
+            bit = 1 << self.next_bit
+            self.next_bit += 1
+        self.task_bits[task_id] = bit
+        return bit
+
+    def remove_task(self, task_id):
+        # predicates still holding the bit must have been rebound first
+        bit = self.task_bits.pop(task_id)
+        self.done &= ~bit
+        self.free_bits.append(bit)
+
+    def add_urgent(self, task):
+        self.urgent.append(task)
+
+    def set_free(self, equip, free):
+        if free:
+            self.free_mask |= self.equipment_bits[equip]
+        else:
+            self.free_mask &= ~self.equipment_bits[equip]
+
+    def mark_done(self, task_id):
+        self.done |= self.task_bits[task_id]
+
+class EquipmentFree:
+    __slots__ = ("state", "bit")
+
+    def __init__(self, state, bit):
+        self.state = state
+        self.bit = bit
+
+    def __call__(self):
+        return self.state.free_mask & self.bit != 0
+
+class TaskComplete:
+    __slots__ = ("state", "bit")
+
+    def __init__(self, state, bit):
+        self.state = state
+        self.bit = bit
+
+    def __call__(self):
+        return self.state.done & self.bit != 0
+
+class AssignTask:
+    __slots__ = ("task_id", "assigned_to")
+
+    def __init__(self, task_id, assigned_to):
+        self.task_id = task_id
+        self.assigned_to = assigned_to
+
+    def __call__(self):
+        print(f"Assign Task {self.task_id} to {self.assigned_to}")
+
+class PerformTask:
+    __slots__ = ("state", "task_id", "bit", "description")
+
+    def __init__(self, state, task_id, description):
+        self.state = state
+        self.task_id = task_id
+        self.bit = state.task_bits[task_id]
+        self.description = description
+
+    def __call__(self):
+        # already run elsewhere, e.g. by BehaviorTree.execute
+        if self.state.done & self.bit:
+            return
+        print(f"Perform Task {self.task_id}: {self.description}")
+        self.state.done |= self.bit
+
+class UrgentPending:
+    __slots__ = ("state",)
+
+    def __init__(self, state):
+        self.state = state
+
+    def __call__(self):
+        return bool(self.state.urgent)
+
+class UrgentEquipmentFree:
+    __slots__ = ("state",)
+
+    def __init__(self, state):
+        self.state = state
+
+    def __call__(self):
+        # equipment the tree doesn't know about is never free
+        bits = self.state.equipment_bits
+        task = self.state.urgent[0]
+        if any(equip not in bits for equip in task['equipment']):
+            return False
+        mask = sum(bits[equip] for equip in set(task['equipment']))
+        return self.state.free_mask & mask == mask
+
+class AssignUrgentTask:
+    __slots__ = ("state",)
+
+    def __init__(self, state):
+        self.state = state
+
+    def __call__(self):
+        task = self.state.urgent[0]
+        print(f"Assign urgent Task {task['taskId']} to {task['assignedTo']}")
+
+class PerformUrgentTask:
+    __slots__ = ("state",)
+
+    def __init__(self, state):
+        self.state = state
+
+    def __call__(self):
+        task = self.state.urgent.popleft()
+        print(f"Perform urgent Task {task['taskId']}: {task['description']}")
+
+def _never():
+    return False
+
+def _window_fits(table, availability_index):
+    # One bool per entry of table.equip_idx: does that task's interval fit
+    # inside an availability window of that piece of equipment?
+    fits = np.zeros(len(table.equip_idx), dtype=bool)
+    rows = table.equipment_rows()
+    for e, equip in enumerate(table.equipment_names):
+        entries = np.flatnonzero(table.equip_idx == e)
+        if len(entries):
+            tasks = rows[entries]
+            fits[entries] = availability_index.covers(equip, table.start[tasks], table.end[tasks])
+    return fits
+
+def _task_node(state, task_id, name, equipment, dependencies, assigned_to, description):
+    # equipment is [(equip, fits its windows)], dependencies [(taskId, in the tree)]
+    task_node = SequenceNode(f"Task - {name} ({task_id})")
+    task_node.task_id = task_id
+
+    for equip, fits in equipment:
+        condition = EquipmentFree(state, state.equipment_bits[equip]) if fits else _never
+        task_node.add_child(ConditionNode(f"Check Equipment Availability: {equip}", condition))
+
+    # dependencies have to be complete before the task is performed
+    for dep, known in dependencies:
+        condition = TaskComplete(state, state.task_bits[dep]) if known else _never
+        dependency_node = ConditionNode(f"Check if Task {dep} is complete", condition)
+        dependency_node.dependency = dep
+        task_node.add_child(dependency_node)
+
+    task_node.add_child(ActionNode(f"Assign Task to {assigned_to}", AssignTask(task_id, assigned_to)))
+    task_node.add_child(ActionNode(f"{description}", PerformTask(state, task_id, description)))
+    return task_node
 
+@metrics.timed('tree.build')
 def create_behavior_tree(task_list, equipment_availability):
+    # task_list is the JSON task list or a TaskTable
+    if isinstance(task_list, TaskTable):
+        table = task_list
+    else:
+        table = TaskTable.from_tasks(task_list, equipment_availability, strict=False)
+
     root = ParallelNode("Scheduler")
     task_sequence = SequenceNode("Execute all tasks in order")
     root.add_child(task_sequence)
 
-    task_map = {task["taskId"]: task for task in task_list}
-
-    for task in task_list:
-        task_node = SequenceNode(f"Task - {task['taskName']} ({task['taskId']})")
-        
-        for equip in task["equipment"]:
-            task_node.add_child(ConditionNode(f"Check Equipment Availability: {equip}", lambda: check_equipment_availability([equip], equipment_availability)))
-        
-        task_node.add_child(ActionNode(f"Assign Task to {task['assignedTo']}", lambda: print(f"Assign Task {task['taskId']} to {task['assignedTo']}")))
-        task_node.add_child(ActionNode(f"{task['description']}", lambda: print(f"Perform Task {task['taskId']}: {task['description']}")))
+    availability_index = AvailabilityIndex(equipment_availability)
+    state = TreeState(table.ids, availability_index)
+    root.state = state
+    root.availability = availability_index
 
-        if task["dependencies"]:
-            for dep in task["dependencies"]:
-                task_node.add_child(ConditionNode(f"Check if Task {dep} is complete", lambda: True))  # Simplified condition
+    # A task whose interval doesn't fit the equipment's availability
+    # windows can never run, whatever the runtime state says.
+    fits = _window_fits(table, availability_index)
 
-        task_sequence.add_child(task_node)
+    for i, task_id in enumerate(table.ids):
+        equipment = [(table.equipment_names[table.equip_idx[k]], fits[k])
+                     for k in range(table.equip_ptr[i], table.equip_ptr[i + 1])]
+        dependencies = [(table.ids[j], True) for j in table.dependencies(i)]
+        dependencies += [(dep, False) for dep in table.dangling.get(i, ())]
+        task_sequence.add_child(_task_node(state, task_id, table.text(table.name, i), equipment, dependencies,
+                                           table.text(table.assignee, i), table.text(table.description, i)))
 
-    interrupt_handler = ConditionNode("Check for new urgent tasks", lambda: False)  # Placeholder for checking new tasks
+    # Urgent tasks are queued on the state with state.add_urgent(task) and
+    # run one per pass, as soon as their equipment is free
+    interrupt_handler = ConditionNode("Check for new urgent tasks", UrgentPending(state))
     urgent_task_sequence = SequenceNode("Handle new urgent task")
     interrupt_handler.add_child(urgent_task_sequence)
 
-    urgent_task_sequence.add_child(ConditionNode("Check Equipment Availability: Required equipment for urgent task", lambda: True))  # Simplified condition
-    urgent_task_sequence.add_child(ActionNode("Assign urgent task to appropriate personnel", lambda: print("Assign urgent task")))
-    urgent_task_sequence.add_child(ActionNode("Perform urgent task", lambda: print("Perform urgent task")))
+    urgent_task_sequence.add_child(ConditionNode("Check Equipment Availability: Required equipment for urgent task", UrgentEquipmentFree(state)))
+    urgent_task_sequence.add_child(ActionNode("Assign urgent task to appropriate personnel", AssignUrgentTask(state)))
+    urgent_task_sequence.add_child(ActionNode("Perform urgent task", PerformUrgentTask(state)))
 
     root.add_child(interrupt_handler)
     return root
 
+def walk(node):
+    """(depth, node) for every node of a Node tree in pre-order, without
+    recursion, so any depth works."""
+    stack = [(0, node)]
+    while stack:
+        depth, node = stack.pop()
+        yield depth, node
+        stack.extend((depth + 1, child) for child in reversed(node.children))
+
 def print_tree(node, indent=0):
-    print(' ' * indent + node.name)
-    for child in node.children:
-        print_tree(child, indent + 4)
+    # node is a Node or a CompiledTree; lines are printed as they are reached
+    nodes = node.walk() if isinstance(node, CompiledTree) else walk(node)
+    for depth, item in nodes:
+        name = node.names[item] if isinstance(node, CompiledTree) else item.name
+        print(' ' * (indent + 4 * depth) + name)
+
+### Flat tick engine
+# Tick results
+IDLE = 0
+SUCCESS = 1
+FAILURE = 2
+RUNNING = 3
+
+# Node type codes; codes >= CONDITION are leaves
+SEQUENCE = 0
+PARALLEL = 1
+GUARD = 2  # a ConditionNode with children
+CONDITION = 3
+ACTION = 4
+
+KIND_NAMES = ("sequence", "parallel", "guard", "condition", "action")
+STATUS_NAMES = ("idle", "success", "failure", "running")
+
+def _node_kind(node):
+    if isinstance(node, ParallelNode):
+        return PARALLEL
+    if isinstance(node, ConditionNode):
+        return GUARD if node.children else CONDITION
+    if isinstance(node, ActionNode):
+        return ACTION
+    return SEQUENCE
+
+class CompiledTree:
+    """A behavior tree flattened into parallel lists indexed by node id
+    (the root is 0, the rest numbered in pre-order as compiled).
+
+    Node i has type code kind[i] and child ids children[i]; status, cursor
+    (position in children[i] of the next child to tick) and active are
+    state vectors indexed the same way. These are plain lists
+    rather than array.array, which boxes an int on every read and ticks
+    slower.
+    A ConditionNode with children acts as a guard: when its condition holds
+    its children run as a sequence. Actions and conditions may return
+    RUNNING, False for FAILURE, or anything else for SUCCESS. A ParallelNode
+    ticks all its unfinished children and succeeds once they have all
+    finished with at least one success.
+
+    Sequences remember the child that was RUNNING and parallels remember
+    which children already finished, so the next tick resumes only the
+    running branches instead of re-walking the whole tree.
+    """
+
+    def __init__(self, root):
+        # structure; ids of removed nodes wait in free to be reused
+        self.names = []
+        self.funcs = []
+        self.kind = []
+        self.parent = []
+        self.children = []
+        self.free = []
+
+        # per-node state, carried across ticks
+        self.status = []
+        self.cursor = []
+        self.active = []  # guard passed / parallel in progress
+
+        self._compile(root, -1)
+
+    def _compile(self, root, parent):
+        # Number the nodes of a Node subtree and link each to its parent,
+        # except root, which the caller places. Returns [(id, node)].
+        compiled = []
+        stack = [(root, parent)]
+        while stack:
+            node, node_parent = stack.pop()
+            func = getattr(node, 'condition', None) or getattr(node, 'action', None)
+            if self.free:
+                i = self.free.pop()
+                self.names[i] = node.name
+                self.funcs[i] = func
+                self.kind[i] = _node_kind(node)
+                self.parent[i] = node_parent
+                self.children[i] = []
+                self.status[i] = IDLE
+                self.cursor[i] = 0
+                self.active[i] = 0
+            else:
+                i = len(self.names)
+                self.names.append(node.name)
+                self.funcs.append(func)
+                self.kind.append(_node_kind(node))
+                self.parent.append(node_parent)
+                self.children.append([])
+                self.status.append(IDLE)
+                self.cursor.append(0)
+                self.active.append(0)
+            if node is not root:
+                self.children[node_parent].append(i)
+            compiled.append((i, node))
+            # push in reverse so children are numbered and linked in order
+            for child in reversed(node.children):
+                stack.append((child, i))
+        return compiled
+
+    def walk(self, i=0):
+        """(depth, id) for node i and everything below it in pre-order,
+        without recursion, so any depth works."""
+        children = self.children
+        stack = [(0, i)]
+        while stack:
+            depth, i = stack.pop()
+            yield depth, i
+            stack.extend((depth + 1, c) for c in reversed(children[i]))
+
+    def export(self):
+        """One JSON-ready dict per node, streamed in pre-order."""
+        for depth, i in self.walk():
+            yield {"id": i, "parent": self.parent[i], "depth": depth, "kind": KIND_NAMES[self.kind[i]],
+                   "name": self.names[i], "status": STATUS_NAMES[self.status[i]]}
+
+    def tick(self):
+        kind, funcs, children = self.kind, self.funcs, self.children
+        status, cursor, active = self.status, self.cursor, self.active
+
+        if kind[0] >= CONDITION:
+            result = funcs[0]()
+            status[0] = RUNNING if result is RUNNING else FAILURE if result is False else SUCCESS
+            return status[0]
+
+        stack = [0]
+        result = None  # status of the child that just returned, None on entry
+        while stack:
+            i = stack[-1]
+            k = kind[i]
+            nodes = children[i]
+            end = len(nodes)
+
+            if result is None:
+                if k == GUARD and not active[i]:
+                    passed = funcs[i]()
+                    if passed is False:
+                        result = FAILURE
+                    elif passed is RUNNING:
+                        result = RUNNING
+                    else:
+                        active[i] = 1
+                elif k == PARALLEL:
+                    if not active[i]:
+                        for c in nodes:
+                            status[c] = IDLE
+                        active[i] = 1
+                    cursor[i] = 0
+            elif k == PARALLEL or result == SUCCESS:
+                cursor[i] += 1
+                result = None
+
+            if result is None:
+                c = cursor[i]
+                pushed = False
+                if k == PARALLEL:
+                    while c < end:
+                        child = nodes[c]
+                        if status[child] == SUCCESS or status[child] == FAILURE:
+                            c += 1
+                            continue
+                        if kind[child] < CONDITION:
+                            pushed = True
+                            break
+                        r = funcs[child]()
+                        status[child] = RUNNING if r is RUNNING else FAILURE if r is False else SUCCESS
+                        c += 1
+                else:
+                    while c < end:
+                        child = nodes[c]
+                        if kind[child] < CONDITION:
+                            pushed = True
+                            break
+                        r = funcs[child]()
+                        if r is RUNNING or r is False:
+                            result = status[child] = RUNNING if r is RUNNING else FAILURE
+                            break
+                        status[child] = SUCCESS
+                        c += 1
+                cursor[i] = c
+                if pushed:
+                    stack.append(child)
+                    continue
+                if result is None:
+                    if k == PARALLEL:
+                        results = [status[c] for c in nodes]
+                        if RUNNING in results:
+                            result = RUNNING
+                        elif SUCCESS in results or not results:
+                            result = SUCCESS
+                        else:
+                            result = FAILURE
+                    else:
+                        result = SUCCESS
+
+            # node i is done for this tick
+            stack.pop()
+            status[i] = result
+            if result != RUNNING:
+                cursor[i] = 0
+                active[i] = 0
+        return result
+
+class BehaviorTree(CompiledTree):
+    """A CompiledTree that follows a changing task set instead of being
+    rebuilt. insert, remove and reprioritize find the task's subtree through
+    task_nodes and touch only that subtree and its parent's child list and
+    cursor, so every other node keeps its state, running ones included:
+    a running sequence stays on the child it was running.
+
+    Task subtrees run in the order of the task sequence's children, so the
+    tree is the one create_behavior_tree would build from the tasks in
+    task_ids() order. A dependency on a task that is not in the tree fails
+    until that task is inserted, and again once it is removed.
+    """
+
+    def __init__(self, task_list, equipment_availability):
+        root = create_behavior_tree(task_list, equipment_availability)
+        self.state = root.state
+        self.availability = root.availability
+        self.task_nodes = {}  # taskId -> id of its subtree's root
+        self.waiting = {}     # taskId -> ids of the conditions on it
+        self.waits_on = {}    # condition id -> taskId
+        super().__init__(root)
+        self.task_sequence = self.children[0][0]
+
+    def _compile(self, root, parent):
+        compiled = super()._compile(root, parent)
+        for i, node in compiled:
+            if hasattr(node, 'task_id'):
+                self.task_nodes[node.task_id] = i
+            if hasattr(node, 'dependency'):
+                self.waiting.setdefault(node.dependency, set()).add(i)
+                self.waits_on[i] = node.dependency
+        return compiled
+
+    def task_ids(self):
+        task_of = {i: task_id for task_id, i in self.task_nodes.items()}
+        return [task_of[i] for i in self.children[self.task_sequence]]
+
+    def _position(self, task_id):
+        # a list scan, but in C; the rest of an update is O(depth)
+        return self.children[self.task_sequence].index(self.task_nodes[task_id])
+
+    def _link(self, i, position=None):
+        parent = self.parent[i]
+        siblings = self.children[parent]
+        if position is None:
+            position = len(siblings)
+        siblings.insert(position, i)
+        # parallels restart their cursor every tick; a running sequence must
+        # stay on the child it was running (if that one was removed, the
+        # cursor may sit past the end, on the position just appended to)
+        cursor = self.cursor[parent]
+        running_next = cursor + 1 < len(siblings) and self.status[siblings[cursor + 1]] == RUNNING
+        if self.kind[parent] != PARALLEL and self.status[parent] == RUNNING and (
+                position < cursor or position == cursor and running_next):
+            self.cursor[parent] += 1
+        return position
+
+    def _unlink(self, i):
+        parent = self.parent[i]
+        siblings = self.children[parent]
+        position = siblings.index(i)
+        del siblings[position]
+        # removing the running child leaves the cursor on the next one
+        if self.kind[parent] != PARALLEL and self.status[parent] == RUNNING and position < self.cursor[parent]:
+            self.cursor[parent] -= 1
+
+    @metrics.timed('tree.insert')
+    def insert(self, task, before=None):
+        """Add a task's subtree at the end of the sequence or just before
+        task `before`. A task already in the tree is replaced, in its old
+        place unless before is given."""
+        task_id = task['taskId']
+        position = None
+        if task_id in self.task_nodes:
+            position = self._position(task_id)
+            self.remove(task_id)
+        if before is not None:
+            position = self._position(before)
+
+        state = self.state
+        state.add_task(task_id)
+        start, end = to_epoch(task['startTime']), to_epoch(task['endTime'])
+        equipment = [(equip, self.availability.is_free(equip, start, end)) for equip in task['equipment']]
+        dependencies = [(dep, dep in self.task_nodes) for dep in task['dependencies']]
+        node = _task_node(state, task_id, task['taskName'], equipment, dependencies,
+                          task['assignedTo'], task['description'])
+        self._compile(node, self.task_sequence)
+        # tasks already waiting on this one can now pass that check
+        complete = TaskComplete(state, state.task_bits[task_id])
+        for i in self.waiting.get(task_id, ()):
+            self.funcs[i] = complete
+        self._link(self.task_nodes[task_id], position)
+
+    @metrics.timed('tree.remove')
+    def remove(self, task_id):
+        """Drop a task's subtree; False if it is not in the tree."""
+        if task_id not in self.task_nodes:
+            return False
+        root = self.task_nodes.pop(task_id)
+        self._unlink(root)
+        for _, i in list(self.walk(root)):
+            dep = self.waits_on.pop(i, None)
+            if dep is not None:
+                self.waiting[dep].discard(i)
+                if not self.waiting[dep]:
+                    del self.waiting[dep]
+            self.names[i] = self.funcs[i] = None
+            self.children[i] = []
+            self.free.append(i)
+        # before the bit is handed to another task
+        for i in self.waiting.get(task_id, ()):
+            self.funcs[i] = _never
+        self.state.remove_task(task_id)
+        return True
+
+    @metrics.timed('tree.reprioritize')
+    def reprioritize(self, task_id, before=None):
+        """Move a task's subtree, state and all, just before task `before`
+        or to the end of the sequence."""
+        i = self.task_nodes[task_id]
+        parent = self.parent[i]
+        siblings = self.children[parent]
+        cursor = self.cursor[parent]
+        # the child a running sequence is on keeps the cursor wherever it goes;
+        # any other move shifts the cursor only if it crosses it
+        running = (self.kind[parent] != PARALLEL and self.status[parent] == RUNNING
+                   and cursor < len(siblings) and siblings[cursor] == i)
+        self._unlink(i)
+        position = self._link(i, None if before is None else self._position(before))
+        if running:
+            self.cursor[parent] = position
+
+    def execute(self, task_list, run_task, max_workers=None):
+        """Run the tree's tasks for real on a DependencyExecutor: each task
+        as soon as its dependencies are done and its equipment is free, so
+        tasks on disjoint equipment run at the same time instead of one after
+        another down the sequence. run_task(task) does the work. The tree's
+        equipment and done bits follow the run, and a later tick skips the
+        tasks it completed. Returns the executor's ExecutionMetrics.
+
+        A dependency the tree has already seen done is met. A task whose
+        dependency is neither done nor run here (not in the tree, or not in
+        task_list) can't run, and neither can anything after it: those
+        tasks are reported as skipped."""
+        state = self.state
+        tasks = {task['taskId']: task for task in task_list if task['taskId'] in self.task_nodes}
+        done = {task_id for task_id, bit in state.task_bits.items() if state.done & bit}
+        dependents = {}
+        for task_id, task in tasks.items():
+            for dep in task['dependencies']:
+                dependents.setdefault(dep, []).append(task_id)
+        blocked = [task_id for task_id, task in tasks.items()
+                   if any(dep not in tasks and dep not in done for dep in task['dependencies'])]
+        seen = set(blocked)
+        for task_id in blocked:
+            for succ in dependents.get(task_id, ()):
+                if succ not in seen:
+                    seen.add(succ)
+                    blocked.append(succ)
+        runnable = [dict(task, dependencies=[dep for dep in task['dependencies'] if dep in tasks])
+                    for task_id, task in tasks.items() if task_id not in seen]
+        result = DependencyExecutor(runnable, run_task, max_workers, state=state).run()
+        result.skipped.extend(blocked)
+        return result
+
+
+@metrics.timed('tree.compile')
+def compile_tree(root):
+    return CompiledTree(root)
 
 # Example JSON input
 json_input = '''
@@ -164,9 +732,10 @@ json_input = '''
 }
 '''
 
-data = json.loads(json_input)
-task_list = data['scheduler']['tasks']
-equipment_availability = data['scheduler']['equipmentAvailability']
+if __name__ == '__main__':
+    data = json.loads(json_input)
+    task_list = data['scheduler']['tasks']
+    equipment_availability = data['scheduler']['equipmentAvailability']
 
-bt_root = create_behavior_tree(task_list, equipment_availability)
-print_tree(bt_root)
+    bt_root = create_behavior_tree(task_list, equipment_availability)
+    print_tree(bt_root)
@@ -0,0 +1,97 @@
+import json
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+
+
+class Encoded:
+    """An event argument encoded to JSON text ahead of time, to be emitted
+    through a SocketIO server using PacketJSON."""
+
+    __slots__ = ('text',)
+
+    def __init__(self, value):
+        self.text = json.dumps(value, separators=(',', ':'))
+
+
+class PacketJSON:
+    """The json module of the Socket.IO server (SocketIO(json=PacketJSON)):
+    the standard one, except that Encoded arguments go into a packet as
+    they are instead of being encoded again for every client."""
+
+    loads = staticmethod(json.loads)
+
+    @staticmethod
+    def dumps(data, **kwargs):
+        if isinstance(data, list) and any(isinstance(item, Encoded) for item in data):
+            return '[' + ','.join(item.text if isinstance(item, Encoded) else json.dumps(item, **kwargs)
+                                  for item in data) + ']'
+        return json.dumps(data, **kwargs)
+
+
+class ChangeLog:
+    """Sequence-numbered log of task mutations plus the current tasks in
+    their serialized (JSON-ready) form.
+
+    Every add or delete gets the next sequence number. A client that
+    remembers the last number it saw asks for since(seq) and gets only what
+    changed after it. The log keeps the last `size` changes; older clients,
+    and clients from before a server restart (different epoch), need a
+    snapshot. Snapshot pages are built and encoded once per sequence
+    number and shared by every client that connects at that version.
+    """
+
+    def __init__(self, tasks=None, size=10000, page_size=500):
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.changes = deque(maxlen=size)  # (seq, task_id, task or None for a deletion)
+        self.tasks = dict(tasks or {})
+        self.page_size = page_size
+        self._pages = []
+        self._pages_seq = None
+        self.lock = threading.Lock()
+
+    def record(self, items):
+        """Apply [(task_id, serialized task or None)], returns the last seq."""
+        with self.lock:
+            for task_id, task in items:
+                self.seq += 1
+                self.changes.append((self.seq, task_id, task))
+                if task is None:
+                    self.tasks.pop(task_id, None)
+                else:
+                    self.tasks[task_id] = task
+            return self.seq
+
+    def since(self, seq, epoch=None):
+        """{'seq', 'tasks', 'deleted'} with the net changes after seq, or
+        None when they are no longer in the log and a snapshot is needed."""
+        with self.lock:
+            if epoch != self.epoch or seq > self.seq:
+                return None
+            first = self.changes[0][0] if self.changes else self.seq + 1
+            if seq < first - 1:
+                return None
+            tasks = {}
+            deleted = set()
+            # later changes to the same task overwrite earlier ones
+            for _, task_id, task in islice(self.changes, seq - first + 1, None):
+                if task is None:
+                    tasks.pop(task_id, None)
+                    deleted.add(task_id)
+                else:
+                    tasks[task_id] = task
+                    deleted.discard(task_id)
+            return {'seq': self.seq, 'epoch': self.epoch, 'tasks': tasks, 'deleted': sorted(deleted)}
+
+    def snapshot(self):
+        """(seq, [Encoded page]) for the current version, cached until the next change."""
+        with self.lock:
+            if self._pages_seq != self.seq:
+                items = list(self.tasks.items())
+                chunks = [items[i:i + self.page_size] for i in range(0, len(items), self.page_size)] or [[]]
+                self._pages = [Encoded({'seq': self.seq, 'epoch': self.epoch, 'page': i, 'pages': len(chunks),
+                                        'tasks': dict(chunk)}) for i, chunk in enumerate(chunks)]
+                self._pages_seq = self.seq
+            return self.seq, self._pages
@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from .list_scheduler import ListSchedule, list_schedule
+from .task_table import TaskTable
+from .timebase import QUANTUM, TimeBase
+
+
+def components(task_list, equipment_availability=()):
+    """Split a task list (dicts or TaskTable) into groups of row numbers
+    that share no equipment and no dependency, directly or through other
+    tasks: the connected components of the task-equipment graph plus the
+    dependency edges. Components are ordered by their first row."""
+    if isinstance(task_list, TaskTable):
+        table = task_list
+    else:
+        table = TaskTable.from_tasks(task_list, equipment_availability, strict=False)
+    n = len(table)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        i, j = find(i), find(j)
+        if i != j:
+            parent[max(i, j)] = min(i, j)
+
+    dep_ptr, dep_idx = table.dep_ptr.tolist(), table.dep_idx.tolist()
+    for i in range(n):
+        for j in dep_idx[dep_ptr[i]:dep_ptr[i + 1]]:
+            union(i, j)
+    first_user = {}
+    for i, e in zip(table.equipment_rows().tolist(), table.equip_idx.tolist()):
+        if e in first_user:
+            union(first_user[e], i)
+        else:
+            first_user[e] = i
+
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def solve_component(task_list, equipment_availability, origin, quantum=QUANTUM, deadline=None):
+    """Schedule of one component with the SMT solver, as ({taskId: (start,
+    end)} offsets from origin, optimal) so it can cross a process boundary.
+    None if the component is infeasible. deadline (a time.time() value)
+    stops the search with the best schedule found by then, the heuristic
+    one if nothing better. Proven optima go through the solution cache, so
+    a protocol seen before costs no solve."""
+    from .incremental import SchedulingSession
+    from .solution_cache import default_cache
+    from .validation import validate_plan
+
+    timebase = TimeBase(origin, quantum)
+    cache = default_cache()
+    cached = cache.get(task_list, equipment_availability, quantum)
+    if cached is not None:
+        shift = timebase.offset(cached.timebase.to_epoch(0))
+        return {task_id: (cached.starts[task_id] + shift, cached.ends[task_id] + shift)
+                for task_id in cached.starts}, True
+
+    report = validate_plan(task_list, equipment_availability, timebase)
+    if not report.ok:
+        return None
+    heuristic = list_schedule(task_list, equipment_availability, timebase)
+    session = SchedulingSession(equipment_availability, timebase)
+    if deadline is None:
+        if not session.solve(task_list, heuristic=heuristic, report=report):
+            return None
+        schedule = session.schedule()
+    else:
+        schedule = heuristic
+        for schedule in session.improve(task_list, heuristic, report, max(deadline - time.time(), 0)):
+            pass
+        if session.solution is False:
+            return None
+    if session.optimal:
+        cache.put(task_list, equipment_availability, schedule, quantum)
+    return {task_id: (schedule.starts[task_id], schedule.ends[task_id]) for task_id in schedule.starts}, session.optimal
+
+
+def _split(task_list, equipment_availability, timebase):
+    # solve_component arguments of every component, biggest first so they
+    # don't end up last in a pool's queue
+    parts = []
+    for rows in components(task_list, equipment_availability):
+        tasks = [task_list[i] for i in rows]
+        used = {equip for task in tasks for equip in task['equipment']}
+        availability = {equip: windows for equip, windows in equipment_availability.items() if equip in used}
+        parts.append((tasks, availability, timebase.origin, timebase.quantum))
+    parts.sort(key=lambda part: -len(part[0]))
+    return parts
+
+
+def _merge(timebase, task_list, results):
+    # (ListSchedule, all parts optimal) from solve_component results, None
+    # if a part is infeasible
+    if any(result is None for result in results):
+        return None
+    starts, ends = {}, {}
+    for times, _ in results:
+        for task_id, (start, end) in times.items():
+            starts[task_id] = start
+            ends[task_id] = end
+    return ListSchedule.from_times(timebase, task_list, starts, ends), all(optimal for _, optimal in results)
+
+
+def solve_decomposed(task_list, equipment_availability, max_workers=None, timebase=None):
+    """Solve every component of the plan in its own worker process and merge
+    the partial schedules into one ListSchedule (render it with
+    to_ps_solution). Returns None if any component is infeasible. A plan
+    that is a single component is solved in this process."""
+    if timebase is None:
+        timebase = TimeBase.from_tasks(task_list)
+    parts = _split(task_list, equipment_availability, timebase)
+    if len(parts) <= 1:
+        results = [solve_component(*part) for part in parts]
+    else:
+        max_workers = min(len(parts), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(solve_component, *zip(*parts)))
+    merged = _merge(timebase, task_list, results)
+    if merged is None:
+        return None
+    return merged[0]
+
+
+# Worker pools of DecomposedSession by size, started once and reused. They
+# spawn rather than fork: the Streamlit process runs threads, and a forked
+# child inherits whatever locks they held.
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Components end their search at the deadline on their own; how long to wait
+# for them to report back before using the heuristic schedule instead
+DEADLINE_GRACE = 0.5
+# AnytimeSolve's timer and the deadline of improve start a moment apart
+_DEADLINE_SLACK = 0.05
+
+
+def _pool(max_workers):
+    with _pools_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            pool = _pools[max_workers] = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+
+def _heuristic_component(tasks, equipment_availability, origin, quantum=QUANTUM):
+    # solve_component's result for a component whose search did not report
+    # back in time: the heuristic schedule, None if there is none
+    try:
+        schedule = list_schedule(tasks, equipment_availability, TimeBase(origin, quantum))
+    except ValueError:
+        return None
+    return {task_id: (schedule.starts[task_id], schedule.ends[task_id]) for task_id in schedule.starts}, False
+
+
+class DecomposedSession:
+    """solve_decomposed behind the SchedulingSession interface AnytimeSolve
+    drives (improve, optimal, solution), so a plan of several
+    components runs under the same budget and cancel as a single one.
+    improve yields once, when every component is solved or the budget has
+    run out; each component then keeps the best schedule it found. A stop
+    before the deadline ends it without a result."""
+
+    def __init__(self, equipment_availability, max_workers=None):
+        self.equipment_availability = equipment_availability
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.solution = None
+        self.optimal = False
+
+    def improve(self, task_list, heuristic=None, report=None, budget=None, stop=None):
+        deadline = None if budget is None else time.time() + budget
+        timebase = TimeBase.from_tasks(task_list)
+        parts = _split(task_list, self.equipment_availability, timebase)
+        self.solution = None
+        self.optimal = False
+        pool = _pool(self.max_workers)
+        futures = [pool.submit(solve_component, *part, deadline=deadline) for part in parts]
+        try:
+            pending = set(futures)
+            while pending:
+                if deadline is not None and time.time() >= deadline - _DEADLINE_SLACK:
+                    _, pending = wait(pending, timeout=DEADLINE_GRACE)
+                    break
+                if stop is not None and stop.is_set():
+                    return
+                _, pending = wait(pending, timeout=0.1)
+        finally:
+            # components still queued are dropped; running ones end at the
+            # deadline
+            for future in futures:
+                future.cancel()
+        results = [future.result() if future.done() and not future.cancelled() else _heuristic_component(*part)
+                   for future, part in zip(futures, parts)]
+        merged = _merge(timebase, task_list, results)
+        if merged is None:
+            self.solution = False
+            return
+        self.solution, self.optimal = merged
+        yield self.solution
@@ -0,0 +1,359 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+
+from .metrics import LatencyHistogram
+from .task_table import PRIORITY_WEIGHTS
+
+
+class TimingWheel:
+    """Hierarchical timing wheel keyed by an id.
+
+    Time is counted in ticks of `tick` seconds. Level k has 2**bits slots
+    of 2**(bits*k) ticks each; an entry sits in the lowest level whose
+    current block it falls in and is moved down a level when the wheel
+    reaches its slot, so schedule and cancel are O(1) and advancing costs
+    O(1) per tick plus one move per level an entry passes through.
+    """
+
+    def __init__(self, tick=0.05, bits=8, levels=4, now=None):
+        self.tick = tick
+        self.bits = bits
+        self.size = 1 << bits
+        self.mask = self.size - 1
+        self.levels = [[{} for _ in range(self.size)] for _ in range(levels)]
+        self.overflow = {}  # entries beyond the top level: key -> (tick, item)
+        self.due = {}       # entries already due when scheduled
+        self.where = {}     # key -> slot dict holding it
+        self.current = self._ticks(time.time() if now is None else now)
+
+    def _ticks(self, when):
+        return math.floor(when / self.tick)
+
+    def __len__(self):
+        return len(self.where)
+
+    def __contains__(self, key):
+        return key in self.where
+
+    def _slot(self, t):
+        if t <= self.current:
+            return self.due
+        for k, level in enumerate(self.levels):
+            shift = self.bits * (k + 1)
+            if t >> shift == self.current >> shift:
+                return level[(t >> (self.bits * k)) & self.mask]
+        return self.overflow
+
+    def schedule(self, key, when, item):
+        """Fire item at epoch seconds when (rounded up to a tick),
+        replacing any entry with the same key."""
+        self.cancel(key)
+        t = math.ceil(when / self.tick)
+        slot = self._slot(t)
+        slot[key] = (t, item)
+        self.where[key] = slot
+
+    def cancel(self, key):
+        slot = self.where.pop(key, None)
+        if slot is None:
+            return False
+        del slot[key]
+        return True
+
+    def _cascade(self, slot):
+        entries = list(slot.items())
+        slot.clear()
+        for key, (t, item) in entries:
+            target = self._slot(t)
+            target[key] = (t, item)
+            self.where[key] = target
+
+    def advance(self, now=None):
+        """Move the wheel up to now and return the (key, item) entries that
+        came due, in firing order."""
+        target = self._ticks(time.time() if now is None else now)
+        fired = list(self.due.items())
+        self.due.clear()
+        while self.current < target:
+            self.current += 1
+            c = self.current
+            # blocks that start at this tick move down, top level first
+            if c & ((1 << (self.bits * len(self.levels))) - 1) == 0:
+                self._cascade(self.overflow)
+            for k in range(len(self.levels) - 1, 0, -1):
+                if c & ((1 << (self.bits * k)) - 1) == 0:
+                    self._cascade(self.levels[k][(c >> (self.bits * k)) & self.mask])
+            fired.extend(self.due.items())
+            self.due.clear()
+            slot = self.levels[0][c & self.mask]
+            fired.extend(slot.items())
+            slot.clear()
+        for key, _ in fired:
+            del self.where[key]
+        return [(key, item) for key, (_, item) in fired]
+
+
+class Worker:
+    def __init__(self, sid, equipment):
+        self.sid = sid
+        self.equipment = set(equipment)  # empty: serves any task
+        self.task_id = None               # task it is running
+
+    def serves(self, task):
+        return not self.equipment or self.equipment.issuperset(task['equipment'])
+
+
+class Dispatcher:
+    """Turns planned task starts into 'dispatch' events to registered
+    worker connections.
+
+    Starts go on a TimingWheel; a tick (run by APScheduler) collects the
+    starts that came due. A due task waits until every dependency it has
+    among the dispatcher's tasks is done, then queues for a free worker that
+    serves all of its equipment; queued tasks go out highest priority
+    first, earliest due first on ties. Workers report back with complete().
+
+    Three latency histograms: lateness (dispatch time minus planned
+    start), overhead (dispatch time minus the moment the task became
+    dispatchable, i.e. due, unblocked and with a free worker) and ack
+    (round trip until the worker acknowledged the event).
+    """
+
+    def __init__(self, socketio, tick=0.05):
+        self.socketio = socketio
+        self.wheel = TimingWheel(tick)
+        self.lock = threading.Lock()
+        self.tasks = {}        # taskId -> task dict, until it is done
+        self.due_at = {}       # taskId -> planned start (epoch seconds)
+        self.blocked = {}      # taskId -> dependencies it still waits for
+        self.dependents = {}   # taskId -> taskIds blocked on it
+        self.ready = []        # heap of (-priority weight, due, seq, taskId); stale entries are skipped
+        self.queued = {}       # taskId -> seq of its live entry in ready
+        self.ready_since = {}  # taskId -> when it became due and unblocked
+        self.workers = {}      # sid -> Worker
+        self.running = {}      # taskId -> sid
+        self.seq = itertools.count()
+        self.lateness = LatencyHistogram()
+        self.overhead = LatencyHistogram()
+        self.ack = LatencyHistogram()
+
+    def schedule(self, task_id, when, task):
+        """Dispatch task at epoch seconds when; scheduling a task again
+        moves it."""
+        with self.lock:
+            if task_id in self.running:
+                return
+            self._drop(task_id)
+            self.tasks[task_id] = task
+            self.due_at[task_id] = when
+            self.wheel.schedule(task_id, when, task_id)
+
+    def cancel(self, task_id):
+        with self.lock:
+            self._drop(task_id)
+            self.tasks.pop(task_id, None)
+            self.due_at.pop(task_id, None)
+            self._release(task_id)
+        self._assign()
+
+    def _drop(self, task_id):
+        # take a not yet dispatched task off the wheel and the queues
+        self.wheel.cancel(task_id)
+        for dep in self.blocked.pop(task_id, ()):
+            self.dependents.get(dep, set()).discard(task_id)
+        # a queued task's heap entry stays behind, stale, until popped; the
+        # heap is rebuilt once stale entries outnumber the live ones
+        if self.ready_since.pop(task_id, None) is not None:
+            del self.queued[task_id]
+            if len(self.ready) > 2 * len(self.queued) + 64:
+                self.ready = [entry for entry in self.ready if self.queued.get(entry[3]) == entry[2]]
+                heapq.heapify(self.ready)
+
+    def _release(self, task_id):
+        # task_id is done or gone: unblock what waited for it
+        now = time.time()
+        for dependent in self.dependents.pop(task_id, ()):
+            waiting = self.blocked.get(dependent)
+            if waiting is not None:
+                waiting.discard(task_id)
+                if not waiting:
+                    del self.blocked[dependent]
+                    self._queue(dependent, now)
+
+    def _queue(self, task_id, now):
+        task = self.tasks[task_id]
+        self.ready_since[task_id] = now
+        seq = self.queued[task_id] = next(self.seq)
+        heapq.heappush(self.ready, (-PRIORITY_WEIGHTS.get(task.get('priority'), 0), self.due_at[task_id],
+                                    seq, task_id))
+
+    def tick(self):
+        """Fire everything that came due and hand queued tasks to free
+        workers. Called every wheel.tick seconds by APScheduler."""
+        now = time.time()
+        with self.lock:
+            for task_id, _ in self.wheel.advance(now):
+                waiting = {dep for dep in self.tasks[task_id]['dependencies'] if dep in self.tasks}
+                if waiting:
+                    self.blocked[task_id] = waiting
+                    for dep in waiting:
+                        self.dependents.setdefault(dep, set()).add(task_id)
+                else:
+                    self._queue(task_id, now)
+        self._assign()
+
+    def _assign(self):
+        sends = []
+        with self.lock:
+            idle = [worker for worker in self.workers.values() if worker.task_id is None]
+            skipped = []
+            while idle and self.ready:
+                entry = heapq.heappop(self.ready)
+                task_id = entry[3]
+                if self.queued.get(task_id) != entry[2]:
+                    continue  # cancelled or queued again since
+                task = self.tasks[task_id]
+                worker = next((worker for worker in idle if worker.serves(task)), None)
+                if worker is None:
+                    skipped.append(entry)
+                    continue
+                idle.remove(worker)
+                del self.queued[task_id]
+                worker.task_id = task_id
+                self.running[task_id] = worker.sid
+                sends.append((worker.sid, task_id, task, self.due_at[task_id], self.ready_since.pop(task_id)))
+            for entry in skipped:
+                heapq.heappush(self.ready, entry)
+
+        for sid, task_id, task, due, since in sends:
+            sent = time.time()
+            self.lateness.observe(max(sent - due, 0.0))
+            self.overhead.observe(sent - since)
+            self.socketio.emit('dispatch', {'taskId': task_id, 'task': task, 'due': due, 'sent': sent}, to=sid,
+                               callback=lambda *args, sent=sent: self.ack.observe(time.time() - sent))
+
+    def register(self, sid, equipment=()):
+        with self.lock:
+            self.workers[sid] = Worker(sid, equipment)
+        self._assign()
+
+    def unregister(self, sid):
+        # a task the worker was running is queued again, in its place by
+        # priority and planned start
+        with self.lock:
+            worker = self.workers.pop(sid, None)
+            if worker is not None and worker.task_id is not None:
+                del self.running[worker.task_id]
+                self._queue(worker.task_id, time.time())
+        self._assign()
+
+    def complete(self, sid, task_id):
+        """The worker on sid finished task_id."""
+        with self.lock:
+            if self.running.get(task_id) != sid:
+                return False
+            del self.running[task_id]
+            self.workers[sid].task_id = None
+            self.tasks.pop(task_id, None)
+            self.due_at.pop(task_id, None)
+            self._release(task_id)
+        self._assign()
+        return True
+
+    def stats(self):
+        with self.lock:
+            counts = {
+                'scheduled': len(self.wheel),
+                'blocked': len(self.blocked),
+                'queued': len(self.queued),
+                'running': len(self.running),
+                'workers': len(self.workers),
+            }
+        return dict(counts, lateness=self.lateness.snapshot(), overhead=self.overhead.snapshot(),
+                    ack=self.ack.snapshot())
+
+
+if __name__ == '__main__':
+    import random
+    import sys
+
+    # Wheel against a heap with lazy deletion for schedule / cancel / fire
+    # of N timers, then firing accuracy of a Dispatcher ticking every 50 ms
+    # for 2000 starts over two seconds (chains of five) on eight workers
+    # that finish instantly.
+    #
+    #   python -m backend.dispatch [num_timers]
+    num_timers = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    now = time.time()
+    whens = [now + rng.uniform(0, 3600) for _ in range(num_timers)]
+
+    wheel = TimingWheel(now=now)
+    started = time.perf_counter()
+    for i, when in enumerate(whens):
+        wheel.schedule(i, when, i)
+    schedule_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(0, num_timers, 2):
+        wheel.cancel(i)
+    cancel_time = time.perf_counter() - started
+    started = time.perf_counter()
+    fired = len(wheel.advance(now + 3601))
+    fire_time = time.perf_counter() - started
+
+    heap = []
+    cancelled = set()
+    started = time.perf_counter()
+    for i, when in enumerate(whens):
+        heapq.heappush(heap, (when, i))
+    heap_schedule = time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(0, num_timers, 2):
+        cancelled.add(i)
+    heap_cancel = time.perf_counter() - started
+    started = time.perf_counter()
+    heap_fired = 0
+    while heap:
+        _, i = heapq.heappop(heap)
+        heap_fired += i not in cancelled
+    heap_fire = time.perf_counter() - started
+    assert fired == heap_fired
+    print(f"{num_timers} timers, per operation:")
+    print(f"  wheel: schedule {schedule_time / num_timers * 1e9:6.0f} ns, cancel {cancel_time / (num_timers / 2) * 1e9:6.0f} ns, "
+          f"fire {fire_time / fired * 1e9:6.0f} ns")
+    print(f"  heap:  schedule {heap_schedule / num_timers * 1e9:6.0f} ns, cancel {heap_cancel / (num_timers / 2) * 1e9:6.0f} ns, "
+          f"fire {heap_fire / fired * 1e9:6.0f} ns")
+
+    class InstantWorkers:
+        # stands in for the Socket.IO server: every worker acks and finishes at once
+        def __init__(self):
+            self.dispatcher = None
+
+        def emit(self, event, data, to=None, callback=None):
+            callback()
+            threading.Thread(target=self.dispatcher.complete, args=(to, data['taskId'])).start()
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    server = InstantWorkers()
+    dispatcher = server.dispatcher = Dispatcher(server)
+    for w in range(8):
+        dispatcher.register(f"worker-{w}")
+    start = time.time() + 0.5
+    dues = sorted(start + rng.uniform(0, 2) for _ in range(2000))
+    for i, due in enumerate(dues):
+        deps = [f"D{i - 1}"] if i % 5 else []
+        dispatcher.schedule(f"D{i}", due, {'taskId': f"D{i}", 'priority': rng.choice(list(PRIORITY_WEIGHTS)),
+                                                                  'equipment': [], 'dependencies': deps})
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(dispatcher.tick, 'interval', seconds=dispatcher.wheel.tick, max_instances=1, coalesce=True)
+    scheduler.start()
+    time.sleep(3.5)
+    scheduler.shutdown()
+    stats = dispatcher.stats()
+    for name in ('lateness', 'overhead'):
+        h = stats[name]
+        print(f"  {name:9s} n={h['count']} p50<={h['p50'] * 1000:.1f} ms p99<={h['p99'] * 1000:.1f} ms max {h['max'] * 1000:.1f} ms")
@@ -0,0 +1,204 @@
+import heapq
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .task_table import PRIORITY_WEIGHTS
+
+
+class ExecutionMetrics:
+    def __init__(self):
+        self.wall_clock = 0.0
+        self.busy_time = 0.0  # sum of the time spent inside run_task
+        self.completed = []
+        self.failed = []
+        self.skipped = []     # not run because a dependency failed or can't run
+        self.timeline = {}    # taskId -> (start, end) relative to the run start
+
+    @property
+    def throughput(self):
+        return len(self.completed) / self.wall_clock if self.wall_clock else 0.0
+
+    @property
+    def parallelism(self):
+        # average number of tasks running at once
+        return self.busy_time / self.wall_clock if self.wall_clock else 0.0
+
+    def summary(self):
+        return (f"{len(self.completed)} done, {len(self.failed)} failed, {len(self.skipped)} skipped "
+                f"in {self.wall_clock:.3f}s ({self.throughput:.1f} tasks/s, parallelism {self.parallelism:.2f})")
+
+
+class DependencyExecutor:
+    """Runs a task list as a DAG on a thread pool.
+
+    A task is dispatched as soon as all of its dependencies have completed
+    and it can take the lock of every piece of equipment it uses, so tasks
+    on disjoint equipment run concurrently while two tasks never share a
+    machine. Locks are taken all-or-nothing by the dispatching thread and
+    released by the worker, so no worker ever blocks holding a lock.
+    Pass equipment_locks to share the locks with other executors.
+
+    state is an optional binaryTree.TreeState (tree.state of a
+    BehaviorTree): equipment is marked busy there while a task runs and the
+    task done once it completes, so ticking the tree sees the run as it
+    goes. It is only touched from the thread calling run().
+    """
+
+    def __init__(self, task_list, run_task, max_workers=None, equipment_locks=None, state=None):
+        self.task_list = task_list
+        self.run_task = run_task
+        # same default as ThreadPoolExecutor
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.equipment_locks = equipment_locks if equipment_locks is not None else {}
+        self.state = state
+        for task in task_list:
+            for equip in task['equipment']:
+                self.equipment_locks.setdefault(equip, threading.Lock())
+
+        self.index = {task['taskId']: i for i, task in enumerate(task_list)}
+        self.successors = [[] for _ in task_list]
+        self.missing = [0] * len(task_list)
+        for i, task in enumerate(task_list):
+            for dep in task['dependencies']:
+                if dep not in self.index:
+                    raise ValueError(f"Task {task['taskId']} depends on {dep}, which is not in the task list")
+                self.successors[self.index[dep]].append(i)
+                self.missing[i] += 1
+
+        # Kahn's algorithm: tasks never reached are on or behind a cycle
+        # and would never become ready
+        missing = list(self.missing)
+        order = [i for i, count in enumerate(missing) if count == 0]
+        for i in order:
+            for j in self.successors[i]:
+                missing[j] -= 1
+                if missing[j] == 0:
+                    order.append(j)
+        if len(order) < len(task_list):
+            stuck = [task['taskId'] for i, task in enumerate(task_list) if missing[i]]
+            raise ValueError(f"Dependency cycle through {', '.join(stuck)}")
+
+    def _try_lock(self, task):
+        taken = []
+        for equip in task['equipment']:
+            lock = self.equipment_locks[equip]
+            if not lock.acquire(blocking=False):
+                for held in taken:
+                    held.release()
+                return False
+            taken.append(lock)
+        if self.state is not None:
+            for equip in task['equipment']:
+                self.state.set_free(equip, False)
+        return True
+
+    def _finished(self, task, completed):
+        if self.state is not None:
+            for equip in task['equipment']:
+                self.state.set_free(equip, True)
+            if completed:
+                self.state.mark_done(task['taskId'])
+
+    def _work(self, task, t0):
+        start = time.perf_counter()
+        try:
+            self.run_task(task)
+        finally:
+            end = time.perf_counter()
+            for equip in task['equipment']:
+                self.equipment_locks[equip].release()
+        return start - t0, end - t0
+
+    def run(self):
+        metrics = ExecutionMetrics()
+        missing = list(self.missing)
+        ready = []  # heap of (-priority weight, position)
+        for i, count in enumerate(missing):
+            if count == 0:
+                heapq.heappush(ready, (-PRIORITY_WEIGHTS.get(self.task_list[i].get('priority'), 0), i))
+
+        t0 = time.perf_counter()
+        running = {}
+        blocked = set()  # tasks downstream of a failure
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while ready or running:
+                # dispatch everything whose equipment is free, best priority first
+                waiting = []
+                while ready and len(running) < self.max_workers:
+                    entry = heapq.heappop(ready)
+                    task = self.task_list[entry[1]]
+                    if self._try_lock(task):
+                        running[pool.submit(self._work, task, t0)] = entry[1]
+                    else:
+                        waiting.append(entry)
+                for entry in waiting:
+                    heapq.heappush(ready, entry)
+
+                if not running:
+                    # something outside this executor holds the locks
+                    time.sleep(0.001)
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    task_id = self.task_list[i]['taskId']
+                    try:
+                        start, end = future.result()
+                    except Exception:
+                        self._finished(self.task_list[i], False)
+                        metrics.failed.append(task_id)
+                        stack = [i]
+                        while stack:
+                            for j in self.successors[stack.pop()]:
+                                if j not in blocked:
+                                    blocked.add(j)
+                                    metrics.skipped.append(self.task_list[j]['taskId'])
+                                    stack.append(j)
+                        continue
+                    self._finished(self.task_list[i], True)
+                    metrics.completed.append(task_id)
+                    metrics.timeline[task_id] = (start, end)
+                    metrics.busy_time += end - start
+                    for j in self.successors[i]:
+                        missing[j] -= 1
+                        if missing[j] == 0 and j not in blocked:
+                            heapq.heappush(ready, (-PRIORITY_WEIGHTS.get(self.task_list[j].get('priority'), 0), j))
+        metrics.wall_clock = time.perf_counter() - t0
+        return metrics
+
+
+def run_sequential(task_list, run_task):
+    """The same tasks one at a time, in dependency order, for comparison."""
+    return DependencyExecutor(task_list, run_task, max_workers=1).run()
+
+
+if __name__ == '__main__':
+    import json
+
+    from .timebase import to_epoch
+
+    # Simulate every task with a sleep of (its duration in hours) * scale
+    # seconds and compare sequential against parallel execution, once with
+    # the example dependencies and once with them dropped, then through the
+    # behavior tree.
+    from .binaryTree import BehaviorTree
+
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'JSON.json')) as f:
+        data = json.load(f)['scheduler']
+    task_list = data['tasks']
+
+    def simulate(task):
+        time.sleep((to_epoch(task['endTime']) - to_epoch(task['startTime'])) / 3600 * scale)
+
+    independent = [dict(task, dependencies=[]) for task in task_list]
+    for label, tasks in (("with dependencies", task_list), ("independent", independent)):
+        print(label)
+        print("  sequential:", run_sequential(tasks, simulate).summary())
+        print("  parallel:  ", DependencyExecutor(tasks, simulate).run().summary())
+    tree = BehaviorTree(task_list, data['equipmentAvailability'])
+    print("behavior tree:", tree.execute(task_list, simulate).summary())
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+from . import metrics
+
+# Gantt charts straight from a ListSchedule. Figures are built with the
+# object API (Figure + Agg canvas), never registered with pyplot, so nothing
+# accumulates across Streamlit reruns and rendering is safe off the main
+# thread. matplotlib is imported on the first PNG/SVG render; digests and
+# Plotly specs do without it.
+
+FORMATS = ("png", "svg", "plotly")
+
+
+def schedule_digest(schedule, task_list):
+    """Hash of what a chart shows: absolute bar times and labels."""
+    names = {task['taskId']: task['taskName'] for task in task_list}
+    payload = [schedule.timebase.origin, schedule.timebase.quantum,
+               sorted((equip, [(names[task_id], start, end) for task_id, start, end in bars])
+                      for equip, bars in schedule.assignments.items())]
+    return hashlib.sha1(json.dumps(payload).encode('utf-8')).hexdigest()
+
+
+def _bars(schedule, task_list):
+    # (equipment rows, [(row, task name, start datetime, end datetime)])
+    names = {task['taskId']: task['taskName'] for task in task_list}
+    rows = [equip for equip, bars in schedule.assignments.items() if bars]
+    bars = []
+    for row, equip in enumerate(rows):
+        for task_id, start, end in schedule.assignments[equip]:
+            bars.append((row, names[task_id], schedule.timebase.to_datetime(start), schedule.timebase.to_datetime(end)))
+    return rows, bars
+
+
+def _colors(task_list):
+    from matplotlib.colors import LinearSegmentedColormap
+
+    cmap = LinearSegmentedColormap.from_list("custom blue", ["#bbccdd", "#ee3300"], N=max(len(task_list), 1))
+    return {task['taskName']: cmap(i) for i, task in enumerate(task_list)}
+
+
+def render_figure(schedule, task_list, fig_size=(10, 5)):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    import matplotlib.dates as mdates
+
+    rows, bars = _bars(schedule, task_list)
+    colors = _colors(task_list)
+    fig = Figure(figsize=fig_size)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for row, name, start, end in bars:
+        ax.barh(row, end - start, left=start, height=0.6, color=colors[name], edgecolor="black", linewidth=0.5)
+        ax.text(start + (end - start) / 2, row, name, ha="center", va="center", fontsize=8, clip_on=True)
+    ax.set_yticks(range(len(rows)))
+    ax.set_yticklabels(rows)
+    ax.invert_yaxis()
+    # a handful of date ticks whatever the horizon, not one per time unit
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax.set_title(f"Resources schedule (makespan {schedule.horizon * schedule.timebase.quantum // 60} min)")
+    ax.grid(axis="x", linestyle=":")
+    fig.tight_layout()
+    return fig
+
+
+def render_image(schedule, task_list, fmt="png", fig_size=(10, 5)):
+    """Encoded PNG or SVG bytes."""
+    with metrics.span('gantt.draw'):
+        fig = render_figure(schedule, task_list, fig_size)
+    buf = BytesIO()
+    try:
+        with metrics.span(f'gantt.encode.{fmt}'):
+            fig.savefig(buf, format=fmt)
+    finally:
+        fig.clear()
+    return buf.getvalue()
+
+
+@metrics.timed('gantt.plotly')
+def plotly_spec(schedule, task_list):
+    """Plotly figure spec (plain dict, JSON-serializable) with one
+    horizontal bar per assignment, so the browser does the drawing."""
+    rows, bars = _bars(schedule, task_list)
+    traces = {}
+    for row, name, start, end in bars:
+        trace = traces.setdefault(name, {"type": "bar", "orientation": "h", "name": name,
+                                         "base": [], "x": [], "y": [], "hovertemplate": "%{base} + %{x}ms"})
+        trace["base"].append(start.isoformat())
+        trace["x"].append((end - start).total_seconds() * 1000)
+        trace["y"].append(rows[row])
+    return {
+        "data": list(traces.values()),
+        "layout": {
+            "title": {"text": "Resources schedule"},
+            "barmode": "overlay",
+            "xaxis": {"type": "date"},
+            "yaxis": {"autorange": "reversed", "categoryorder": "array", "categoryarray": rows},
+        },
+    }
+
+
+class GanttRenderer:
+    """Renders charts on a background thread and keeps the last `size`
+    results keyed by (schedule digest, format), so a rerun that shows the
+    same schedule gets the already-encoded image."""
+
+    def __init__(self, size=32, max_workers=1):
+        self.size = size
+        self.results = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gantt")
+        self.hits = 0
+        self.misses = 0
+
+    def _render(self, key, schedule, task_list, fmt):
+        try:
+            if fmt == "plotly":
+                result = plotly_spec(schedule, task_list)
+            else:
+                result = render_image(schedule, task_list, fmt)
+            with self.lock:
+                self.results[key] = result
+                while len(self.results) > self.size:
+                    self.results.popitem(last=False)
+            return result
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def submit(self, schedule, task_list, fmt="png"):
+        """Future of the rendered chart: bytes for png/svg, a dict for plotly."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown chart format: {fmt}")
+        key = (schedule_digest(schedule, task_list), fmt)
+        with self.lock:
+            if key in self.results:
+                self.hits += 1
+                metrics.inc('sola_gantt_cache_total', result='hit')
+                self.results.move_to_end(key)
+                future = Future()
+                future.set_result(self.results[key])
+                return future
+            future = self.pending.get(key)
+            if future is None:
+                self.misses += 1
+                metrics.inc('sola_gantt_cache_total', result='miss')
+                future = self.pending[key] = self.pool.submit(self._render, key, schedule, list(task_list), fmt)
+            return future
+
+    def render(self, schedule, task_list, fmt="png"):
+        return self.submit(schedule, task_list, fmt).result()
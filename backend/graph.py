@@ -1,29 +1,36 @@
 import matplotlib.pyplot as plt
-import random
+
+from .live_plot import LivePlot
+from .telemetry import SimulatedInstrument, TelemetryQueue
 
 plt.ion()  # turning interactive mode on
 
-# preparing the data
-y = [random.randint(1,10) for i in range(20)]
-x = [*range(1,21)]
+# Instrument readings arrive on a background thread; the loop below only
+# drains what came in since the last frame, so it never blocks on a source.
+# Replace SimulatedInstrument with anything that calls queue.put_many().
+queue = TelemetryQueue()
+source = SimulatedInstrument(queue)
 
-# plotting the first frame
-graph = plt.plot(x,y)[0]
-plt.ylim(0,10)
-plt.pause(1)
+# one rolling 10 second window per series, decimated to 1000 points
+fig, axes = plt.subplots(len(source.series), 1, sharex=True, squeeze=False)
+plots = {}
+for ax, (name, (rate, _)) in zip(axes.flat, source.series.items()):
+    ax.set_ylabel(name)
+    plots[name] = LivePlot(ax, capacity=10 * rate, max_points=1000)
+plt.show()
+plt.pause(0.1)
 
-# the update loop
-while(True):
-    # updating the data
-    y.append(random.randint(1,10))
-    x.append(x[-1]+1)
+source.start()
 
-    # removing the older graph
-    graph.remove()
+# the update loop
+while(plt.fignum_exists(fig.number)):
+    # pulling every series' new samples as arrays
+    for name, (times, values) in queue.drain().items():
+        plots[name].extend(times, values)
+    for plot in plots.values():
+        plot.draw()
 
-    # plotting newer graph
-    graph = plt.plot(x,y,color = 'g')[0]
-    plt.xlim(x[0], x[-1])
+    # ~30 frames per second
+    plt.pause(1 / 30)
 
-    # calling pause function for 0.25 seconds
-    plt.pause(0.25)
+source.stop()
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import time
+
+import processscheduler as ps
+import processscheduler.base
+import z3
+
+from . import metrics
+from .availability import AvailabilityIndex
+from .list_scheduler import ListSchedule
+from .timebase import QUANTUM, TimeBase, to_epoch
+
+
+def hash_task(task):
+    payload = json.dumps(task, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def hash_task_list(task_list):
+    digest = hashlib.sha1()
+    for task in task_list:
+        digest.update(hash_task(task).encode('ascii'))
+    return digest.hexdigest()
+
+
+class SchedulingSession:
+    """Keeps one SchedulingProblem alive across Streamlit reruns and only
+    applies the tasks that changed since the previous solve.
+
+    Without a timebase, times are minutes from the earliest task seen; a
+    task starting before that origin rebuilds the problem from scratch.
+    """
+
+    def __init__(self, equipment_availability, timebase=None):
+        self.equipment_availability = equipment_availability
+        self.availability = AvailabilityIndex(equipment_availability)
+        self.rebase = timebase is None
+        self.quantum = QUANTUM if timebase is None else timebase.quantum
+        self.solve_count = 0
+        self._reset(timebase)
+
+    def _reset(self, timebase):
+        self.timebase = timebase
+        self.problem = ps.SchedulingProblem(name="FlowShop")
+        self.workers = {equip: ps.Worker(name=equip) for equip in self.equipment_availability.keys()}
+        self.makespan_obj = ps.ObjectiveMinimizeMakespan()
+
+        # gaps between availability windows, in the problem's time units
+        self.unavailable = {}
+        if timebase is not None:
+            self.unavailable = {equip: self.availability.unavailable_intervals(equip, timebase.origin, timebase.quantum)
+                                for equip in self.workers}
+
+        self.tasks_ps = {}       # taskId -> ps.FixedDurationTask
+        self.task_hashes = {}    # taskId -> hash of the task dict it was built from
+        self.task_data = {}      # taskId -> task dict
+        self.constraints = {}    # taskId -> {constraint name: constraint} touching that task
+        self.constraint_tasks = {}  # constraint name -> taskIds it touches
+        self.window_assertions = {}  # taskId -> z3 assertions keeping it inside availability windows
+        self.list_hash = None
+        self.solution = None
+        self.optimal = False     # solution is proven optimal, not just the best found in time
+
+    def _activate(self):
+        # processscheduler registers new objects on the "active" problem
+        processscheduler.base.active_problem = self.problem
+
+    def _track(self, constraint, *task_ids):
+        self.constraint_tasks[constraint.name] = task_ids
+        for task_id in task_ids:
+            self.constraints.setdefault(task_id, {})[constraint.name] = constraint
+
+    def _remove_task(self, task_id):
+        task_ps = self.tasks_ps.pop(task_id)
+        for name in self.constraints.pop(task_id, {}):
+            self.problem.constraints.pop(name, None)
+            # drop the constraint from the other task's index as well
+            for other_id in self.constraint_tasks.pop(name):
+                if other_id != task_id:
+                    self.constraints[other_id].pop(name, None)
+        for resource in task_ps._required_resources:
+            resource._busy_intervals.pop(task_ps, None)
+        self.problem.tasks.pop(task_ps.name, None)
+        del self.window_assertions[task_id]
+        del self.task_hashes[task_id]
+        del self.task_data[task_id]
+
+    def _add_task(self, task):
+        task_id = task['taskId']
+        start_time_offset, duration = self.timebase.task_times(task)
+        task_ps = ps.FixedDurationTask(name=task['taskName'], duration=duration)
+        for equip in task['equipment']:
+            task_ps.add_required_resource(self.workers[equip])
+        self.tasks_ps[task_id] = task_ps
+        self.task_hashes[task_id] = hash_task(task)
+        self.task_data[task_id] = task
+        self._track(ps.TaskStartAfter(task=task_ps, value=start_time_offset), task_id)
+        self.window_assertions[task_id] = self._window_assertions(task_ps, task['equipment'])
+        return duration, start_time_offset
+
+    def _window_assertions(self, task_ps, equipment):
+        assertions = []
+        for equip in equipment:
+            for lo, hi in self.unavailable[equip]:
+                if lo is None and hi is None:
+                    assertions.append(z3.BoolVal(False))
+                elif lo is None:
+                    assertions.append(task_ps._start >= hi)
+                elif hi is None:
+                    assertions.append(task_ps._end <= lo)
+                else:
+                    assertions.append(z3.Or(task_ps._start >= hi, task_ps._end <= lo))
+        return assertions
+
+    def _add_precedences(self, task_id, added):
+        task = self.task_data[task_id]
+        for dep in task['dependencies']:
+            # edges between two untouched tasks are already in the problem
+            if task_id in added or dep in added:
+                constraint = ps.TaskPrecedence(task_before=self.tasks_ps[dep], task_after=self.tasks_ps[task_id])
+                self._track(constraint, dep, task_id)
+
+    def update(self, task_list):
+        """Bring the problem in line with task_list. A modified task is
+        removed and added again."""
+        new_hashes = {task['taskId']: hash_task(task) for task in task_list}
+        for task in task_list:
+            for dep in task['dependencies']:
+                if dep not in new_hashes:
+                    raise KeyError(dep)
+
+        if task_list:
+            earliest = min(to_epoch(task['startTime']) for task in task_list)
+            if self.timebase is None or (self.rebase and earliest < self.timebase.origin):
+                # offsets are relative to the origin, so everything is rebuilt
+                self._reset(TimeBase(earliest, self.quantum))
+
+        removed = [task_id for task_id, h in self.task_hashes.items() if new_hashes.get(task_id) != h]
+        added = [task['taskId'] for task in task_list if self.task_hashes.get(task['taskId']) != new_hashes[task['taskId']]]
+
+        self._activate()
+        for task_id in removed:
+            self._remove_task(task_id)
+
+        added_set = set(added)
+        added_work = 0
+        latest_release = 0
+        for task in task_list:
+            if task['taskId'] in added_set:
+                duration, start_time_offset = self._add_task(task)
+                added_work += duration
+                latest_release = max(latest_release, start_time_offset)
+
+        for task in task_list:
+            self._add_precedences(task['taskId'], added_set)
+
+        return removed, added, added_work, latest_release
+
+    def _warm_bound(self, added, added_work, latest_release):
+        # The previous schedule minus the removed tasks is still feasible, and
+        # the added tasks can be run one after another once it is done, so
+        # this is a valid upper bound on the new makespan, provided that block
+        # lies inside an availability window of every equipment they use.
+        if not self.solution:
+            return None
+        start = max(self.solution.horizon, latest_release)
+        end = start + added_work
+        for equip in {equip for task_id in added for equip in self.task_data[task_id]['equipment']}:
+            for lo, hi in self.unavailable[equip]:
+                if not (hi is not None and start >= hi or lo is not None and end <= lo):
+                    return None
+        return end
+
+    def schedule(self):
+        """The current solution as a ListSchedule, or None."""
+        if not self.solution:
+            return None
+        starts, ends = {}, {}
+        for task_id, task_ps in self.tasks_ps.items():
+            task_solution = self.solution.tasks[task_ps.name]
+            starts[task_id] = task_solution.start
+            ends[task_id] = task_solution.end
+        return ListSchedule.from_times(self.timebase, list(self.task_data.values()), starts, ends)
+
+    def _solver(self, bound, report):
+        self._activate()
+        solver = ps.SchedulingSolver(problem=self.problem)
+        solver.initialize()
+        for assertions in self.window_assertions.values():
+            solver.append_z3_assertion(assertions)
+        if bound is not None:
+            solver.append_z3_assertion(self.problem._horizon <= bound)
+        lower_bound = 0
+        if report is not None:
+            lower_bound = self.timebase.offset(report.timebase.to_epoch(report.lower_bound))
+            solver.append_z3_assertion(self.problem._horizon >= lower_bound)
+        return solver, lower_bound
+
+    def _bound(self, added, added_work, latest_release, heuristic):
+        bound = self._warm_bound(added, added_work, latest_release)
+        if heuristic is not None:
+            upper_bound = self.timebase.offset_ceil(heuristic.timebase.to_epoch(heuristic.horizon))
+            if bound is None or upper_bound < bound:
+                bound = upper_bound
+        return bound
+
+    def solve(self, task_list, heuristic=None, report=None):
+        """heuristic is an optional ListSchedule of the same tasks; its
+        makespan is known to be feasible and cuts the optimizer's search.
+        report is an optional ValidationReport whose lower bound lets the
+        optimizer stop as soon as it reaches it."""
+        list_hash = hash_task_list(task_list)
+        if list_hash == self.list_hash and self.optimal:
+            return self.solution
+
+        with metrics.span('smt.update'):
+            removed, added, added_work, latest_release = self.update(task_list)
+        if not removed and not added and self.solution is not None and self.optimal:
+            # same tasks, different order
+            self.list_hash = list_hash
+            return self.solution
+        bound = self._bound(added, added_work, latest_release, heuristic)
+
+        with metrics.span('smt.build'):
+            solver, _ = self._solver(bound, report)
+        with metrics.span('smt.solve'):
+            self.solution = solver.solve()
+        self.optimal = bool(self.solution)
+        self.solve_count += 1
+        self.list_hash = list_hash
+        return self.solution
+
+    def improve(self, task_list, heuristic=None, report=None, budget=None, stop=None):
+        """Anytime counterpart of solve: a generator yielding a ListSchedule
+        each time a shorter makespan is found. It ends when the makespan is
+        proven optimal, after budget seconds, or once the threading.Event
+        stop is set; self.optimal tells which. A later call with the same
+        tasks carries on from the best schedule found so far."""
+        deadline = None if budget is None else time.monotonic() + budget
+        list_hash = hash_task_list(task_list)
+        if list_hash == self.list_hash and self.optimal:
+            if self.solution:
+                yield self.schedule()
+            return
+
+        with metrics.span('smt.update'):
+            removed, added, added_work, latest_release = self.update(task_list)
+        # from the previous solution, before it is dropped
+        bound = self._bound(added, added_work, latest_release, heuristic)
+        best = None
+        if not removed and not added and self.solution:
+            best = self.solution
+            yield self.schedule()
+        else:
+            self.solution = None
+        self.optimal = False
+        self.list_hash = list_hash
+        self.solve_count += 1
+
+        with metrics.span('smt.build'):
+            solver, lower_bound = self._solver(bound, report)
+        # the incremental optimizer in processscheduler only returns at the
+        # end, so its loop is run here on the underlying z3 solver
+        z3_solver = solver._solver
+        while not (stop is not None and stop.is_set()):
+            if best and best.horizon <= lower_bound:
+                self.optimal = True
+                break
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                z3_solver.set(timeout=max(int(remaining * 1000), 1))
+            if best:
+                z3_solver.add(self.problem._horizon < best.horizon)
+            with metrics.span('smt.check'):
+                result = z3_solver.check()
+            if result == z3.unsat:
+                # nothing shorter exists (or nothing at all)
+                self.optimal = True
+                self.solution = best or False
+                break
+            if result != z3.sat:
+                # timed out or interrupted
+                break
+            best = self.solution = solver.build_solution(z3_solver.model())
+            yield self.schedule()
@@ -1,11 +1,27 @@
 import json
-import processscheduler as ps
-from itertools import combinations
-from datetime import datetime, timezone
-import matplotlib.pyplot as plt
 import streamlit as st
+import os
 from io import BytesIO
 
+# Run from the repository root, so the backend package is importable:
+#   python -m streamlit run backend/json_to_py.py
+from backend import metrics
+from backend.anytime import SOLVE_BUDGET_MS, AnytimeSolve
+from backend.decompose import DecomposedSession, components
+from backend.gantt import GanttRenderer
+from backend.list_scheduler import list_schedule
+from backend.solution_cache import default_cache
+from backend.validation import validate_plan
+
+# With SOLA_METRICS_PORT set, the page's stage timings are served in the
+# Prometheus format at http://127.0.0.1:<port>/metrics
+@st.cache_resource
+def metrics_server(port):
+    return metrics.serve(port)
+
+if os.environ.get('SOLA_METRICS_PORT'):
+    metrics_server(int(os.environ['SOLA_METRICS_PORT']))
+
 # Initialize session state
 if 'tasks' not in st.session_state:
     st.session_state.tasks = []
@@ -84,54 +100,129 @@ initial_json_input = '''
 '''
 
 # Load initial tasks from JSON
-initial_data = json.loads(initial_json_input)
+with metrics.span('parse_json'):
+    initial_data = json.loads(initial_json_input)
 if 'initialized' not in st.session_state:
     st.session_state.tasks = initial_data['scheduler']['tasks']
     st.session_state.initialized = True
 
-# Function to render Gantt chart
-def render_gantt_chart(tasks):
-    task_list = tasks
+# Optimality pass with the SMT solver
+def solve_optimal(tasks, heuristic, report, budget, chart, chart_format, cancel=False):
+    # processscheduler and z3 load with the first SMT solve, not with the page
+    from backend.incremental import SchedulingSession, hash_task_list
+
+    equipment_availability = initial_data['scheduler']['equipmentAvailability']
+    # Tasks sharing no equipment or dependencies are solved as separate
+    # problems, one worker process each
+    decomposed = len(components(tasks, equipment_availability)) > 1
+
+    # A plan solved before (same durations, equipment, precedences and
+    # relative times, any ids or dates) comes straight from the cache
+    cache = default_cache()
+    cached = cache.get(tasks, equipment_availability)
+    if cached is not None:
+        return cached
+
+    # The solve runs on a background thread that outlives the rerun, starting
+    # from the heuristic schedule and improving it until the budget runs out;
+    # the Cancel button's rerun stops it and keeps the best schedule so far
+    key = (hash_task_list(tasks), budget)
+    job = st.session_state.get('anytime_solve')
+    if cancel and job is not None and job.key == key:
+        job.cancel()
+    elif job is None or job.key != key:
+        if job is not None:
+            job.join()
+        if decomposed:
+            session = DecomposedSession(equipment_availability)
+        else:
+            # The session survives reruns, so only changed tasks are rebuilt
+            # and the solve is skipped entirely when the task list is unchanged
+            if 'scheduling_session' not in st.session_state:
+                st.session_state.scheduling_session = SchedulingSession(equipment_availability)
+            session = st.session_state.scheduling_session
+        job = AnytimeSolve(session, tasks, heuristic=heuristic, report=report, budget=budget)
+        job.key = key
+        st.session_state.anytime_solve = job
+
+    status = st.empty()
+    shown = None
+    while True:
+        finished = job.wait(0.1)
+        if job.version != shown and job.best is not None:
+            shown = job.version
+            render_gantt_chart(job.best, tasks, chart_format, chart)
+        if finished or job.expired:
+            break
+        status.info(f"Improving... best makespan so far {makespan_minutes(job.best)} min")
+
+    if job.error is not None:
+        status.error(f"Solver failed: {job.error}")
+    elif job.infeasible:
+        status.empty()
+        return None
+    elif job.optimal:
+        status.success(f"Optimal makespan: {makespan_minutes(job.best)} min")
+        cache.put(tasks, equipment_availability, job.best)
+    elif job.cancelled:
+        status.warning(f"Solve cancelled, showing the best schedule found ({makespan_minutes(job.best)} min)")
+    else:
+        status.info(f"Best schedule within {budget * 1000:.0f} ms: {makespan_minutes(job.best)} min")
+    return job.result()
+
+def makespan_minutes(schedule):
+    return schedule.horizon * schedule.timebase.quantum // 60
+
+# One renderer per server process, shared by every session and rerun, so a
+# chart already drawn for a schedule is not drawn again
+@st.cache_resource
+def gantt_renderer():
+    return GanttRenderer()
+
+# Function to schedule the tasks for the Gantt chart
+def schedule_tasks(tasks, engine="Heuristic", budget=SOLVE_BUDGET_MS / 1000, chart=None, chart_format="PNG", cancel=False):
     equipment_availability = initial_data['scheduler']['equipmentAvailability']
+    # Reject broken plans (cycles, deleted dependencies, unknown equipment)
+    # before any solver time is spent
+    with metrics.span('validate'):
+        report = validate_plan(tasks, equipment_availability)
+    if not report.ok:
+        for message in report.errors():
+            st.error(message)
+        return None
 
-    flow_shop_problem = ps.SchedulingProblem(name="FlowShop")
-    workers = {equip: ps.Worker(name=equip) for equip in equipment_availability.keys()}
-    tasks_ps = {}
-
-    for task in task_list:
-        task_id = task['taskId']
-        start_time = datetime.fromisoformat(task['startTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
-        end_time = datetime.fromisoformat(task['endTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
-        duration = int((end_time - start_time).total_seconds() / 3600)  # Convert duration to integer
-        tasks_ps[task_id] = ps.FixedDurationTask(name=task['taskName'], duration=duration)
-        for equip in task['equipment']:
-            tasks_ps[task_id].add_required_resource(workers[equip])
-
-    base_date = datetime(2024, 6, 23, tzinfo=timezone.utc)
-    for task in task_list:
-        start_time = datetime.fromisoformat(task['startTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
-        start_time_offset = int((start_time - base_date).total_seconds() / 3600)  # Convert start_time to integer
-        ps.TaskStartAfter(task=tasks_ps[task['taskId']], value=start_time_offset)
-
-    for task in task_list:
-        for dep in task['dependencies']:
-            ps.TaskPrecedence(task_before=tasks_ps[dep], task_after=tasks_ps[task['taskId']])
-
-    makespan_obj = ps.ObjectiveMinimizeMakespan()
-    solver = ps.SchedulingSolver(problem=flow_shop_problem)
-    solution = solver.solve()
-
-    if solution is None:
-        st.error("No feasible solution found for the given tasks.")
+    try:
+        with metrics.span('list_schedule'):
+            schedule = list_schedule(tasks, equipment_availability)
+    except ValueError as e:
+        st.error(str(e))
         return None
 
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ps.render_gantt_matplotlib(solution, fig_size=(10, 5), render_mode="Resource")
+    if engine != "Heuristic":
+        with metrics.span('solve_optimal'):
+            schedule = solve_optimal(tasks, schedule, report, budget, chart, chart_format, cancel)
+        if schedule is None:
+            st.error("No feasible solution found for the given tasks.")
+    return schedule
 
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
-    return buf
+# Function to render Gantt chart
+@metrics.timed('render_gantt_chart')
+def render_gantt_chart(schedule, tasks, chart_format="PNG", placeholder=None):
+    # drawn on the renderer's thread; a cached chart is shown without the
+    # "Rendering" message ever appearing
+    future = gantt_renderer().submit(schedule, tasks, chart_format.lower())
+    if placeholder is None:
+        placeholder = st.empty()
+        if not future.done():
+            placeholder.info("Rendering chart...")
+    with metrics.span('render_gantt_chart.wait'):
+        chart = future.result()
+    if chart_format == "Plotly":
+        placeholder.plotly_chart(chart, use_container_width=True)
+    elif chart_format == "SVG":
+        placeholder.image(chart.decode("utf-8"))
+    else:
+        placeholder.image(BytesIO(chart))
 
 # Interface to add a new task
 st.sidebar.header("Add New Task")
@@ -177,6 +268,11 @@ st.header("Task List")
 st.write(st.session_state.tasks)
 
 st.header("Gantt Chart")
-gantt_chart = render_gantt_chart(st.session_state.tasks)
-if gantt_chart:
-    st.image(gantt_chart)
+engine = st.sidebar.selectbox("Scheduling Engine", ["Heuristic", "SMT Solver"])
+chart_format = st.sidebar.selectbox("Chart Format", ["PNG", "SVG", "Plotly"])
+budget_ms = st.sidebar.number_input("Solve Budget (ms)", min_value=50, value=SOLVE_BUDGET_MS, step=50)
+cancel_solve = st.sidebar.button("Cancel Solve")
+chart = st.empty()
+schedule = schedule_tasks(st.session_state.tasks, engine, budget_ms / 1000, chart, chart_format, cancel_solve)
+if schedule is not None:
+    render_gantt_chart(schedule, st.session_state.tasks, chart_format, chart)
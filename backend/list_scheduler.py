@@ -0,0 +1,158 @@
+import heapq
+
+import numpy as np
+
+from .availability import AvailabilityIndex
+from .task_table import TaskTable
+from .timebase import TimeBase
+
+
+class ListSchedule:
+    """Result of list_schedule, in the same units as the SMT model
+    (quanta from timebase.origin)."""
+
+    def __init__(self, timebase, horizon, starts, ends, assignments):
+        self.timebase = timebase
+        self.horizon = horizon
+        self.starts = starts            # taskId -> start offset
+        self.ends = ends                # taskId -> end offset
+        self.assignments = assignments  # equipment -> [(taskId, start, end)]
+
+    @classmethod
+    def from_times(cls, timebase, task_list, starts, ends):
+        """Build from {taskId: offset} starts and ends, e.g. a solver result."""
+        assignments = {}
+        for task in sorted(task_list, key=lambda task: starts[task['taskId']]):
+            task_id = task['taskId']
+            for equip in task['equipment']:
+                assignments.setdefault(equip, []).append((task_id, starts[task_id], ends[task_id]))
+        return cls(timebase, max(ends.values(), default=0), starts, ends, assignments)
+
+
+def _fit_windows(start, duration, equipment, availability, origin, quantum):
+    # push start forward until every piece of equipment has an availability
+    # window covering [start, start + duration)
+    moved = True
+    while moved:
+        moved = False
+        for equip in equipment:
+            slot = availability.next_free_slot(equip, duration * quantum, origin + start * quantum)
+            if slot is None:
+                raise ValueError(f"No availability window on {equip} long enough for the task")
+            slot = -((origin - slot) // quantum)  # round up to a whole quantum
+            if slot > start:
+                start = slot
+                moved = True
+    return start
+
+
+def list_schedule(task_list, equipment_availability, timebase=None, availability=None):
+    """Serial list scheduling: tasks become ready once all their dependencies
+    are placed, and the ready task with the earliest release date and
+    dependency end (highest priority first on ties; equipment does not
+    count) is put at the first time its release date, dependencies,
+    equipment availability windows and every required piece of equipment's
+    previous task allow. task_list may be a TaskTable. timebase defaults
+    to minutes from the earliest task."""
+    if isinstance(task_list, TaskTable):
+        table = task_list
+    else:
+        table = TaskTable.from_tasks(task_list, equipment_availability)
+    if availability is None:
+        availability = AvailabilityIndex(equipment_availability)
+    if timebase is None:
+        timebase = TimeBase(int(table.start.min()) if len(table) else 0)
+    origin = timebase.origin
+    quantum = timebase.quantum
+    n = len(table)
+    equip_names = table.equipment_names
+
+    # whole-table column passes, then plain lists for the scalar loop below
+    releases = ((table.start - origin) // quantum).tolist()
+    durations = (-((table.start - table.end) // quantum)).tolist()
+    weights = table.priority.tolist()
+    equip_ptr, equip_idx = table.equip_ptr.tolist(), table.equip_idx.tolist()
+    equipment = [equip_idx[equip_ptr[i]:equip_ptr[i + 1]] for i in range(n)]
+    succ_ptr, succ_idx = (column.tolist() for column in table.successors())
+    missing = np.diff(table.dep_ptr).tolist()  # number of unscheduled dependencies
+
+    equip_free = [0] * len(equip_names)
+    ready_at = list(releases)  # earliest start from release date and dependencies
+    starts = [0] * n
+    ends = [0] * n
+
+    ready = [(ready_at[i], -weights[i], i) for i in range(n) if missing[i] == 0]
+    heapq.heapify(ready)
+    placed = 0
+    while ready:
+        _, _, i = heapq.heappop(ready)
+        start = ready_at[i]
+        for e in equipment[i]:
+            if equip_free[e] > start:
+                start = equip_free[e]
+        start = _fit_windows(start, durations[i], [equip_names[e] for e in equipment[i]], availability, origin, quantum)
+        end = start + durations[i]
+        for e in equipment[i]:
+            equip_free[e] = end
+        starts[i] = start
+        ends[i] = end
+        placed += 1
+
+        for j in succ_idx[succ_ptr[i]:succ_ptr[i + 1]]:
+            if end > ready_at[j]:
+                ready_at[j] = end
+            missing[j] -= 1
+            if missing[j] == 0:
+                heapq.heappush(ready, (ready_at[j], -weights[j], j))
+
+    if placed < n:
+        stuck = [table.ids[i] for i in range(n) if missing[i] > 0]
+        raise ValueError(f"Dependency cycle between tasks: {', '.join(stuck)}")
+
+    ids = table.ids
+    assignments = {equip: [] for equip in equip_names}
+    for i in sorted(range(n), key=starts.__getitem__):
+        for e in equipment[i]:
+            assignments[equip_names[e]].append((ids[i], starts[i], ends[i]))
+
+    return ListSchedule(
+        timebase=timebase,
+        horizon=max(ends, default=0),
+        starts=dict(zip(ids, starts)),
+        ends=dict(zip(ids, ends)),
+        assignments=assignments,
+    )
+
+
+def to_ps_solution(schedule, task_list, name="FlowShop"):
+    """Wrap a ListSchedule in a processscheduler SchedulingSolution so it
+    can go through ps.render_gantt_matplotlib like an SMT solution."""
+    import processscheduler as ps
+    import processscheduler.base
+    from processscheduler.solution import ResourceSolution, SchedulingSolution, TaskSolution
+
+    # building a problem makes it the active one; put the previous one back
+    active_problem = processscheduler.base.active_problem
+    problem = ps.SchedulingProblem(name=name)
+    processscheduler.base.active_problem = active_problem
+
+    names = {task['taskId']: task['taskName'] for task in task_list}
+    solution = SchedulingSolution(problem=problem, horizon=schedule.horizon, tasks={}, resources={})
+    for task in task_list:
+        task_id = task['taskId']
+        solution.add_task_solution(TaskSolution(
+            name=task['taskName'],
+            type="FixedDurationTask",
+            start=schedule.starts[task_id],
+            end=schedule.ends[task_id],
+            duration=schedule.ends[task_id] - schedule.starts[task_id],
+            scheduled=True,
+            assigned_resources=list(task['equipment']),
+        ))
+    for equip, assignments in schedule.assignments.items():
+        solution.add_resource_solution(ResourceSolution(
+            name=equip,
+            type="Worker",
+            assignments=[(names[task_id], start, end) for task_id, start, end in assignments],
+        ))
+    return solution
@@ -0,0 +1,129 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of (x, y) samples. Each sample is written twice,
+    at i and i + capacity, so the newest `size` samples are always one
+    contiguous slice and reading them never copies."""
+
+    def __init__(self, capacity, dtype=float):
+        self.capacity = capacity
+        self.x = np.zeros(2 * capacity, dtype=dtype)
+        self.y = np.zeros(2 * capacity, dtype=dtype)
+        self.head = 0  # where the next sample goes, in [0, capacity)
+        self.size = 0
+
+    def append(self, x, y):
+        self.x[self.head] = self.x[self.head + self.capacity] = x
+        self.y[self.head] = self.y[self.head + self.capacity] = y
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, xs, ys):
+        xs = np.asarray(xs)[-self.capacity:]
+        ys = np.asarray(ys)[-self.capacity:]
+        n = len(xs)
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.x[idx] = self.x[idx + self.capacity] = xs
+        self.y[idx] = self.y[idx + self.capacity] = ys
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def view(self):
+        """The buffered samples, oldest first, as views into the buffer."""
+        start = self.head + self.capacity - self.size
+        end = self.head + self.capacity
+        return self.x[start:end], self.y[start:end]
+
+
+def minmax_decimate(x, y, max_points):
+    """Keep the min and max of each bucket so spikes survive decimation;
+    returns at most max_points points."""
+    n = len(x)
+    if n <= max_points:
+        return x, y
+    buckets = max(1, max_points // 2)
+    width = -(-n // buckets)
+    usable = (n // width) * width
+    # the first partial bucket is dropped instead of the newest samples
+    xb = x[n - usable:].reshape(-1, width)
+    yb = y[n - usable:].reshape(-1, width)
+    rows = np.arange(len(yb))
+    lo = yb.argmin(axis=1)
+    hi = yb.argmax(axis=1)
+    first = np.minimum(lo, hi)
+    second = np.maximum(lo, hi)
+    # interleave so x stays increasing within each bucket
+    out_x = np.empty(2 * len(yb), dtype=x.dtype)
+    out_y = np.empty(2 * len(yb), dtype=y.dtype)
+    out_x[0::2], out_x[1::2] = xb[rows, first], xb[rows, second]
+    out_y[0::2], out_y[1::2] = yb[rows, first], yb[rows, second]
+    return out_x, out_y
+
+
+class LivePlot:
+    """Rolling-window line plot.
+
+    Samples go into a RingBuffer of `capacity` points and one Line2D is
+    updated in place with set_data. When the backend supports it, only the
+    line is redrawn over a cached background (blitting); the full figure is
+    redrawn only when the x-axis has to scroll, which happens once every
+    `capacity // 2` samples. With max_points set, the window is min/max
+    decimated to that many points before drawing, so frame cost does not
+    depend on the window length.
+    """
+
+    def __init__(self, ax, capacity, max_points=None, ylim=None, **line_kwargs):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.buffer = RingBuffer(capacity)
+        self.max_points = max_points
+        self.ylim = ylim
+        self.blit = getattr(self.canvas, 'supports_blit', False)
+        self.line, = ax.plot([], [], animated=self.blit, **line_kwargs)
+        self.background = None
+        if ylim is not None:
+            ax.set_ylim(*ylim)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        # the figure was fully redrawn (resize, scroll): cache the new background
+        if self.blit:
+            self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def append(self, x, y):
+        self.buffer.append(x, y)
+
+    def extend(self, xs, ys):
+        self.buffer.extend(xs, ys)
+
+    def _scroll(self, x):
+        # keep the window on screen, moving in half-window steps
+        lo, hi = self.ax.get_xlim()
+        first, last = x[0], x[-1]
+        if lo <= first and last <= hi:
+            return False
+        span = (last - first) * self.buffer.capacity / max(self.buffer.size - 1, 1)
+        span = span or 1.0
+        self.ax.set_xlim(first, first + 1.5 * span)
+        if self.ylim is None:
+            y = self.buffer.view()[1]
+            pad = (y.max() - y.min()) * 0.05 or 1.0
+            self.ax.set_ylim(y.min() - pad, y.max() + pad)
+        return True
+
+    def draw(self):
+        if not self.buffer.size:
+            return
+        x, y = self.buffer.view()
+        if self.max_points:
+            x, y = minmax_decimate(x, y, self.max_points)
+        self.line.set_data(x, y)
+        if self._scroll(x) or not self.blit or self.background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self.ax.draw_artist(self.line)
+            self.canvas.blit(self.ax.bbox)
+        self.canvas.flush_events()
@@ -0,0 +1,308 @@
+import functools
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import nullcontext
+
+# Process-wide instrumentation: spans timing the stages of the pipeline,
+# counters and histograms, rendered in the Prometheus text format by
+# render(). With SOLA_METRICS=0 (or enabled set to False) spans, counters
+# and observations return before reading the clock or taking a lock.
+#
+#   with metrics.span('gantt.encode'): ...
+#   @metrics.timed('tree.build')
+#   metrics.inc('sola_tasks_added_total')
+#
+# Spans go to the sola_stage_seconds histogram, labelled by stage.
+
+enabled = os.environ.get('SOLA_METRICS', '1') != '0'
+
+STAGE_SECONDS = 'sola_stage_seconds'
+STAGE_ERRORS = 'sola_stage_errors_total'
+
+
+class LatencyHistogram:
+    """Counts of latencies (seconds) in fixed buckets, Prometheus style:
+    counts[i] is the number of observations <= bounds[i], the last bucket
+    is +Inf."""
+
+    BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, bounds=BOUNDS):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (0..1)."""
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(self.bounds + [self.max], self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(bound, self.max)
+            return self.max
+
+    def snapshot(self):
+        with self.lock:
+            buckets = {str(bound): count for bound, count in zip(self.bounds + ['+Inf'], itertools.accumulate(self.counts))}
+            count, total, largest = self.count, self.sum, self.max
+        return {
+            'count': count,
+            'mean': total / count if count else 0.0,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'max': largest,
+            'buckets': buckets,
+        }
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels) + '}'
+
+
+class Registry:
+    """Counters, histograms and gauges by (name, labels)."""
+
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> LatencyHistogram
+        self.gauges = {}      # (name, labels) -> function returning the current value
+        self.help = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def histogram(self, name, **labels):
+        key = _key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def register_histogram(self, name, histogram, help=None, **labels):
+        """Export a histogram kept elsewhere (e.g. the dispatcher's)."""
+        with self.lock:
+            self.histograms[_key(name, labels)] = histogram
+            if help:
+                self.help[name] = help
+
+    def gauge(self, name, read, help=None, **labels):
+        """Export read(), called at every render."""
+        with self.lock:
+            self.gauges[_key(name, labels)] = read
+            if help:
+                self.help[name] = help
+
+    def render(self):
+        """The Prometheus text exposition format (version 0.0.4)."""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = dict(self.histograms)
+            gauges = dict(self.gauges)
+            help = dict(self.help)
+        lines = []
+
+        def header(name, kind):
+            if name in help:
+                lines.append(f"# HELP {name} {help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for kind, series in (('counter', counters), ('gauge', gauges), ('histogram', histograms)):
+            last = None
+            for (name, labels), value in sorted(series.items()):
+                if name != last:
+                    header(name, kind)
+                    last = name
+                if kind == 'counter':
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                elif kind == 'gauge':
+                    lines.append(f"{name}{_format_labels(labels)} {value()}")
+                else:
+                    with value.lock:
+                        counts, count, total = list(value.counts), value.count, value.sum
+                    bounds = [repr(float(bound)) for bound in value.bounds] + ['+Inf']
+                    for bound, cumulative in zip(bounds, itertools.accumulate(counts)):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+registry.help[STAGE_SECONDS] = "Time spent in each pipeline stage"
+registry.help[STAGE_ERRORS] = "Pipeline stages that raised"
+
+_stages = {}  # stage -> its sola_stage_seconds histogram
+_null_span = nullcontext()
+
+
+class _Span:
+    __slots__ = ('stage', 'histogram', 'started')
+
+    def __init__(self, stage, histogram):
+        self.stage = stage
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.histogram.observe(time.perf_counter() - self.started)
+        if kind is not None:
+            registry.inc(STAGE_ERRORS, stage=self.stage)
+        return False
+
+
+def span(stage):
+    """Context manager timing a stage into sola_stage_seconds{stage=...}."""
+    if not enabled:
+        return _null_span
+    histogram = _stages.get(stage)
+    if histogram is None:
+        histogram = _stages[stage] = registry.histogram(STAGE_SECONDS, stage=stage)
+    return _Span(stage, histogram)
+
+
+def timed(stage):
+    """Decorator timing every call of a function as a span."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def inc(name, value=1, **labels):
+    if enabled:
+        registry.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    if enabled:
+        registry.histogram(name, **labels).observe(value)
+
+
+def render():
+    return registry.render()
+
+
+### cProfile capture of single requests, off unless SOLA_PROFILING=1. One
+### profile runs at a time: cProfile only sees the thread it was enabled on,
+### and Python 3.12+ refuses a second active profiler.
+
+profiling = os.environ.get('SOLA_PROFILING') == '1'
+PROFILES_KEPT = 20
+profiles = OrderedDict()  # id -> (label, report text), the latest PROFILES_KEPT
+_profile_ids = itertools.count(1)
+_profiler_busy = threading.Lock()
+
+
+def start_profile():
+    """A running cProfile.Profile, or None when profiling is off or another
+    profile is running."""
+    if not profiling or not _profiler_busy.acquire(blocking=False):
+        return None
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def finish_profile(profiler, label, limit=40):
+    """Stop a profile from start_profile and keep its report (top `limit`
+    functions by cumulative time). Returns the report's id."""
+    import io
+    import pstats
+
+    try:
+        profiler.disable()
+    finally:
+        _profiler_busy.release()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+    profile_id = next(_profile_ids)
+    profiles[profile_id] = (label, out.getvalue())
+    while len(profiles) > PROFILES_KEPT:
+        profiles.popitem(last=False)
+    return profile_id
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve render() at /metrics from a daemon thread, for processes that
+    have no web app of their own (the Streamlit page)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    # Overhead of a span enabled and disabled, per call
+    #
+    #   python -m backend.metrics [calls]
+    import sys
+
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for state in (True, False):
+        enabled = state
+        started = time.perf_counter()
+        for _ in range(calls):
+            with span('bench'):
+                pass
+        elapsed = time.perf_counter() - started
+        print(f"span {'enabled ' if state else 'disabled'}: {elapsed / calls * 1e9:7.0f} ns per call")
+    started = time.perf_counter()
+    for _ in range(calls):
+        pass
+    print(f"empty loop      : {(time.perf_counter() - started) / calls * 1e9:7.0f} ns per iteration")
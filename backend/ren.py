@@ -1,8 +1,5 @@
 import json
-import processscheduler as ps
-from itertools import combinations
-from datetime import datetime, timezone
-import matplotlib.pyplot as plt
+import sys
 
 # Example JSON input
 json_input = '''
@@ -96,43 +93,46 @@ json_input = '''
 }
 '''
 
-data = json.loads(json_input)
-task_list = data['scheduler']['tasks']
-equipment_availability = data['scheduler']['equipmentAvailability']
+def solve_smt(task_list, equipment_availability):
+    ### The same problem the page solves, availability windows included
+    from .incremental import SchedulingSession
 
-### Create the scheduling problem
-flow_shop_problem = ps.SchedulingProblem(name="FlowShop")
+    return SchedulingSession(equipment_availability).solve(task_list)
 
-### Create the equipment (workers)
-workers = {equip: ps.Worker(name=equip) for equip in equipment_availability.keys()}
+def main(argv):
+    ### The solvers and matplotlib are loaded here, so importing this module costs nothing
+    import processscheduler as ps
+    from .decompose import solve_decomposed
+    from .list_scheduler import list_schedule, to_ps_solution
 
-### Create tasks and assign resources
-tasks = {}
-for task in task_list:
-    task_id = task['taskId']
-    start_time = datetime.fromisoformat(task['startTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
-    end_time = datetime.fromisoformat(task['endTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
-    duration = int((end_time - start_time).total_seconds() / 3600)  # Convert duration to integer
-    tasks[task_id] = ps.FixedDurationTask(name=task['taskName'], duration=duration)
-    for equip in task['equipment']:
-        tasks[task_id].add_required_resource(workers[equip])
+    ### An instance file (e.g. from workload.py) replaces the built-in one: python -m backend.ren engine file.json
+    text = json_input
+    if len(argv) > 1:
+        with open(argv[1]) as f:
+            text = f.read()
 
-### Constraint: release dates (start times)
-base_date = datetime(2024, 6, 23, tzinfo=timezone.utc)
-for task in task_list:
-    start_time = datetime.fromisoformat(task['startTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
-    start_time_offset = int((start_time - base_date).total_seconds() / 3600)  # Convert start_time to integer
-    ps.TaskStartAfter(task=tasks[task['taskId']], value=start_time_offset)
+    data = json.loads(text)
+    task_list = data['scheduler']['tasks']
+    equipment_availability = data['scheduler']['equipmentAvailability']
 
-### Constraint: dependencies (precedences)
-for task in task_list:
-    for dep in task['dependencies']:
-        ps.TaskPrecedence(task_before=tasks[dep], task_after=tasks[task['taskId']])
+    ### Pick the engine: "heuristic" list scheduling (milliseconds), the "smt" solver (optimal)
+    ### or "components": the SMT solver on each independent group of tasks in its own process
+    engine = argv[0] if argv else "smt"
 
-### Add a makespan objective
-makespan_obj = ps.ObjectiveMinimizeMakespan()
+    if engine == "heuristic":
+        solution = to_ps_solution(list_schedule(task_list, equipment_availability), task_list)
+    elif engine == "components":
+        schedule = solve_decomposed(task_list, equipment_availability)
+        solution = to_ps_solution(schedule, task_list) if schedule is not None else None
+    else:
+        solution = solve_smt(task_list, equipment_availability)
+    if not solution:
+        print("No feasible solution", file=sys.stderr)
+        return 1
 
-### Solve and render the Gantt chart
-solver = ps.SchedulingSolver(problem=flow_shop_problem)
-solution = solver.solve()
-ps.render_gantt_matplotlib(solution, fig_size=(10, 5), render_mode="Resource")
+    ### Render the Gantt chart
+    ps.render_gantt_matplotlib(solution, fig_size=(10, 5), render_mode="Resource")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,431 @@
+import heapq
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
+from .availability import AvailabilityIndex
+from .task_table import PRIORITY_WEIGHTS
+from .timebase import QUANTUM, TimeBase, to_epoch
+
+# Weight of an urgent insertion, above every priority a task can have
+URGENT_WEIGHT = max(PRIORITY_WEIGHTS.values()) + 1
+
+
+class _SortedList:
+    """Sorted items kept in buckets of at most 2 * LOAD, so adding or
+    removing one costs a bisect and a short list shift whatever the length
+    (the layout of sortedcontainers' SortedList, with just what the plan
+    needs)."""
+
+    LOAD = 500
+
+    def __init__(self):
+        self.lists = []  # buckets, each sorted, all of lists[i] <= all of lists[i + 1]
+        self.maxes = []  # last item of each bucket
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, item):
+        lists, maxes = self.lists, self.maxes
+        self.size += 1
+        if not maxes:
+            lists.append([item])
+            maxes.append(item)
+            return
+        k = bisect_right(maxes, item)
+        if k == len(maxes):
+            k -= 1
+            lists[k].append(item)
+            maxes[k] = item
+        else:
+            insort(lists[k], item)
+        if len(lists[k]) > 2 * self.LOAD:
+            bucket = lists[k]
+            lists[k:k + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            maxes[k:k + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+
+    def remove(self, item):
+        lists, maxes = self.lists, self.maxes
+        k = bisect_left(maxes, item)
+        bucket = lists[k]
+        del bucket[bisect_left(bucket, item)]
+        self.size -= 1
+        if bucket:
+            maxes[k] = bucket[-1]
+        else:
+            del lists[k], maxes[k]
+
+    def around(self, key):
+        """(last item < key, first item >= key), None where there is none."""
+        maxes = self.maxes
+        k = bisect_left(maxes, key)
+        if k == len(maxes):
+            return (maxes[-1] if maxes else None), None
+        bucket = self.lists[k]
+        i = bisect_left(bucket, key)
+        return (bucket[i - 1] if i else maxes[k - 1] if k else None), bucket[i]
+
+    def irange(self, key):
+        """Items >= key, in order."""
+        k = bisect_left(self.maxes, key)
+        if k == len(self.lists):
+            return
+        bucket = self.lists[k]
+        yield from bucket[bisect_left(bucket, key):]
+        for k in range(k + 1, len(self.lists)):
+            yield from self.lists[k]
+
+
+class _Timeline:
+    """Planned intervals of one piece of equipment as sorted (start,
+    taskId, end)."""
+
+    def __init__(self):
+        self.intervals = _SortedList()
+
+    def add(self, task_id, start, end):
+        self.intervals.add((start, task_id, end))
+
+    def remove(self, task_id, start, end):
+        self.intervals.remove((start, task_id, end))
+
+    def conflict_end(self, start, end):
+        # end of an interval overlapping [start, end), or None if it is free;
+        # (start + 1,) sorts after every interval starting at or before start
+        previous, following = self.intervals.around((start + 1,))
+        if previous is not None and previous[2] > start:
+            return previous[2]
+        if following is not None and following[0] < end:
+            return following[2]
+        return None
+
+
+class InsertResult:
+    def __init__(self, task_id, start, end, moved, window, latency):
+        self.task_id = task_id
+        self.start = start
+        self.end = end
+        self.moved = moved      # taskId -> (old start, new start) of every other task that moved
+        self.window = window    # number of tasks re-planned around the insertion
+        self.latency = latency  # seconds
+
+
+class RollingScheduler:
+    """Keeps a day's plan and fits new tasks into it as they arrive,
+    without solving the day again.
+
+    Tasks that have started, or start within freeze seconds of now, are
+    committed and never move. An ordinary insertion goes into the first gap
+    its equipment, dependencies and release time allow. An urgent insertion
+    also takes back the uncommitted tasks of the next window seconds (at
+    most max_window of them) and places them again after it, highest
+    priority first, so it preempts lower-priority work in that window;
+    later tasks only move if a moved task now overlaps a successor. The
+    work per insertion depends on the window, not on the length of the
+    plan.
+
+    Without equipment_availability every piece of equipment is always
+    available. Offsets are quanta from the first task loaded.
+    """
+
+    def __init__(self, equipment_availability=None, freeze=15 * 60, window=2 * 3600, max_window=64, quantum=QUANTUM):
+        self.availability = AvailabilityIndex(equipment_availability) if equipment_availability else None
+        self.freeze = freeze
+        self.window = window
+        self.max_window = max_window
+        self.quantum = quantum
+        self.timebase = None
+        self.tasks = {}         # taskId -> task dict
+        self.plan = {}          # taskId -> (start, end) offsets
+        self.releases = {}      # taskId -> earliest start offset
+        self.weights = {}       # taskId -> priority weight
+        self.successors = {}    # taskId -> set of taskIds depending on it
+        self.timelines = {}     # equipment -> _Timeline
+        self.by_start = _SortedList()  # (start, taskId) of every planned task
+        self.latencies = deque(maxlen=1000)
+
+    def __len__(self):
+        return len(self.plan)
+
+    def __contains__(self, task_id):
+        return task_id in self.plan
+
+    def to_epoch(self, offset):
+        return self.timebase.to_epoch(offset)
+
+    def _now(self, now):
+        return self.timebase.offset(int(time.time() if now is None else now))
+
+    def _register(self, task, weight=None):
+        task_id = task['taskId']
+        if self.timebase is None:
+            self.timebase = TimeBase(to_epoch(task['startTime']), self.quantum)
+        release, duration = self.timebase.task_times(task)
+        self.tasks[task_id] = task
+        self.releases[task_id] = release
+        self.weights[task_id] = PRIORITY_WEIGHTS.get(task.get('priority'), 0) if weight is None else weight
+        for dep in task['dependencies']:
+            self.successors.setdefault(dep, set()).add(task_id)
+        return duration
+
+    def _earliest(self, task_id, after):
+        # dependencies that are not in the plan (unknown or deleted) don't hold a task back
+        start = max(after, self.releases[task_id])
+        for dep in self.tasks[task_id]['dependencies']:
+            if dep in self.plan:
+                start = max(start, self.plan[dep][1])
+        return start
+
+    def _fit(self, task_id, start):
+        # first start >= start where all of the task's equipment is free
+        # in the plan and inside an availability window
+        task = self.tasks[task_id]
+        duration = self._duration(task_id)
+        moved = True
+        while moved:
+            moved = False
+            for equip in task['equipment']:
+                timeline = self.timelines.get(equip)
+                if timeline is not None:
+                    end = timeline.conflict_end(start, start + duration)
+                    if end is not None:
+                        start = end
+                        moved = True
+                if self.availability is not None:
+                    slot = self.availability.next_free_slot(equip, duration * self.quantum, self.to_epoch(start))
+                    if slot is None:
+                        raise ValueError(f"No availability window on {equip} long enough for task {task_id}")
+                    slot = self.timebase.offset_ceil(slot)
+                    if slot > start:
+                        start = slot
+                        moved = True
+        return start
+
+    def _duration(self, task_id):
+        return self.timebase.task_times(self.tasks[task_id])[1]
+
+    def _place(self, task_id, start):
+        end = start + self._duration(task_id)
+        for equip in self.tasks[task_id]['equipment']:
+            self.timelines.setdefault(equip, _Timeline()).add(task_id, start, end)
+        self.plan[task_id] = (start, end)
+        self.by_start.add((start, task_id))
+
+    def _unplace(self, task_id):
+        start, end = self.plan.pop(task_id)
+        for equip in self.tasks[task_id]['equipment']:
+            self.timelines[equip].remove(task_id, start, end)
+        self.by_start.remove((start, task_id))
+        return start
+
+    def load(self, task_list, now=None):
+        """Plan a list of tasks around what is already planned, in dependency
+        order, each at the first gap after its release time and, as in
+        insert, not before now (epoch seconds). With now None the release
+        time alone counts, to rebuild a stored plan. A taskId already in
+        the plan is replaced; a task whose dependencies lead back to it is
+        left out. Returns the taskIds planned."""
+        batch = []
+        for task in task_list:
+            task_id = task['taskId']
+            if task_id in self.tasks:
+                self.remove(task_id)
+            # checked against the tasks registered so far, so a cycle is cut
+            # at whichever of its tasks comes last
+            if not self._depends_on(task['dependencies'], task_id):
+                self._register(task)
+                batch.append(task)
+        floor = None if now is None or self.timebase is None else self._now(now)
+        known = {task['taskId'] for task in batch}
+        missing = {task['taskId']: sum(dep in known for dep in task['dependencies']) for task in batch}
+        ready = [(self.releases[task_id], -self.weights[task_id], task_id) for task_id, n in missing.items() if n == 0]
+        heapq.heapify(ready)
+        planned = []
+        while ready:
+            _, _, task_id = heapq.heappop(ready)
+            after = self.releases[task_id] if floor is None else floor
+            self._place(task_id, self._fit(task_id, self._earliest(task_id, after)))
+            planned.append(task_id)
+            for succ in self.successors.get(task_id, ()):
+                if succ in missing:
+                    missing[succ] -= 1
+                    if missing[succ] == 0:
+                        heapq.heappush(ready, (self._earliest(succ, 0), -self.weights[succ], succ))
+        return planned
+
+    def _forget(self, task_id):
+        task = self.tasks.pop(task_id)
+        del self.releases[task_id], self.weights[task_id]
+        for dep in task['dependencies']:
+            self.successors.get(dep, set()).discard(task_id)
+
+    def remove(self, task_id):
+        """Drop a task from the plan. Its slot stays free; nothing moves up."""
+        if task_id not in self.tasks:
+            return False
+        if task_id in self.plan:
+            self._unplace(task_id)
+        self._forget(task_id)
+        return True
+
+    def _depends_on(self, dependencies, task_id):
+        # does one of dependencies depend on task_id, directly or through
+        # other tasks?
+        dependencies = set(dependencies)
+        if task_id in dependencies:
+            return True
+        seen = {task_id}
+        stack = [task_id]
+        while stack:
+            for succ in self.successors.get(stack.pop(), ()):
+                if succ in dependencies:
+                    return True
+                if succ not in seen:
+                    seen.add(succ)
+                    stack.append(succ)
+        return False
+
+    def insert(self, task, urgent=False, now=None):
+        """Add task to the plan (replacing a task with the same taskId) and
+        return an InsertResult. now is epoch seconds, default the clock.
+        Raises ValueError if the task can't be placed or its dependencies
+        lead back to it; the plan is then unchanged."""
+        started = time.perf_counter()
+        task_id = task['taskId']
+        if self._depends_on(task['dependencies'], task_id):
+            raise ValueError(f"Dependency cycle: task {task_id} depends on itself")
+        replaced = None
+        if task_id in self.tasks:
+            replaced = self.tasks[task_id], self.weights[task_id], self.plan.get(task_id)
+            self.remove(task_id)
+        self._register(task, URGENT_WEIGHT if urgent else None)
+        now = self._now(now)
+        committed = now + self.timebase.length(self.freeze)
+
+        # the uncommitted tasks of the window, taken out of the plan
+        window = []
+        if urgent:
+            horizon = committed + self.timebase.length(self.window)
+            for start, other in self.by_start.irange((committed, '')):
+                if start >= horizon or len(window) == self.max_window:
+                    break
+                window.append(other)
+        try:
+            try:
+                before = self._try_insert(task_id, window, now, committed)
+            except ValueError:
+                if not window:
+                    raise
+                # preempting pushed a task out of its availability windows; the
+                # urgent task still gets the first gap there is
+                window = []
+                before = self._try_insert(task_id, window, now, committed)
+        except ValueError:
+            self._forget(task_id)
+            if replaced is not None:
+                # the replaced task goes back where it was
+                old_task, weight, placed = replaced
+                self._register(old_task, weight)
+                if placed is not None:
+                    self._place(task_id, placed[0])
+            raise
+
+        moved = {other: (start, self.plan[other][0]) for other, start in before.items()
+                 if self.plan[other][0] != start}
+        start, end = self.plan[task_id]
+        latency = time.perf_counter() - started
+        self.latencies.append(latency)
+        return InsertResult(task_id, start, end, moved, len(window), latency)
+
+    def _try_insert(self, task_id, window, now, committed):
+        # place task_id and re-place window; returns {taskId: old start} of
+        # every task that was taken out, or raises ValueError with the plan
+        # as it was
+        before = {other: self.plan[other][0] for other in window}
+        for other in window:
+            self._unplace(other)
+        try:
+            self._replan(task_id, window, now, committed)
+            # successors beyond the window that now overlap a moved task
+            self._push_successors([task_id] + window, before)
+        except ValueError:
+            for other in [task_id, *before]:
+                if other in self.plan:
+                    self._unplace(other)
+            for other, start in before.items():
+                self._place(other, start)
+            raise
+        return before
+
+    def _replan(self, task_id, window, now, committed):
+        # the new task first, at or after now; then the window, highest
+        # priority first among tasks whose dependencies are placed
+        self._place(task_id, self._fit(task_id, self._earliest(task_id, now)))
+        pending = set(window)
+        missing = {other: sum(dep in pending for dep in self.tasks[other]['dependencies']) for other in window}
+        ready = [(-self.weights[other], self.releases[other], other) for other in window if missing[other] == 0]
+        heapq.heapify(ready)
+        while ready:
+            _, _, other = heapq.heappop(ready)
+            self._place(other, self._fit(other, self._earliest(other, committed)))
+            for succ in self.successors.get(other, ()):
+                if succ in missing:
+                    missing[succ] -= 1
+                    if missing[succ] == 0:
+                        heapq.heappush(ready, (-self.weights[succ], self.releases[succ], succ))
+
+    def _push_successors(self, task_ids, before):
+        queue = deque(task_ids)
+        while queue:
+            task_id = queue.popleft()
+            end = self.plan[task_id][1]
+            for succ in self.successors.get(task_id, ()):
+                if succ in self.plan and self.plan[succ][0] < end:
+                    old = self._unplace(succ)
+                    before.setdefault(succ, old)
+                    self._place(succ, self._fit(succ, self._earliest(succ, old)))
+                    queue.append(succ)
+
+if __name__ == '__main__':
+    import json
+    import os
+    import random
+    import sys
+
+    # Urgent insertion latency against the length of the plan: one 10-30 min
+    # task per machine every 40 minutes, chains of four, then urgent tasks
+    # arriving at random times.
+    #
+    #   python -m backend.rolling [inserts]
+    inserts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'JSON.json')) as f:
+        equipment = list(json.load(f)['scheduler']['equipmentAvailability'])
+    day = 1719129600  # 2024-06-23T08:00:00Z
+
+    def stamp(epoch):
+        return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+    for num_tasks in (1_000, 10_000, 100_000):
+        rng = random.Random(0)
+        tasks = []
+        for i in range(num_tasks):
+            start = day + (i // len(equipment)) * 2400
+            tasks.append({"taskId": f"T{i:06d}", "taskName": f"Task {i}", "startTime": stamp(start),
+                          "endTime": stamp(start + rng.choice((10, 20, 30)) * 60),
+                          "equipment": [equipment[i % len(equipment)]], "priority": rng.choice(list(PRIORITY_WEIGHTS)),
+                          "dependencies": [f"T{i - len(equipment):06d}"] if i % 4 and i >= len(equipment) else []})
+        rolling = RollingScheduler()
+        started = time.perf_counter()
+        rolling.load(tasks)
+        load_time = time.perf_counter() - started
+        span = rolling.plan[max(rolling.plan, key=lambda task_id: rolling.plan[task_id][1])][1] * 60
+        for k in range(inserts):
+            now = day + rng.randrange(span)
+            rolling.insert({"taskId": f"U{k:04d}", "taskName": f"Urgent {k}", "startTime": stamp(now),
+                            "endTime": stamp(now + 20 * 60), "equipment": rng.sample(equipment, 2),
+                            "priority": "High", "dependencies": []}, urgent=True, now=now)
+        latencies = sorted(rolling.latencies)
+        print(f"{num_tasks:7d} tasks: load {load_time:6.2f}s, urgent insert p50 {latencies[len(latencies) // 2] * 1e3:6.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:6.2f} ms, max {latencies[-1] * 1e3:6.2f} ms")
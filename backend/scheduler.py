@@ -1,24 +1,97 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
 import json
-from datetime import datetime, timezone
+import os
+import threading
+import time
+from . import metrics
+from .change_log import ChangeLog, PacketJSON
+from .dispatch import Dispatcher
+from .rolling import RollingScheduler
+from .task_store import open_store
+from .timebase import parse_datetime as parse_time
 
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# snapshot pages are emitted pre-encoded, see ChangeLog.snapshot
+socketio = SocketIO(app, cors_allowed_origins="*", json=PacketJSON)
 scheduler = BackgroundScheduler()
+
+# 'memory' (default) or 'sqlite:///path/to/tasks.db'
+store = open_store(os.environ.get('SOLA_TASK_STORE', 'memory'))
+
+def serialize_task(record):
+    # Convert datetime objects to strings before emitting
+    task_copy = record.copy()
+    task_copy['startTime'] = task_copy['startTime'].isoformat()
+    task_copy['endTime'] = task_copy['endTime'].isoformat()
+    return task_copy
+
+# Every mutation is serialized once here and shared by all clients
+changes = ChangeLog({task_id: serialize_task(record) for task_id, record in store.all().items()},
+                    size=int(os.environ.get('SOLA_CHANGE_LOG_SIZE', '10000')))
+write_lock = threading.Lock()  # keeps store, change log and plan in the same order
+
+# The day's plan, kept up to date as tasks arrive instead of being re-solved.
+# Tasks starting within SOLA_FREEZE_MINUTES are committed; an urgent task
+# re-plans at most the next SOLA_REPLAN_WINDOW_MINUTES after that.
+rolling = RollingScheduler(freeze=int(os.environ.get('SOLA_FREEZE_MINUTES', '15')) * 60,
+                           window=int(os.environ.get('SOLA_REPLAN_WINDOW_MINUTES', '120')) * 60)
+rolling.load([dict(task, taskId=task_id) for task_id, task in changes.tasks.items()])
+
+# Planned starts fire 'dispatch' events to the worker connections that
+# registered for the task's equipment; APScheduler turns the timing wheel
+dispatcher = Dispatcher(socketio, tick=float(os.environ.get('SOLA_DISPATCH_TICK', '0.05')))
+scheduler.add_job(dispatcher.tick, 'interval', seconds=dispatcher.wheel.tick, id='dispatch',
+                  max_instances=1, coalesce=True)
 scheduler.start()
 
-tasks = {}
-workers = {}
+def dispatch_planned(task_ids):
+    for task_id in task_ids:
+        if task_id not in rolling.plan:
+            continue  # left out of the plan (dependency cycle)
+        # the plan counts whole minutes; a task never goes out before its startTime
+        task = changes.tasks[task_id]
+        due = max(rolling.to_epoch(rolling.plan[task_id][0]), parse_time(task['startTime']).timestamp())
+        dispatcher.schedule(task_id, due, dict(task, taskId=task_id))
 
-def add_task(task_id, task_data):
-    start_time = datetime.fromisoformat(task_data['startTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
-    end_time = datetime.fromisoformat(task_data['endTime'].replace('Z', '+00:00')).astimezone(timezone.utc)
-    duration = int((end_time - start_time).total_seconds() / 3600)  # Convert duration to integer
-    tasks[task_id] = {
+# tasks still running or to come
+dispatch_planned([task_id for task_id, (_, end) in rolling.plan.items() if rolling.to_epoch(end) > time.time()])
+
+# Exported at /metrics along with the stage spans and request timings
+metrics.registry.gauge('sola_tasks_stored', lambda: len(changes.tasks), "Tasks in the store")
+metrics.registry.gauge('sola_dispatch_scheduled', lambda: len(dispatcher.wheel), "Tasks waiting for their start")
+metrics.registry.register_histogram('sola_dispatch_lateness_seconds', dispatcher.lateness,
+                                    "Dispatch time after the planned start")
+metrics.registry.register_histogram('sola_dispatch_ack_seconds', dispatcher.ack, "Worker acknowledgement delay")
+metrics.registry.help['sola_http_request_seconds'] = "Request handling time by route"
+metrics.registry.help['sola_http_requests_total'] = "Requests by route and status"
+
+def planned_times(task_ids):
+    return {task_id: {"plannedStart": rolling.timebase.to_datetime(rolling.plan[task_id][0]).isoformat(),
+                      "plannedEnd": rolling.timebase.to_datetime(rolling.plan[task_id][1]).isoformat()}
+            for task_id in task_ids}
+
+REQUIRED_FIELDS = ('taskId', 'taskName', 'startTime', 'endTime', 'equipment', 'assignedTo', 'priority', 'dependencies')
+
+def build_record(task_data):
+    # Validate one incoming task and turn it into a store record, raises ValueError
+    if not isinstance(task_data, dict):
+        raise ValueError("task must be a JSON object")
+    missing = [field for field in REQUIRED_FIELDS if field not in task_data]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+    try:
+        start_time = parse_time(task_data['startTime'])
+        end_time = parse_time(task_data['endTime'])
+    except (AttributeError, ValueError):
+        raise ValueError("startTime/endTime must be ISO 8601 timestamps")
+    if end_time < start_time:
+        raise ValueError("endTime is before startTime")
+    duration = -(-int((end_time - start_time).total_seconds()) // 60)  # Duration in whole minutes
+    return {
         "taskName": task_data['taskName'],
         "startTime": start_time,
         "endTime": end_time,
@@ -28,36 +101,261 @@ def add_task(task_id, task_data):
         "priority": task_data['priority'],
         "dependencies": task_data['dependencies']
     }
-    # Convert datetime objects to strings before emitting
-    task_copy = tasks[task_id].copy()
-    task_copy['startTime'] = task_copy['startTime'].isoformat()
-    task_copy['endTime'] = task_copy['endTime'].isoformat()
-    # Emit task added event
-    socketio.emit('task_added', {'task_id': task_id, 'task': task_copy})
+
+class AddBroadcaster:
+    """Coalesces task additions into one 'tasks_added' event per window
+    seconds, so a burst of single POSTs costs the clients one chart rebuild."""
+
+    def __init__(self, socketio, window):
+        self.socketio = socketio
+        self.window = window
+        self.pending = {}
+        self.pending_seq = 0
+        self.scheduled = False
+        self.lock = threading.Lock()
+
+    def add(self, tasks, seq):
+        with self.lock:
+            self.pending.update(tasks)
+            self.pending_seq = seq
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self.socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        self.socketio.sleep(self.window)
+        self.flush()
+
+    def flush(self):
+        # Also called before any other event so clients see changes in order
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            seq = self.pending_seq
+            self.scheduled = False
+        if pending:
+            with metrics.span('emit.tasks_added'):
+                self.socketio.emit('tasks_added', {'seq': seq, 'tasks': pending})
+
+broadcaster = AddBroadcaster(socketio, float(os.environ.get('SOLA_BROADCAST_WINDOW', '0.1')))
+
+@metrics.timed('add_task')
+def add_task(task_id, task_data):
+    record = build_record(task_data)
+    task = serialize_task(record)
+    with write_lock:
+        # Fit the task into the plan first, so a task that can't be placed
+        # (or closes a dependency cycle) is not stored either
+        with metrics.span('add_task.plan'):
+            rolling.insert(dict(task, taskId=task_id))
+        with metrics.span('add_task.store'):
+            store.add(task_id, record)
+            seq = changes.record([(task_id, task)])
+        dispatch_planned([task_id])
+    # Broadcast with the next coalesced tasks_added event
+    broadcaster.add({task_id: task}, seq)
+    metrics.inc('sola_tasks_added_total')
+
+def add_tasks(items):
+    # Validate everything first so a bad item leaves the store untouched
+    records = []
+    errors = []
+    seen = set()
+    for i, task_data in enumerate(items):
+        try:
+            record = build_record(task_data)
+        except ValueError as e:
+            errors.append({"index": i, "error": str(e)})
+            continue
+        task_id = task_data['taskId']
+        if task_id in seen:
+            errors.append({"index": i, "error": f"duplicate taskId {task_id}"})
+            continue
+        seen.add(task_id)
+        records.append((task_id, record))
+    if errors:
+        return None, errors
+    tasks = {task_id: serialize_task(record) for task_id, record in records}
+    with write_lock:
+        store.add_many(records)
+        seq = changes.record(tasks.items())
+        # planned like a single POST: from now on, not back at a past startTime
+        rolling.load([dict(task, taskId=task_id) for task_id, task in tasks.items()], now=time.time())
+        dispatch_planned(tasks)
+    broadcaster.flush()
+    socketio.emit('tasks_added', {'seq': seq, 'tasks': tasks})
+    return [task_id for task_id, _ in records], []
+
+def add_urgent_task(task_id, task_data):
+    # Fit the task into the plan first, so a task that can't be placed is
+    # not stored either
+    record = build_record(task_data)
+    task = serialize_task(record)
+    with write_lock:
+        result = rolling.insert(dict(task, taskId=task_id), urgent=True)
+        store.add(task_id, record)
+        seq = changes.record([(task_id, task)])
+        dispatch_planned([task_id, *result.moved])
+    broadcaster.flush()
+    socketio.emit('tasks_added', {'seq': seq, 'tasks': {task_id: task}})
+    socketio.emit('schedule_updated', {'seq': seq, 'plan': planned_times([task_id, *result.moved])})
+    return result
 
 @app.route('/tasks', methods=['POST'])
 def add_task_route():
     task_data = request.json
     task_id = task_data['taskId']
-    add_task(task_id, task_data)
+    try:
+        add_task(task_id, task_data)
+    except ValueError as e:
+        return jsonify({"status": "Invalid task", "error": str(e)}), 400
     return jsonify({"status": "Task added", "task_id": task_id}), 200
 
+@app.route('/tasks/urgent', methods=['POST'])
+def add_urgent_task_route():
+    task_data = request.json
+    task_id = task_data['taskId']
+    try:
+        result = add_urgent_task(task_id, task_data)
+    except ValueError as e:
+        return jsonify({"status": "Invalid task", "error": str(e)}), 400
+    return jsonify({
+        "status": "Urgent task scheduled",
+        "task_id": task_id,
+        **planned_times([task_id])[task_id],
+        "moved": planned_times(result.moved),
+        "replanned": result.window,
+        "latency_ms": round(result.latency * 1000, 3),
+    }), 200
+
+@app.route('/tasks:batch', methods=['POST'])
+def add_tasks_route():
+    # Body is a JSON array of tasks or NDJSON (one task per line)
+    body = request.get_data(as_text=True)
+    try:
+        if body.lstrip().startswith('['):
+            items = json.loads(body)
+        else:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+    except json.JSONDecodeError as e:
+        return jsonify({"status": "Invalid JSON", "error": str(e)}), 400
+    task_ids, errors = add_tasks(items)
+    if errors:
+        return jsonify({"status": "No tasks added", "errors": errors}), 400
+    return jsonify({"status": "Tasks added", "task_ids": task_ids}), 200
+
+@app.route('/tasks', methods=['GET'])
+def query_tasks_route():
+    # e.g. /tasks?start=2024-06-23T09:00:00Z&end=2024-06-23T12:00:00Z&equipment=Centrifuge
+    start = request.args.get('start')
+    end = request.args.get('end')
+    if start:
+        start = parse_time(start)
+    if end:
+        end = parse_time(end)
+    matches = store.query(start=start or None, end=end or None,
+                          equipment=request.args.get('equipment'),
+                          assigned_to=request.args.get('assignedTo'))
+    return jsonify({task_id: changes.tasks[task_id] for task_id in matches}), 200
+
 @app.route('/tasks/<task_id>', methods=['DELETE'])
+@metrics.timed('delete_task')
 def delete_task_route(task_id):
-    if task_id in tasks:
-        del tasks[task_id]
+    with write_lock:
+        with metrics.span('delete_task.store'):
+            deleted = store.delete(task_id)
+        if deleted:
+            seq = changes.record([(task_id, None)])
+            with metrics.span('delete_task.plan'):
+                rolling.remove(task_id)
+                dispatcher.cancel(task_id)
+    if deleted:
+        # Pending additions go out first, or a client could re-add this task
+        broadcaster.flush()
         # Emit task deleted event
-        socketio.emit('task_deleted', {'task_id': task_id})
+        with metrics.span('emit.task_deleted'):
+            socketio.emit('task_deleted', {'seq': seq, 'task_id': task_id})
+        metrics.inc('sola_tasks_deleted_total')
         return jsonify({"status": "Task deleted"}), 200
     return jsonify({"status": "Task not found"}), 404
 
 @socketio.on('connect')
-def handle_connect():
-    emit('tasks', tasks)
+def handle_connect(auth=None):
+    # Clients send {'since': last seen seq, 'epoch': server epoch} to
+    # receive only what changed while they were away
+    broadcaster.flush()
+    auth = auth or {}
+    delta = None
+    if isinstance(auth.get('since'), int):
+        delta = changes.since(auth['since'], auth.get('epoch'))
+    if delta is not None:
+        emit('tasks_delta', delta)
+        return
+    _, pages = changes.snapshot()
+    for page in pages:
+        emit('tasks_snapshot', page)
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    pass
+    dispatcher.unregister(request.sid)
+
+@socketio.on('register_worker')
+def handle_register_worker(data=None):
+    # A robot or instrument controller: {'equipment': [...]} it can run
+    # tasks on, none for any task. It then receives 'dispatch' events, acks
+    # them, and reports 'task_done' {'taskId'} when finished.
+    dispatcher.register(request.sid, (data or {}).get('equipment', ()))
+    return {'status': 'registered'}
+
+@socketio.on('task_done')
+def handle_task_done(data):
+    return {'status': 'ok' if dispatcher.complete(request.sid, data.get('taskId')) else 'unknown task'}
+
+@app.route('/dispatch/stats', methods=['GET'])
+def dispatch_stats_route():
+    # Queue sizes and lateness / overhead / ack latency histograms
+    return jsonify(dispatcher.stats()), 200
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    # ?profile=1 captures a cProfile report of this request when the server
+    # runs with SOLA_PROFILING=1; the response names it in X-Profile-Id
+    if request.args.get('profile') == '1':
+        g.profiler = metrics.start_profile()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.observe('sola_http_request_seconds', time.perf_counter() - g.request_started,
+                    method=request.method, route=route)
+    metrics.inc('sola_http_requests_total', method=request.method, route=route, status=response.status_code)
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        response.headers['X-Profile-Id'] = str(metrics.finish_profile(profiler, f"{request.method} {request.path}"))
+    return response
+
+@app.teardown_request
+def finish_request_profile(error=None):
+    # after_request is skipped when a handler raises and the exception
+    # propagates; the profile still has to end or profiling stays taken
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        metrics.finish_profile(profiler, f"{request.method} {request.path} (failed)")
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/profiles', methods=['GET'])
+def profiles_route():
+    return jsonify({profile_id: label for profile_id, (label, _) in metrics.profiles.items()}), 200
+
+@app.route('/metrics/profiles/<int:profile_id>', methods=['GET'])
+def profile_route(profile_id):
+    if profile_id not in metrics.profiles:
+        return jsonify({"status": "Profile not found"}), 404
+    return Response(metrics.profiles[profile_id][1], mimetype='text/plain')
 
 if __name__ == '__main__':
     socketio.run(app, debug=True)
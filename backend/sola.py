@@ -0,0 +1,229 @@
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+
+# Command line entry points. Each command imports what it needs when it
+# runs, so validate, tree and the heuristic solve never load
+# processscheduler, z3 or matplotlib, and importing this module runs
+# nothing.
+#
+#   sola solve plan.json [--engine heuristic|smt|components] [--budget MS] [--chart gantt.png]
+#   sola validate plan.json
+#   sola tree plan.json [--json]
+#   sola generate 100 [--equipment 8] [--depth 6] [--seed 0] > plan.json
+#   sola check-imports [--budget-ms 250]
+#
+# Run as `python -m backend ...` from the repository root, or
+# `pipenv run sola ...`. A plan file is the
+# {"scheduler": {"tasks", "equipmentAvailability"}} JSON the apps use;
+# '-' reads it from stdin.
+
+HEAVY_MODULES = ('processscheduler', 'z3', 'matplotlib', 'streamlit', 'flask')
+
+# import paths that must stay light: what they import, in a fresh interpreter
+LIGHT_PATHS = {
+    'cli': 'import backend.sola',
+    'validate': 'import backend.validation',
+    'heuristic solve': 'import backend.list_scheduler',
+    'behavior tree': 'import backend.binaryTree',
+    'workload': 'import backend.workload',
+    'charts (digest, plotly)': 'import backend.gantt',
+    'anytime driver': 'import backend.anytime, backend.decompose, backend.solution_cache',
+}
+
+
+def load_plan(path):
+    """(tasks, equipment availability) from a plan file."""
+    if path == '-':
+        data = json.load(sys.stdin)
+    else:
+        with open(path) as f:
+            data = json.load(f)
+    return data['scheduler']['tasks'], data['scheduler']['equipmentAvailability']
+
+
+def _report_errors(report):
+    for message in report.errors():
+        print(message, file=sys.stderr)
+
+
+def validate(args):
+    from .validation import validate_plan
+
+    tasks, availability = load_plan(args.plan)
+    report = validate_plan(tasks, availability)
+    if not report.ok:
+        _report_errors(report)
+        return 1
+    quantum = report.timebase.quantum
+    print(f"{len(tasks)} tasks ok; makespan at least {report.lower_bound * quantum // 60} min")
+    print(f"critical path: {' -> '.join(report.critical_path)}")
+    return 0
+
+
+def solve(args):
+    from .list_scheduler import list_schedule
+    from .validation import validate_plan
+
+    tasks, availability = load_plan(args.plan)
+    report = validate_plan(tasks, availability)
+    if not report.ok:
+        _report_errors(report)
+        return 1
+    schedule = list_schedule(tasks, availability)
+    status = "heuristic"
+    if args.engine == 'smt':
+        from .anytime import AnytimeSolve
+        from .incremental import SchedulingSession
+
+        budget = args.budget / 1000 if args.budget else None
+        # processscheduler reports on stdout, which is for the schedule
+        with contextlib.redirect_stdout(sys.stderr):
+            job = AnytimeSolve(SchedulingSession(availability), tasks, schedule, report, budget=budget)
+            schedule = job.result()
+            job.join()
+        if job.error is not None:
+            raise job.error
+        if job.infeasible:
+            print("No feasible schedule", file=sys.stderr)
+            return 1
+        status = "optimal" if job.optimal else f"best within {args.budget} ms"
+    elif args.engine == 'components':
+        from .decompose import solve_decomposed
+
+        with contextlib.redirect_stdout(sys.stderr):
+            schedule = solve_decomposed(tasks, availability)
+        if schedule is None:
+            print("No feasible schedule", file=sys.stderr)
+            return 1
+        status = "solved per component"
+
+    timebase = schedule.timebase
+    equipment = {task['taskId']: task['equipment'] for task in tasks}
+    if args.json:
+        json.dump({task_id: {"start": timebase.to_datetime(schedule.starts[task_id]).isoformat(),
+                             "end": timebase.to_datetime(schedule.ends[task_id]).isoformat(),
+                             "equipment": equipment[task_id]}
+                   for task_id in sorted(schedule.starts, key=schedule.starts.get)}, sys.stdout, indent=2)
+        print()
+    else:
+        for task_id in sorted(schedule.starts, key=schedule.starts.get):
+            start = timebase.to_datetime(schedule.starts[task_id])
+            end = timebase.to_datetime(schedule.ends[task_id])
+            print(f"{task_id:12s} {start:%Y-%m-%d %H:%M} - {end:%H:%M}  {', '.join(equipment[task_id])}")
+        print(f"makespan {schedule.horizon * timebase.quantum // 60} min ({status})")
+
+    if args.chart:
+        from .gantt import render_image
+
+        fmt = os.path.splitext(args.chart)[1].lstrip('.').lower() or 'png'
+        with open(args.chart, 'wb') as f:
+            f.write(render_image(schedule, tasks, fmt))
+    return 0
+
+
+def tree(args):
+    from .binaryTree import compile_tree, create_behavior_tree, print_tree
+
+    tasks, availability = load_plan(args.plan)
+    root = create_behavior_tree(tasks, availability)
+    if args.json:
+        for row in compile_tree(root).export():
+            print(json.dumps(row))
+    else:
+        print_tree(root)
+    return 0
+
+
+def generate(args):
+    from .workload import generate_instance
+
+    json.dump(generate_instance(args.tasks, num_equipment=args.equipment, depth=args.depth,
+                                density=args.density, fragmentation=args.fragmentation, seed=args.seed),
+              sys.stdout, indent=2)
+    print()
+    return 0
+
+
+def measure_import(statement, runs=3):
+    """(seconds, heavy modules loaded) for an import statement run in a
+    fresh interpreter from the repository root, best of `runs`. Raises
+    RuntimeError if the import fails."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import sys, time\n"
+            "started = time.perf_counter()\n"
+            f"{statement}\n"
+            "print(time.perf_counter() - started)\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n")
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True)
+        if result.returncode:
+            raise RuntimeError(result.stderr)
+        seconds, heavy = result.stdout.splitlines()
+        best = float(seconds) if best is None else min(best, float(seconds))
+    return best, [m for m in heavy.split(',') if m]
+
+
+def check_imports(args):
+    """Import each light path in a fresh interpreter (best of args.runs):
+    fails if one takes longer than the budget or loads a heavy module."""
+    failed = False
+    for name, statement in LIGHT_PATHS.items():
+        try:
+            best, heavy = measure_import(statement, args.runs)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 1
+        heavy = ','.join(heavy)
+        over = best * 1000 > args.budget_ms
+        verdict = "over budget" if over else "heavy: " + heavy if heavy else "ok"
+        failed |= over or bool(heavy)
+        print(f"{name:24s} {best * 1000:7.1f} ms  {verdict}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sola', description="SOLA lab scheduling")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('solve', help="schedule a plan and print the start times")
+    command.add_argument('plan')
+    command.add_argument('--engine', choices=('heuristic', 'smt', 'components'), default='heuristic')
+    command.add_argument('--budget', type=int, default=None, help="SMT time limit in ms (default none)")
+    command.add_argument('--chart', default=None, help="write a Gantt chart (.png or .svg)")
+    command.add_argument('--json', action='store_true', help="print the schedule as JSON")
+    command.set_defaults(run=solve)
+
+    command = commands.add_parser('validate', help="check a plan and print its makespan lower bound")
+    command.add_argument('plan')
+    command.set_defaults(run=validate)
+
+    command = commands.add_parser('tree', help="print the behavior tree of a plan")
+    command.add_argument('plan')
+    command.add_argument('--json', action='store_true', help="one JSON object per node instead of text")
+    command.set_defaults(run=tree)
+
+    command = commands.add_parser('generate', help="write a synthetic plan to stdout")
+    command.add_argument('tasks', type=int)
+    command.add_argument('--equipment', type=int, default=8)
+    command.add_argument('--depth', type=int, default=6)
+    command.add_argument('--density', type=float, default=0.5)
+    command.add_argument('--fragmentation', type=int, default=0)
+    command.add_argument('--seed', type=int, default=0)
+    command.set_defaults(run=generate)
+
+    command = commands.add_parser('check-imports', help="check cold import time of the non-solver paths")
+    command.add_argument('--budget-ms', type=float, default=float(os.environ.get('SOLA_IMPORT_BUDGET_MS', '250')))
+    command.add_argument('--runs', type=int, default=3)
+    command.set_defaults(run=check_imports)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
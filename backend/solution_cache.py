@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .list_scheduler import ListSchedule
+from .timebase import QUANTUM, TimeBase, to_epoch
+
+
+def fingerprint(task_list, equipment_availability, quantum=QUANTUM):
+    """Canonical hash of a plan: task durations, equipment sets, precedences,
+    release times and the equipment's availability windows, all relative to
+    the earliest task. Task ids, names and absolute dates don't enter it,
+    so the same protocol run on another day gets the same key.
+
+    Returns (key, order, timebase): order lists task_list positions in the
+    canonical order the cached solution is stored in.
+    """
+    timebase = TimeBase.from_tasks(task_list, quantum)
+    rows = []
+    for task in task_list:
+        release, duration = timebase.task_times(task)
+        rows.append((release, duration, sorted(task['equipment'])))
+    # ties keep input order; that can only cost a hit, never give a wrong one
+    order = sorted(range(len(task_list)), key=rows.__getitem__)
+    position = {task_list[i]['taskId']: p for p, i in enumerate(order)}
+    tasks = [rows[i] + (sorted(position[dep] for dep in task_list[i]['dependencies']),) for i in order]
+
+    used = sorted({equip for task in task_list for equip in task['equipment']})
+    windows = {equip: sorted((to_epoch(w['availableFrom']) - timebase.origin, to_epoch(w['availableTo']) - timebase.origin)
+                             for w in equipment_availability.get(equip, ()))
+               for equip in used}
+    payload = json.dumps([quantum, tasks, windows], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest(), order, timebase
+
+
+class SolutionCache:
+    """Content-addressed cache of solved schedules: an in-memory LRU of
+    `size` entries in front of an optional directory of JSON files (one per
+    key) that survives restarts and is shared between processes."""
+
+    def __init__(self, size=256, directory=None):
+        self.size = size
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.entries = OrderedDict()  # key -> {'times': [[start, end], ...]} in canonical order
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lookup_time = 0.0
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def get(self, task_list, equipment_availability, quantum=QUANTUM):
+        """A ListSchedule for task_list (on its own timebase, so shifted to
+        its dates), or None on a miss."""
+        started = time.perf_counter()
+        key, order, timebase = fingerprint(task_list, equipment_availability, quantum)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if entry is None and self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None:
+                self._remember(key, entry)
+                with self.lock:
+                    self.disk_hits += 1
+        if entry is None:
+            with self.lock:
+                self.misses += 1
+                self.lookup_time += time.perf_counter() - started
+            return None
+
+        starts, ends = {}, {}
+        for i, (start, end) in zip(order, entry['times']):
+            task_id = task_list[i]['taskId']
+            starts[task_id] = start
+            ends[task_id] = end
+        schedule = ListSchedule.from_times(timebase, task_list, starts, ends)
+        with self.lock:
+            self.lookup_time += time.perf_counter() - started
+        return schedule
+
+    def put(self, task_list, equipment_availability, schedule, quantum=QUANTUM):
+        key, order, timebase = fingerprint(task_list, equipment_availability, quantum)
+        # store offsets from the plan's own origin, whatever schedule used
+        shift = timebase.offset(schedule.timebase.to_epoch(0))
+        times = [[schedule.starts[task_list[i]['taskId']] + shift, schedule.ends[task_list[i]['taskId']] + shift]
+                 for i in order]
+        entry = {'times': times}
+        self._remember(key, entry)
+        if self.directory:
+            path = self._path(key)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'mean_lookup_us': self.lookup_time / lookups * 1e6 if lookups else 0.0,
+                'entries': len(self.entries),
+            }
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide cache; SOLA_SOLUTION_CACHE sets the on-disk directory
+    ('' for memory only)."""
+    global _default_cache
+    if _default_cache is None:
+        directory = os.environ.get('SOLA_SOLUTION_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'sola', 'solutions'))
+        _default_cache = SolutionCache(directory=directory or None)
+    return _default_cache
@@ -0,0 +1,257 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+
+# Task records are the dicts scheduler.add_task builds: startTime/endTime are
+# aware UTC datetimes, everything else is JSON-serializable.
+
+
+def _epoch(value):
+    return int(value.timestamp())
+
+
+class TaskStore(ABC):
+    """Interface shared by the store backends."""
+
+    def add(self, task_id, record):
+        self.add_many([(task_id, record)])
+
+    @abstractmethod
+    def add_many(self, items):
+        """Add or replace (task_id, record) pairs; the last one wins for an
+        id given twice."""
+
+    @abstractmethod
+    def delete(self, task_id):
+        """Remove a task, returns False if it did not exist."""
+
+    @abstractmethod
+    def get(self, task_id):
+        """The record of a task, or None."""
+
+    @abstractmethod
+    def all(self):
+        """Every task as a {task_id: record} dict."""
+
+    @abstractmethod
+    def query(self, start=None, end=None, equipment=None, assigned_to=None):
+        """{task_id: record} of the tasks overlapping [start, end) (aware
+        datetimes, either side may be open) that use equipment and are
+        assigned to assigned_to, when given."""
+
+    def __contains__(self, task_id):
+        return self.get(task_id) is not None
+
+    @abstractmethod
+    def __len__(self):
+        """Number of tasks."""
+
+
+class MemoryTaskStore(TaskStore):
+    """Dict of records plus secondary indexes on equipment, assignee and a
+    sorted start-time list. Overlap queries only scan starts in
+    (window start - longest task, window end)."""
+
+    def __init__(self):
+        self.tasks = {}
+        self.by_equipment = {}
+        self.by_assignee = {}
+        self.starts = []  # sorted (start epoch, task_id)
+        self.max_duration = 0
+        self.lock = threading.Lock()
+
+    def _index(self, task_id, record):
+        for equip in record['equipment']:
+            self.by_equipment.setdefault(equip, set()).add(task_id)
+        self.by_assignee.setdefault(record['assignedTo'], set()).add(task_id)
+        start, end = _epoch(record['startTime']), _epoch(record['endTime'])
+        insort(self.starts, (start, task_id))
+        self.max_duration = max(self.max_duration, end - start)
+
+    def _unindex(self, task_id, record):
+        for equip in record['equipment']:
+            self.by_equipment[equip].discard(task_id)
+        self.by_assignee[record['assignedTo']].discard(task_id)
+        key = (_epoch(record['startTime']), task_id)
+        i = bisect_left(self.starts, key)
+        if i < len(self.starts) and self.starts[i] == key:
+            del self.starts[i]
+
+    def add_many(self, items):
+        with self.lock:
+            for task_id, record in items:
+                old = self.tasks.get(task_id)
+                if old is not None:
+                    self._unindex(task_id, old)
+                self.tasks[task_id] = record
+                self._index(task_id, record)
+
+    def delete(self, task_id):
+        with self.lock:
+            record = self.tasks.pop(task_id, None)
+            if record is None:
+                return False
+            self._unindex(task_id, record)
+            return True
+
+    def get(self, task_id):
+        return self.tasks.get(task_id)
+
+    def all(self):
+        return dict(self.tasks)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def query(self, start=None, end=None, equipment=None, assigned_to=None):
+        with self.lock:
+            candidates = None
+            if equipment is not None:
+                candidates = self.by_equipment.get(equipment, set())
+            if assigned_to is not None:
+                assigned = self.by_assignee.get(assigned_to, set())
+                candidates = assigned if candidates is None else candidates & assigned
+
+            if start is not None or end is not None:
+                # (x,) sorts before every (x, task_id)
+                lo = 0 if start is None else bisect_left(self.starts, (_epoch(start) - self.max_duration + 1,))
+                hi = len(self.starts) if end is None else bisect_left(self.starts, (_epoch(end),))
+                if candidates is not None and len(candidates) < hi - lo:
+                    ids = candidates
+                else:
+                    ids = [task_id for _, task_id in self.starts[lo:hi]]
+                    if candidates is not None:
+                        ids = [task_id for task_id in ids if task_id in candidates]
+                return {task_id: self.tasks[task_id] for task_id in ids
+                        if (start is None or self.tasks[task_id]['endTime'] > start)
+                        and (end is None or self.tasks[task_id]['startTime'] < end)}
+
+            if candidates is None:
+                return dict(self.tasks)
+            return {task_id: self.tasks[task_id] for task_id in candidates}
+
+
+class SQLiteTaskStore(TaskStore):
+    """SQLite (WAL) backed store. Start/end are stored as epoch seconds with
+    B-tree indexes; equipment lives in its own table with the task times
+    copied in, so an equipment + window query is a single index range scan.
+    add_many writes a whole batch in one transaction."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                start_epoch INTEGER NOT NULL,
+                end_epoch INTEGER NOT NULL,
+                assigned_to TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_start ON tasks (start_epoch);
+            CREATE INDEX IF NOT EXISTS tasks_end ON tasks (end_epoch);
+            CREATE INDEX IF NOT EXISTS tasks_assigned ON tasks (assigned_to, start_epoch);
+            CREATE TABLE IF NOT EXISTS task_equipment (
+                equipment TEXT NOT NULL,
+                start_epoch INTEGER NOT NULL,
+                end_epoch INTEGER NOT NULL,
+                task_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS task_equipment_window ON task_equipment (equipment, start_epoch);
+            CREATE INDEX IF NOT EXISTS task_equipment_task ON task_equipment (task_id);
+        """)
+        row = self.db.execute("SELECT MAX(end_epoch - start_epoch) FROM tasks").fetchone()
+        self.max_duration = row[0] or 0
+
+    @staticmethod
+    def _dump(record):
+        data = dict(record)
+        data['startTime'] = record['startTime'].isoformat()
+        data['endTime'] = record['endTime'].isoformat()
+        return json.dumps(data)
+
+    @staticmethod
+    def _load(data):
+        record = json.loads(data)
+        record['startTime'] = datetime.fromisoformat(record['startTime']).astimezone(timezone.utc)
+        record['endTime'] = datetime.fromisoformat(record['endTime']).astimezone(timezone.utc)
+        return record
+
+    def add_many(self, items):
+        rows = []
+        equipment_rows = []
+        ids = []
+        # one row per task: a repeated id would leave the equipment rows of
+        # its earlier occurrence behind
+        for task_id, record in dict(items).items():
+            start, end = _epoch(record['startTime']), _epoch(record['endTime'])
+            rows.append((task_id, start, end, record['assignedTo'], self._dump(record)))
+            equipment_rows.extend((equip, start, end, task_id) for equip in record['equipment'])
+            ids.append((task_id,))
+            self.max_duration = max(self.max_duration, end - start)
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM task_equipment WHERE task_id = ?", ids)
+            self.db.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.executemany("INSERT INTO task_equipment VALUES (?, ?, ?, ?)", equipment_rows)
+
+    def delete(self, task_id):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM task_equipment WHERE task_id = ?", (task_id,))
+            return self.db.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,)).rowcount > 0
+
+    def get(self, task_id):
+        with self.lock:
+            row = self.db.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return self._load(row[0]) if row else None
+
+    def all(self):
+        with self.lock:
+            rows = self.db.execute("SELECT task_id, data FROM tasks ORDER BY start_epoch").fetchall()
+        return {task_id: self._load(data) for task_id, data in rows}
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def query(self, start=None, end=None, equipment=None, assigned_to=None):
+        where = []
+        params = []
+        table = "tasks t"
+        if equipment is not None:
+            # drive the scan from the (equipment, start_epoch) index
+            table = "task_equipment e JOIN tasks t ON t.task_id = e.task_id"
+            where.append("e.equipment = ?")
+            params.append(equipment)
+            times = "e"
+        else:
+            times = "t"
+        if assigned_to is not None:
+            where.append("t.assigned_to = ?")
+            params.append(assigned_to)
+        if start is not None:
+            where.append(f"{times}.start_epoch > ? AND {times}.end_epoch > ?")
+            params += [_epoch(start) - self.max_duration - 1, _epoch(start)]
+        if end is not None:
+            where.append(f"{times}.start_epoch < ?")
+            params.append(_epoch(end))
+        sql = f"SELECT t.task_id, t.data FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+        return {task_id: self._load(data) for task_id, data in rows}
+
+
+def open_store(url):
+    """'memory' or 'sqlite:///path/to/tasks.db'."""
+    if url in (None, '', 'memory'):
+        return MemoryTaskStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteTaskStore(url[len('sqlite:///'):])
+    raise ValueError(f"Unknown task store: {url}")
@@ -0,0 +1,148 @@
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .timebase import epochs
+
+PRIORITY_WEIGHTS = {"High": 3, "Medium": 2, "Low": 1}
+PRIORITY_NAMES = {weight: name for name, weight in PRIORITY_WEIGHTS.items()}
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(int(epoch), timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class TaskTable:
+    """Struct-of-arrays view of a task list.
+
+    Task i has id ids[i] and times start[i]/end[i] in epoch seconds.
+    Repeated strings (names, descriptions, assignees) are stored once in
+    `strings` and referenced by int32 codes. The equipment of task i is
+    equipment_names[equip_idx[equip_ptr[i]:equip_ptr[i + 1]]], and its
+    dependencies are the rows dep_idx[dep_ptr[i]:dep_ptr[i + 1]] (CSR).
+    """
+
+    def __init__(self, ids, start, end, priority, name, description, assignee, strings,
+                 equipment_names, equip_ptr, equip_idx, dep_ptr, dep_idx, dangling=None):
+        self.ids = ids
+        self.index = {task_id: i for i, task_id in enumerate(ids)}
+        self.start = start
+        self.end = end
+        self.priority = priority
+        self.name = name
+        self.description = description
+        self.assignee = assignee
+        self.strings = strings
+        self.equipment_names = equipment_names
+        self.equipment_index = {equip: e for e, equip in enumerate(equipment_names)}
+        self.equip_ptr = equip_ptr
+        self.equip_idx = equip_idx
+        self.dep_ptr = dep_ptr
+        self.dep_idx = dep_idx
+        self.dangling = dangling or {}  # row -> dependency ids not in the table
+
+    @classmethod
+    def from_tasks(cls, task_list, equipment_names=(), strict=True):
+        """Build from the JSON task schema. equipment_names fixes the order
+        of the first equipment codes (e.g. the equipmentAvailability keys);
+        anything else gets a code on first use. A dependency on an unknown
+        task raises KeyError, or with strict=False is left out of the CSR
+        and listed in `dangling`."""
+        n = len(task_list)
+        ids = [task['taskId'] for task in task_list]
+        index = {task_id: i for i, task_id in enumerate(ids)}
+
+        strings = []
+        codes = {}
+
+        def intern(text):
+            code = codes.get(text)
+            if code is None:
+                code = codes[text] = len(strings)
+                strings.append(text)
+            return code
+
+        name = np.fromiter((intern(task['taskName']) for task in task_list), np.int32, n)
+        description = np.fromiter((intern(task.get('description', '')) for task in task_list), np.int32, n)
+        assignee = np.fromiter((intern(task.get('assignedTo', '')) for task in task_list), np.int32, n)
+        priority = np.fromiter((PRIORITY_WEIGHTS.get(task.get('priority'), 0) for task in task_list), np.int8, n)
+
+        equipment_names = list(equipment_names)
+        equipment_index = {equip: e for e, equip in enumerate(equipment_names)}
+        equip_ptr = np.zeros(n + 1, np.int32)
+        equip_idx = []
+        dep_ptr = np.zeros(n + 1, np.int32)
+        dep_idx = []
+        dangling = {}
+        for i, task in enumerate(task_list):
+            for equip in task['equipment']:
+                e = equipment_index.get(equip)
+                if e is None:
+                    e = equipment_index[equip] = len(equipment_names)
+                    equipment_names.append(equip)
+                equip_idx.append(e)
+            equip_ptr[i + 1] = len(equip_idx)
+            for dep in task['dependencies']:
+                j = index.get(dep)
+                if j is not None:
+                    dep_idx.append(j)
+                elif strict:
+                    raise KeyError(dep)
+                else:
+                    dangling.setdefault(i, []).append(dep)
+            dep_ptr[i + 1] = len(dep_idx)
+
+        return cls(ids, epochs([task['startTime'] for task in task_list]),
+                   epochs([task['endTime'] for task in task_list]), priority, name, description, assignee,
+                   strings, equipment_names, equip_ptr, np.array(equip_idx, np.int32),
+                   dep_ptr, np.array(dep_idx, np.int32), dangling)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def equipment(self, i):
+        return self.equip_idx[self.equip_ptr[i]:self.equip_ptr[i + 1]]
+
+    def dependencies(self, i):
+        return self.dep_idx[self.dep_ptr[i]:self.dep_ptr[i + 1]]
+
+    def text(self, column, i):
+        return self.strings[column[i]]
+
+    def successors(self):
+        """(succ_ptr, succ_idx): the dependency CSR transposed, so row i
+        lists the tasks that depend on i."""
+        n = len(self)
+        rows = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.dep_ptr))
+        order = np.argsort(self.dep_idx, kind='stable')
+        succ_ptr = np.zeros(n + 1, np.int32)
+        np.cumsum(np.bincount(self.dep_idx, minlength=n), out=succ_ptr[1:])
+        return succ_ptr, rows[order]
+
+    def equipment_rows(self):
+        """Task row of every entry of equip_idx."""
+        return np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.equip_ptr))
+
+    def nbytes(self):
+        """Approximate memory of the table, strings included."""
+        arrays = (self.start, self.end, self.priority, self.name, self.description, self.assignee,
+                  self.equip_ptr, self.equip_idx, self.dep_ptr, self.dep_idx)
+        return (sum(a.nbytes for a in arrays)
+                + sum(sys.getsizeof(s) for s in self.strings) + sys.getsizeof(self.strings)
+                + sum(sys.getsizeof(s) for s in self.ids) + sys.getsizeof(self.ids)
+                + sys.getsizeof(self.index))
+
+    def task(self, i):
+        """Row i back in the JSON task schema."""
+        return {
+            "taskId": self.ids[i],
+            "taskName": self.text(self.name, i),
+            "description": self.text(self.description, i),
+            "startTime": _iso(self.start[i]),
+            "endTime": _iso(self.end[i]),
+            "equipment": [self.equipment_names[e] for e in self.equipment(i)],
+            "assignedTo": self.text(self.assignee, i),
+            "priority": PRIORITY_NAMES.get(int(self.priority[i])),
+            "dependencies": [self.ids[j] for j in self.dependencies(i)],
+        }
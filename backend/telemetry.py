@@ -0,0 +1,121 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+class TelemetryQueue:
+    """Many producers, one consumer. Producers push readings for named
+    series from any thread; the plotting loop calls drain() once per frame
+    and gets every series' new samples as NumPy arrays. At most max_pending
+    samples are held; beyond that new readings are dropped and counted, so
+    a stalled consumer cannot exhaust memory."""
+
+    def __init__(self, max_pending=1_000_000):
+        self.max_pending = max_pending
+        self.pending = 0
+        self.chunks = {}  # series -> [(times, values)]
+        self.received = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def put(self, series, t, value):
+        self.put_many(series, np.array([t], dtype=float), np.array([value], dtype=float))
+
+    def put_many(self, series, times, values):
+        with self.lock:
+            if self.pending + len(times) > self.max_pending:
+                self.dropped += len(times)
+                return
+            self.pending += len(times)
+            self.received += len(times)
+            self.chunks.setdefault(series, []).append((times, values))
+
+    def drain(self):
+        """{series: (times, values)} of everything since the last drain."""
+        with self.lock:
+            chunks, self.chunks = self.chunks, {}
+            self.pending = 0
+        batches = {}
+        for series, parts in chunks.items():
+            if len(parts) == 1:
+                batches[series] = parts[0]
+            else:
+                batches[series] = (np.concatenate([t for t, _ in parts]),
+                                   np.concatenate([v for _, v in parts]))
+        return batches
+
+
+# name -> (samples per second, generator of values for an array of times)
+SIMULATED_SERIES = {
+    "temperature": (2000, lambda t: 37 + 0.5 * np.sin(t / 30) + np.random.normal(0, 0.05, len(t))),
+    "rpm": (4000, lambda t: 4000 + 250 * np.sin(t * 2) + np.random.normal(0, 20, len(t))),
+    "absorbance": (4000, lambda t: 0.8 + 0.1 * np.sin(t / 5) + np.random.normal(0, 0.01, len(t))),
+}
+
+
+class SimulatedInstrument(threading.Thread):
+    """Background thread producing readings for each series at its sample
+    rate (timestamps in seconds since start). Samples are generated in
+    vectorized batches every `interval` seconds, catching up on any time
+    lost to scheduling."""
+
+    def __init__(self, queue, series=None, interval=0.001, scale=1.0):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.series = series or SIMULATED_SERIES
+        self.interval = interval
+        self.scale = scale  # multiplies every rate
+        self.sent = {name: 0 for name in self.series}
+        self.stopped = threading.Event()
+
+    def run(self):
+        t0 = time.perf_counter()
+        while not self.stopped.wait(self.interval):
+            now = time.perf_counter() - t0
+            for name, (rate, generate) in self.series.items():
+                rate *= self.scale
+                due = int(now * rate)
+                n = due - self.sent[name]
+                if n <= 0:
+                    continue
+                times = (self.sent[name] + np.arange(n)) / rate
+                self.queue.put_many(name, times, generate(times))
+                self.sent[name] = due
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+if __name__ == '__main__':
+    from .live_plot import RingBuffer
+
+    # Headless load test: run the simulated instrument for a while and
+    # consume at 30 frames per second, as the plotting loop would.
+    #
+    #   python -m backend.telemetry [seconds] [rate scale]
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    queue = TelemetryQueue()
+    source = SimulatedInstrument(queue, scale=scale)
+    buffers = {name: RingBuffer(100_000) for name in source.series}
+    frame_times = []
+    t0 = time.perf_counter()
+    source.start()
+    while time.perf_counter() - t0 < seconds:
+        frame_start = time.perf_counter()
+        for name, (times, values) in queue.drain().items():
+            buffers[name].extend(times, values)
+        frame_times.append(time.perf_counter() - frame_start)
+        time.sleep(max(0.0, 1 / 30 - (time.perf_counter() - frame_start)))
+    source.stop()
+    elapsed = time.perf_counter() - t0
+
+    target = sum(rate for rate, _ in source.series.values()) * scale
+    print(f"target {target:.0f} samples/s, received {queue.received / elapsed:.0f} samples/s, "
+          f"dropped {queue.dropped}")
+    print(f"drain+buffer per frame: mean {np.mean(frame_times) * 1e3:.3f} ms, "
+          f"max {np.max(frame_times) * 1e3:.3f} ms over {len(frame_times)} frames")
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+
+# Scheduling models count time in whole quanta of this many seconds
+QUANTUM = 60
+
+
+@lru_cache(maxsize=65536)
+def parse_datetime(timestamp):
+    """ISO 8601 string -> aware UTC datetime. Task lists repeat the same few
+    timestamps many times over, so parses are memoized."""
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=65536)
+def to_epoch(timestamp):
+    """ISO 8601 string -> integer epoch seconds."""
+    return int(parse_datetime(timestamp).timestamp())
+
+
+def epochs(timestamps):
+    """Bulk to_epoch for a list of strings, as an int64 array. UTC ('Z')
+    timestamps go through NumPy datetime64 in one call; anything with an
+    explicit offset falls back to the cached scalar parse."""
+    stripped = [t[:-1] if t.endswith('Z') else None for t in timestamps]
+    if None not in stripped:
+        return np.array(stripped, dtype='datetime64[s]').astype(np.int64)
+    return np.array([to_epoch(t) for t in timestamps], dtype=np.int64)
+
+
+class TimeBase:
+    """Maps epoch seconds to integer offsets from origin in units of
+    quantum seconds. Start times round down and durations round up, so a
+    task never gets shorter or starts later than asked."""
+
+    def __init__(self, origin, quantum=QUANTUM):
+        self.origin = origin - origin % quantum
+        self.quantum = quantum
+
+    @classmethod
+    def from_tasks(cls, task_list, quantum=QUANTUM):
+        """Origin at the earliest task start (0 for an empty list)."""
+        if not task_list:
+            return cls(0, quantum)
+        return cls(min(to_epoch(task['startTime']) for task in task_list), quantum)
+
+    def offset(self, epoch):
+        return (epoch - self.origin) // self.quantum
+
+    def offset_ceil(self, epoch):
+        return -((self.origin - epoch) // self.quantum)
+
+    def length(self, seconds):
+        return -(-seconds // self.quantum)
+
+    def to_epoch(self, offset):
+        return self.origin + offset * self.quantum
+
+    def to_datetime(self, offset):
+        return datetime.fromtimestamp(self.to_epoch(offset), timezone.utc)
+
+    def task_times(self, task):
+        """(release offset, duration) of a task dict."""
+        start, end = to_epoch(task['startTime']), to_epoch(task['endTime'])
+        return self.offset(start), self.length(end - start)
+
+    def task_columns(self, task_list):
+        """(releases, durations) of a whole task list as int64 arrays."""
+        starts = epochs([task['startTime'] for task in task_list])
+        ends = epochs([task['endTime'] for task in task_list])
+        return (starts - self.origin) // self.quantum, -((starts - ends) // self.quantum)
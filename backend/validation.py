@@ -0,0 +1,134 @@
+from collections import deque
+
+import numpy as np
+
+from .availability import AvailabilityIndex
+from .task_table import TaskTable
+from .timebase import TimeBase
+
+
+class ValidationReport:
+    """What validate_plan found. The plan can go to a solver only if ok;
+    lower_bound is a makespan no schedule can beat, in timebase units."""
+
+    def __init__(self, timebase):
+        self.timebase = timebase
+        self.cycles = []             # [[taskId, ...]], each a dependency cycle
+        self.dangling = []           # [(taskId, missing dependency)]
+        self.missing_equipment = []  # [(taskId, equipment)]
+        self.release_conflicts = []  # [(taskId, reason)]
+        self.lower_bound = 0
+        self.critical_path = []      # taskIds along the longest dependency chain
+
+    @property
+    def ok(self):
+        return not (self.cycles or self.dangling or self.missing_equipment or self.release_conflicts)
+
+    def errors(self):
+        messages = [f"Dependency cycle: {' -> '.join(cycle + cycle[:1])}" for cycle in self.cycles]
+        messages += [f"Task {task_id} depends on unknown task {dep}" for task_id, dep in self.dangling]
+        messages += [f"Task {task_id} uses {equip}, which has no availability entry"
+                     for task_id, equip in self.missing_equipment]
+        messages += [f"Task {task_id}: {reason}" for task_id, reason in self.release_conflicts]
+        return messages
+
+
+def _find_cycles(table, remaining):
+    # Every task Kahn's algorithm could not order has a dependency that was
+    # not ordered either, so walking those dependencies always ends in a cycle.
+    cycles = []
+    state = {}  # row -> 1 on the current walk, 2 done
+    for first in remaining:
+        path = []
+        i = first
+        while i not in state:
+            state[i] = 1
+            path.append(i)
+            i = next(int(j) for j in table.dependencies(i) if int(j) in remaining)
+        if state[i] == 1:
+            cycle = path[path.index(i):]
+            cycles.append([table.ids[j] for j in reversed(cycle)])
+        for j in path:
+            state[j] = 2
+    return cycles
+
+
+def validate_plan(task_list, equipment_availability, timebase=None):
+    """Check a task list (dicts or TaskTable) before solving, in time linear
+    in tasks + dependencies: dependency cycles (Kahn's algorithm), unknown
+    dependencies and equipment, tasks that end before they start or whose
+    equipment has no window long enough at or after their start time.
+    Also computes the critical-path / equipment-load lower bound on the
+    makespan."""
+    if isinstance(task_list, TaskTable):
+        table = task_list
+    else:
+        table = TaskTable.from_tasks(task_list, equipment_availability, strict=False)
+    if timebase is None:
+        timebase = TimeBase(int(table.start.min()) if len(table) else 0)
+    report = ValidationReport(timebase)
+    n = len(table)
+
+    for i, deps in table.dangling.items():
+        report.dangling += [(table.ids[i], dep) for dep in deps]
+
+    known = len(equipment_availability)
+    rows = table.equipment_rows()
+    for k in np.flatnonzero(table.equip_idx >= known):
+        report.missing_equipment.append((table.ids[rows[k]], table.equipment_names[table.equip_idx[k]]))
+
+    availability = AvailabilityIndex(equipment_availability)
+    for i in np.flatnonzero(table.end <= table.start):
+        report.release_conflicts.append((table.ids[i], "endTime is not after startTime"))
+    for e, equip in enumerate(table.equipment_names[:known]):
+        entries = np.flatnonzero(table.equip_idx == e)
+        tasks = rows[entries]
+        seconds = table.end[tasks] - table.start[tasks]
+        fits = availability.can_fit(equip, table.start[tasks], seconds)
+        for i, duration in zip(tasks[~fits & (seconds > 0)], seconds[~fits & (seconds > 0)]):
+            report.release_conflicts.append(
+                (table.ids[i], f"no {equip} availability window of {duration // 60} min at or after its start time"))
+
+    # Kahn's algorithm, computing earliest starts along the way
+    release_column = (table.start - timebase.origin) // timebase.quantum
+    duration_column = np.maximum(-((table.start - table.end) // timebase.quantum), 0)
+    releases, durations = release_column.tolist(), duration_column.tolist()
+    succ_ptr, succ_idx = (column.tolist() for column in table.successors())
+    missing = np.diff(table.dep_ptr).tolist()
+    earliest = list(releases)
+    via = [-1] * n  # the dependency that set earliest[i]
+    queue = deque(i for i in range(n) if missing[i] == 0)
+    ordered = 0
+    while queue:
+        i = queue.popleft()
+        ordered += 1
+        end = earliest[i] + durations[i]
+        for j in succ_idx[succ_ptr[i]:succ_ptr[i + 1]]:
+            if end > earliest[j]:
+                earliest[j] = end
+                via[j] = i
+            missing[j] -= 1
+            if missing[j] == 0:
+                queue.append(j)
+    if ordered < n:
+        report.cycles = _find_cycles(table, {i for i in range(n) if missing[i] > 0})
+        return report
+
+    if n:
+        ends = [earliest[i] + durations[i] for i in range(n)]
+        last = max(range(n), key=ends.__getitem__)
+        report.lower_bound = ends[last]
+        while last >= 0:
+            report.critical_path.append(table.ids[last])
+            last = via[last]
+        report.critical_path.reverse()
+
+        # a machine can't finish before its earliest user is released plus all its work
+        if len(table.equip_idx):
+            count = len(table.equipment_names)
+            work = np.bincount(table.equip_idx, weights=duration_column[rows], minlength=count)
+            first = np.full(count, np.iinfo(np.int64).max)
+            np.minimum.at(first, table.equip_idx, release_column[rows])
+            used = np.bincount(table.equip_idx, minlength=count) > 0
+            report.lower_bound = max(report.lower_bound, int((first[used] + work[used]).max()))
+    return report
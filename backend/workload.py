@@ -0,0 +1,91 @@
+import json
+import random
+import sys
+import time
+
+from .task_table import PRIORITY_WEIGHTS
+from .timebase import to_epoch
+
+DAY_START = "2024-06-23T08:00:00Z"
+
+
+def _stamp(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+
+def generate_instance(num_tasks, num_equipment=8, equipment_per_task=(1, 2), depth=6, density=0.5,
+                      fragmentation=0, release_spread=8 * 3600, durations=(15, 30, 45, 60, 90, 120),
+                      seed=0, start=DAY_START):
+    """A random scheduling instance in the {"scheduler": {"tasks",
+    "equipmentAvailability"}} schema the apps read.
+
+    Tasks are spread over `depth` layers; every task past the first layer
+    depends on one task of the layer before it (so chains are `depth` long)
+    plus `density` more tasks of any earlier layer on average. Each task
+    uses between equipment_per_task[0] and [1] of `num_equipment` machines,
+    lasts one of `durations` minutes and is released within release_spread
+    seconds of start. fragmentation is the number of 30 minute downtimes
+    cut into each machine's availability. Windows are long enough for the
+    longest task and cover several times the busiest machine's work, so
+    every instance is feasible.
+    """
+    rng = random.Random(seed)
+    origin = to_epoch(start)
+    equipment = [f"Equipment {e:02d}" for e in range(num_equipment)]
+    layers = [[] for _ in range(max(depth, 1))]
+    tasks = []
+    load = dict.fromkeys(equipment, 0)
+    for i in range(num_tasks):
+        task_id = f"T{i:06d}"
+        # the first `depth` tasks seed one layer each so every layer is used
+        layer = i if i < len(layers) else rng.randrange(len(layers))
+        dependencies = []
+        if layer:
+            dependencies.append(rng.choice(layers[layer - 1]))
+            extra = int(density) + (rng.random() < density - int(density))
+            for _ in range(extra):
+                dep = rng.choice(layers[rng.randrange(layer)])
+                if dep not in dependencies:
+                    dependencies.append(dep)
+        layers[layer].append(task_id)
+
+        duration = rng.choice(durations) * 60
+        release = origin + rng.randrange(0, release_spread + 1, 60)
+        used = rng.sample(equipment, min(rng.randint(*equipment_per_task), num_equipment))
+        for equip in used:
+            load[equip] += duration
+        tasks.append({
+            "taskId": task_id,
+            "taskName": f"Task {i}",
+            "description": f"Synthetic task {i} (layer {layer})",
+            "startTime": _stamp(release),
+            "endTime": _stamp(release + duration),
+            "equipment": used,
+            "assignedTo": f"Operator {rng.randrange(max(num_equipment // 2, 1))}",
+            "priority": rng.choice(list(PRIORITY_WEIGHTS)),
+            "dependencies": dependencies,
+        })
+
+    # availability: [origin, origin + horizon) minus `fragmentation` gaps,
+    # one at the end of each equal segment
+    longest = max(durations) * 60
+    gap = 30 * 60
+    horizon = max(24 * 3600, release_spread + 4 * max(load.values(), default=0))
+    segment = max(horizon // (fragmentation + 1), longest + gap)
+    availability = {}
+    for equip in equipment:
+        windows = []
+        for k in range(fragmentation + 1):
+            lo = origin + k * segment
+            hi = lo + segment - (gap if k < fragmentation else 0)
+            windows.append({"availableFrom": _stamp(lo), "availableTo": _stamp(hi)})
+        availability[equip] = windows
+    return {"scheduler": {"tasks": tasks, "equipmentAvailability": availability}}
+
+
+if __name__ == '__main__':
+    # python -m backend.workload num_tasks [num_equipment] [depth] [density] [fragmentation] > instance.json
+    argv = sys.argv[1:] + [None] * 5
+    instance = generate_instance(int(argv[0] or 100), num_equipment=int(argv[1] or 8), depth=int(argv[2] or 6),
+                                 density=float(argv[3] or 0.5), fragmentation=int(argv[4] or 0))
+    json.dump(instance, sys.stdout, indent=2)
@@ -3,7 +3,12 @@ import io from 'socket.io-client';
 import Plot from 'react-plotly.js';
 import './App.css';
 
-const socket = io('http://localhost:5000');
+// Last change seen, sent on every (re)connect so the server only replays
+// what was missed instead of the whole task list
+const sync = { seq: null, epoch: null };
+const socket = io('http://localhost:5000', {
+  auth: (cb) => cb({ since: sync.seq, epoch: sync.epoch })
+});
 
 function App() {
   const [tasks, setTasks] = useState({});
@@ -25,23 +30,48 @@ function App() {
       console.log('Connected to server');
     });
 
-    socket.on('tasks', (tasks) => {
-      console.log('Received tasks:', tasks);
-      setTasks(tasks);
-      updateChart(tasks);
+    // Full snapshot, sent in pages; applied once the last page arrives
+    let snapshot = {};
+    socket.on('tasks_snapshot', ({ seq, epoch, page, pages, tasks }) => {
+      if (page === 0) {
+        snapshot = {};
+      }
+      Object.assign(snapshot, tasks);
+      if (page === pages - 1) {
+        console.log('Received tasks:', snapshot);
+        sync.seq = seq;
+        sync.epoch = epoch;
+        setTasks(snapshot);
+        updateChart(snapshot);
+      }
+    });
+
+    socket.on('tasks_delta', ({ seq, epoch, tasks: changed, deleted }) => {
+      console.log('Received changes since', sync.seq, changed, deleted);
+      sync.seq = seq;
+      sync.epoch = epoch;
+      setTasks((prevTasks) => {
+        const newTasks = { ...prevTasks, ...changed };
+        deleted.forEach((task_id) => delete newTasks[task_id]);
+        updateChart(newTasks);
+        return newTasks;
+      });
     });
 
-    socket.on('task_added', ({ task_id, task }) => {
-      console.log('Task added via socket:', task_id, task);
+    // Batches and bursts of single adds arrive as one event
+    socket.on('tasks_added', ({ seq, tasks: added }) => {
+      console.log('Tasks added via socket:', Object.keys(added));
+      sync.seq = Math.max(sync.seq ?? 0, seq);
       setTasks((prevTasks) => {
-        const newTasks = { ...prevTasks, [task_id]: task };
+        const newTasks = { ...prevTasks, ...added };
         updateChart(newTasks);
         return newTasks;
       });
     });
 
-    socket.on('task_deleted', ({ task_id }) => {
+    socket.on('task_deleted', ({ seq, task_id }) => {
       console.log('Task deleted via socket:', task_id);
+      sync.seq = Math.max(sync.seq ?? 0, seq);
       setTasks((prevTasks) => {
         const newTasks = { ...prevTasks };
         delete newTasks[task_id];
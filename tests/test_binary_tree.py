@@ -0,0 +1,62 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stdout
+
+from backend.binaryTree import RUNNING, SUCCESS, BehaviorTree, json_input
+
+
+class ReprioritizeTest(unittest.TestCase):
+
+    def setUp(self):
+        data = json.loads(json_input)['scheduler']
+        self.tree = BehaviorTree(data['tasks'], data['equipmentAvailability'])
+        # T002's action keeps running until released
+        self.released = False
+        task = self.tree.task_nodes['T002']
+        action = self.tree.children[task][-1]
+        perform = self.tree.funcs[action]
+        self.tree.funcs[action] = lambda: perform() if self.released else RUNNING
+
+    def tick(self):
+        with redirect_stdout(io.StringIO()):
+            return self.tree.tick()
+
+    def done(self, task_id):
+        state = self.tree.state
+        return state.done & state.task_bits[task_id] != 0
+
+    def test_running_task_keeps_the_cursor(self):
+        self.assertEqual(self.tick(), RUNNING)
+        sequence = self.tree.task_sequence
+        self.assertEqual(self.tree.cursor[sequence], 1)
+
+        self.tree.reprioritize('T002', before='T001')
+        self.assertEqual(self.tree.task_ids(), ['T002', 'T001', 'T003', 'T004'])
+        self.assertEqual(self.tree.cursor[sequence], 0)
+        self.assertEqual(self.tick(), RUNNING)
+        self.assertFalse(self.done('T003'))
+
+        self.released = True
+        self.assertEqual(self.tick(), SUCCESS)
+        self.assertTrue(all(self.done(task_id) for task_id in self.tree.task_ids()))
+
+    def test_other_task_moved_across_the_cursor(self):
+        self.tick()
+        sequence = self.tree.task_sequence
+        # T004 moves in front of the running T002, T001 behind it
+        self.tree.reprioritize('T004', before='T001')
+        self.assertEqual(self.tree.cursor[sequence], 2)
+        self.tree.reprioritize('T001')
+        self.assertEqual(self.tree.task_ids(), ['T004', 'T002', 'T003', 'T001'])
+        self.assertEqual(self.tree.cursor[sequence], 1)
+        self.assertFalse(self.done('T003'))
+
+        self.released = True
+        self.tick()
+        self.assertTrue(self.done('T002'))
+        self.assertTrue(self.done('T003'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import json
+import unittest
+
+from backend.change_log import ChangeLog, Encoded, PacketJSON
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def test_pages_encoded_once_per_version(self):
+        log = ChangeLog({'T1': {'taskName': 'a'}}, page_size=1)
+        log.record([('T2', {'taskName': 'b'})])
+        seq, pages = log.snapshot()
+        self.assertEqual(seq, 1)
+        self.assertIs(log.snapshot()[1], pages)
+        self.assertTrue(all(isinstance(page, Encoded) for page in pages))
+        self.assertEqual([json.loads(page.text)['tasks'] for page in pages], [{'T1': {'taskName': 'a'}},
+                                                                              {'T2': {'taskName': 'b'}}])
+        log.record([('T1', None)])
+        self.assertIsNot(log.snapshot()[1], pages)
+
+    def test_packet_json(self):
+        page = {'seq': 1, 'tasks': {'T1': {'taskName': 'ü'}}}
+        for data in (['tasks_snapshot', Encoded(page)], ['tasks_snapshot', page]):
+            self.assertEqual(json.loads(PacketJSON.dumps(data, separators=(',', ':'))), ['tasks_snapshot', page])
+
+
+if __name__ == '__main__':
+    unittest.main()
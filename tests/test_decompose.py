@@ -0,0 +1,54 @@
+import threading
+import unittest
+
+from backend.decompose import DecomposedSession, components
+
+
+def task(task_id, equip, start, end, dependencies=()):
+    return {"taskId": task_id, "taskName": task_id, "equipment": [equip], "dependencies": list(dependencies),
+            "startTime": f"2024-06-23T{start}:00Z", "endTime": f"2024-06-23T{end}:00Z"}
+
+
+def window(start, end):
+    return {"availableFrom": f"2024-06-23T{start}:00Z", "availableTo": f"2024-06-23T{end}:00Z"}
+
+
+# two components: T1, T2 on A and T3, T4 on B
+TASKS = [task("T1", "A", "09:00", "10:00"), task("T2", "A", "09:00", "09:30", ["T1"]),
+         task("T3", "B", "09:00", "09:45"), task("T4", "B", "09:30", "10:00")]
+AVAILABILITY = {"A": [window("08:00", "20:00")], "B": [window("08:00", "20:00")]}
+
+
+class DecomposedSessionTest(unittest.TestCase):
+
+    def test_components(self):
+        self.assertEqual(components(TASKS, AVAILABILITY), [[0, 1], [2, 3]])
+
+    def test_solved(self):
+        session = DecomposedSession(AVAILABILITY, max_workers=2)
+        schedules = list(session.improve(TASKS))
+        self.assertEqual(len(schedules), 1)
+        self.assertTrue(session.optimal)
+        self.assertEqual(schedules[0].horizon * schedules[0].timebase.quantum // 60, 90)
+
+    def test_deadline_merges_what_is_known(self):
+        # far too short for the workers to report back: the heuristic
+        # schedule of every component stands in
+        session = DecomposedSession(AVAILABILITY, max_workers=2)
+        stop = threading.Event()
+        threading.Timer(0.01, stop.set).start()
+        schedules = list(session.improve(TASKS, budget=0.01, stop=stop))
+        self.assertEqual(len(schedules), 1)
+        self.assertEqual(set(schedules[0].starts), {"T1", "T2", "T3", "T4"})
+        self.assertIs(session.solution, schedules[0])
+
+    def test_stop_before_the_deadline(self):
+        session = DecomposedSession(AVAILABILITY, max_workers=2)
+        stop = threading.Event()
+        stop.set()
+        self.assertEqual(list(session.improve(TASKS, budget=60, stop=stop)), [])
+        self.assertIsNone(session.solution)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import time
+import unittest
+
+from backend.dispatch import Dispatcher
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.sent = []
+
+    def emit(self, event, data, to=None, callback=None):
+        self.sent.append((to, data['taskId']))
+
+
+def task(priority, dependencies=()):
+    return {"equipment": ["A"], "priority": priority, "dependencies": list(dependencies)}
+
+
+class QueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.socketio = FakeSocketIO()
+        self.dispatcher = Dispatcher(self.socketio)
+        past = time.time() - 1
+        for task_id, priority in (("low", "Low"), ("high", "High"), ("medium", "Medium")):
+            self.dispatcher.schedule(task_id, past, task(priority))
+        self.dispatcher.tick()
+
+    def drain(self):
+        # one worker, finishing each task as soon as it gets it
+        self.dispatcher.register("w")
+        while self.dispatcher.running:
+            self.dispatcher.complete("w", self.socketio.sent[-1][1])
+        return [task_id for _, task_id in self.socketio.sent]
+
+    def test_cancel_a_queued_task(self):
+        self.assertEqual(self.dispatcher.stats()['queued'], 3)
+        self.dispatcher.cancel("high")
+        self.assertEqual(self.dispatcher.stats()['queued'], 2)
+        self.assertEqual(self.drain(), ["medium", "low"])
+
+    def test_queued_again_after_cancel(self):
+        self.dispatcher.cancel("high")
+        self.dispatcher.schedule("high", time.time() - 1, task("High"))
+        self.dispatcher.tick()
+        self.assertEqual(self.drain(), ["high", "medium", "low"])
+
+    def test_many_cancels(self):
+        past = time.time() - 1
+        for i in range(500):
+            self.dispatcher.schedule(f"t{i}", past, task("Low"))
+        self.dispatcher.tick()
+        for i in range(500):
+            self.dispatcher.cancel(f"t{i}")
+        self.assertLess(len(self.dispatcher.ready), 200)
+        self.assertEqual(self.drain(), ["high", "medium", "low"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import json
+import unittest
+
+from backend.binaryTree import BehaviorTree, json_input
+from backend.executor import DependencyExecutor
+
+DATA = json.loads(json_input)['scheduler']
+
+
+class DependencyExecutorTest(unittest.TestCase):
+
+    def test_runs_in_dependency_order(self):
+        ran = []
+        result = DependencyExecutor(DATA['tasks'], lambda task: ran.append(task['taskId']), max_workers=2).run()
+        self.assertEqual(ran, ['T001', 'T002', 'T003', 'T004'])
+        self.assertEqual(sorted(result.completed), ['T001', 'T002', 'T003', 'T004'])
+
+    def test_unknown_dependency(self):
+        with self.assertRaisesRegex(ValueError, 'T001'):
+            DependencyExecutor(DATA['tasks'][1:], lambda task: None)
+
+    def test_cycle(self):
+        tasks = [dict(DATA['tasks'][0], dependencies=['T004'])] + DATA['tasks'][1:]
+        with self.assertRaisesRegex(ValueError, 'cycle'):
+            DependencyExecutor(tasks, lambda task: None)
+
+
+class TreeExecuteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = BehaviorTree(DATA['tasks'], DATA['equipmentAvailability'])
+        self.ran = []
+
+    def execute(self, tasks):
+        return self.tree.execute(tasks, lambda task: self.ran.append(task['taskId']))
+
+    def test_dependency_outside_the_run_is_skipped(self):
+        result = self.execute(DATA['tasks'][1:])
+        self.assertEqual(self.ran, [])
+        self.assertEqual(result.skipped, ['T002', 'T003', 'T004'])
+
+    def test_dependency_already_done(self):
+        self.execute(DATA['tasks'][:1])
+        result = self.execute(DATA['tasks'][1:])
+        self.assertEqual(self.ran, ['T001', 'T002', 'T003', 'T004'])
+        self.assertEqual(result.skipped, [])
+
+    def test_dependency_removed_from_the_tree(self):
+        self.tree.remove('T002')
+        result = self.execute(DATA['tasks'])
+        self.assertEqual(self.ran, ['T001'])
+        self.assertEqual(result.skipped, ['T003', 'T004'])
+        self.assertTrue(self.tree.state.done & self.tree.state.task_bits['T001'])
+
+
+if __name__ == '__main__':
+    unittest.main()
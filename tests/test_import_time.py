@@ -0,0 +1,25 @@
+import os
+import unittest
+
+from backend.sola import HEAVY_MODULES, LIGHT_PATHS, measure_import
+
+# Cold import of the paths that must not load the solvers, each in a fresh
+# interpreter. SOLA_IMPORT_BUDGET_MS raises the budget on slow machines.
+#
+#   python -m unittest discover tests
+
+BUDGET_MS = float(os.environ.get('SOLA_IMPORT_BUDGET_MS', '250'))
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    def test_light_paths(self):
+        for name, statement in LIGHT_PATHS.items():
+            with self.subTest(path=name):
+                seconds, heavy = measure_import(statement)
+                self.assertEqual(heavy, [], f"{statement} loads {', '.join(heavy)} (none of {HEAVY_MODULES} allowed)")
+                self.assertLessEqual(seconds * 1000, BUDGET_MS, f"{statement} takes {seconds * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from backend.incremental import SchedulingSession
+
+
+def task(task_id, equip, start, end, dependencies=()):
+    return {"taskId": task_id, "taskName": task_id, "equipment": [equip], "dependencies": list(dependencies),
+            "startTime": f"2024-06-23T{start}:00Z", "endTime": f"2024-06-23T{end}:00Z"}
+
+
+def window(start, end):
+    return {"availableFrom": f"2024-06-23T{start}:00Z", "availableTo": f"2024-06-23T{end}:00Z"}
+
+
+class WarmBoundTest(unittest.TestCase):
+
+    def session(self, availability):
+        session = SchedulingSession(availability)
+        self.bounds = []
+        build = session._solver
+
+        def solver(bound, report):
+            self.bounds.append(bound)
+            return build(bound, report)
+        session._solver = solver
+        return session
+
+    def solve(self, session, tasks):
+        with redirect_stdout(io.StringIO()):
+            return session.solve(tasks)
+
+    def minutes(self, session, offset):
+        return offset * session.timebase.quantum // 60
+
+    def test_bound_reaches_the_solver(self):
+        session = self.session({"A": [window("08:00", "20:00")], "B": [window("08:00", "20:00")]})
+        tasks = [task("T1", "A", "09:00", "10:00"), task("T2", "B", "09:00", "09:30")]
+        self.assertTrue(self.solve(session, tasks))
+        self.assertEqual(self.bounds, [None])
+
+        # the old 60 min plan plus 30 min for T3 after it
+        solution = self.solve(session, tasks + [task("T3", "A", "09:00", "09:30")])
+        self.assertEqual(self.minutes(session, self.bounds[-1]), 90)
+        self.assertEqual(self.minutes(session, solution.horizon), 90)
+
+    def test_no_bound_across_a_gap(self):
+        # A is closed 10:15-10:45, right where T3 would follow the old plan
+        session = self.session({"A": [window("08:00", "10:15"), window("10:45", "20:00")]})
+        tasks = [task("T1", "A", "09:00", "10:00")]
+        self.solve(session, tasks)
+        solution = self.solve(session, tasks + [task("T3", "A", "09:00", "09:30")])
+        self.assertIsNone(self.bounds[-1])
+        self.assertEqual(self.minutes(session, solution.horizon), 135)
+
+    def test_improve_uses_the_bound(self):
+        session = self.session({"A": [window("08:00", "20:00")]})
+        tasks = [task("T1", "A", "09:00", "10:00")]
+        self.solve(session, tasks)
+        with redirect_stdout(io.StringIO()):
+            schedules = list(session.improve(tasks + [task("T3", "A", "09:00", "09:30", ["T1"])]))
+        self.assertEqual(self.minutes(session, self.bounds[-1]), 90)
+        self.assertTrue(session.optimal)
+        self.assertEqual(self.minutes(session, schedules[-1].horizon), 90)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+from backend.rolling import RollingScheduler
+from backend.timebase import to_epoch
+
+
+def task(task_id, start, end, equipment=("A",), dependencies=(), priority="Medium"):
+    return {"taskId": task_id, "taskName": task_id, "equipment": list(equipment), "dependencies": list(dependencies),
+            "startTime": f"2024-06-23T{start}:00Z", "endTime": f"2024-06-23T{end}:00Z", "priority": priority}
+
+
+def window(start, end):
+    return {"availableFrom": f"2024-06-23T{start}:00Z", "availableTo": f"2024-06-23T{end}:00Z"}
+
+
+NOW = to_epoch("2024-06-23T08:00:00Z")
+
+
+class ReplaceInsertTest(unittest.TestCase):
+
+    def setUp(self):
+        # A is open for two hours: room for T2's hour, not for three
+        self.rolling = RollingScheduler({"A": [window("09:00", "11:00")]})
+        self.rolling.load([task("T1", "09:00", "09:30"), task("T2", "09:30", "10:30", dependencies=["T1"])])
+        self.plan = dict(self.rolling.plan)
+
+    def test_replacement_that_does_not_fit_keeps_the_old_task(self):
+        with self.assertRaises(ValueError):
+            self.rolling.insert(task("T2", "09:30", "12:30", dependencies=["T1"]), now=NOW)
+        self.assertEqual(self.rolling.plan, self.plan)
+        self.assertEqual(self.rolling.tasks["T2"]["endTime"], "2024-06-23T10:30:00Z")
+        self.assertEqual(self.rolling.successors["T1"], {"T2"})
+        # and its slot is still taken
+        result = self.rolling.insert(task("T3", "09:00", "09:30"), now=NOW)
+        self.assertGreaterEqual(result.start, self.plan["T2"][1])
+
+    def test_replacement(self):
+        result = self.rolling.insert(task("T2", "10:00", "10:30", dependencies=["T1"]), now=NOW)
+        self.assertEqual(result.end - result.start, 30)
+        self.assertEqual(len(self.rolling.by_start), 2)
+        self.assertEqual([item[1] for item in self.rolling.timelines["A"].intervals.irange((-10 ** 9,))],
+                         ["T1", "T2"])
+
+
+class CycleTest(unittest.TestCase):
+
+    def test_insert_rejects_a_cycle(self):
+        rolling = RollingScheduler()
+        rolling.insert(task("T1", "09:00", "09:30", dependencies=["T2"]), now=NOW)
+        rolling.insert(task("T2", "09:00", "09:30", equipment=["B"], dependencies=["T3"]), now=NOW)
+        for looping in (task("T3", "09:00", "09:30", dependencies=["T1"]),
+                        task("T3", "09:00", "09:30", dependencies=["T3"])):
+            with self.assertRaises(ValueError):
+                rolling.insert(looping, now=NOW)
+        self.assertNotIn("T3", rolling.tasks)
+        self.assertEqual(len(rolling), 2)
+
+    def test_load_leaves_a_cycle_out(self):
+        rolling = RollingScheduler()
+        planned = rolling.load([task("T1", "09:00", "09:30", dependencies=["T2"]),
+                                task("T2", "09:00", "09:30", dependencies=["T1"]),
+                                task("T3", "09:00", "09:30")])
+        self.assertEqual(sorted(planned), ["T1", "T3"])
+        self.assertNotIn("T2", rolling.tasks)
+
+
+class ReleaseTest(unittest.TestCase):
+
+    def test_insert_and_load_plan_a_past_task_alike(self):
+        now = to_epoch("2024-06-23T12:00:00Z")
+        inserted = RollingScheduler()
+        inserted.insert(task("T1", "09:00", "09:30"), now=now)
+        loaded = RollingScheduler()
+        loaded.load([task("T1", "09:00", "09:30")], now=now)
+        self.assertEqual(inserted.to_epoch(inserted.plan["T1"][0]), now)
+        self.assertEqual(loaded.to_epoch(loaded.plan["T1"][0]), now)
+
+    def test_rebuild_keeps_the_release(self):
+        rolling = RollingScheduler()
+        rolling.load([task("T1", "09:00", "09:30")])
+        self.assertEqual(rolling.to_epoch(rolling.plan["T1"][0]), to_epoch("2024-06-23T09:00:00Z"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import time
+import unittest
+
+from backend import scheduler
+
+TASK = {"taskName": "Spin", "description": "d", "equipment": ["Centrifuge"], "assignedTo": "a", "priority": "Low",
+        "dependencies": []}
+
+
+class TaskRoutesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = scheduler.app.test_client()
+
+    def post(self, task_id, start, end, dependencies=(), path='/tasks'):
+        task = dict(TASK, taskId=task_id, startTime=start, endTime=end, dependencies=list(dependencies))
+        return self.client.post(path, json=[task] if path == '/tasks:batch' else task)
+
+    def test_cycle_is_rejected(self):
+        self.assertEqual(self.post('CYC1', "2030-01-01T09:00:00Z", "2030-01-01T10:00:00Z", ['CYC2']).status_code, 200)
+        response = self.post('CYC2', "2030-01-01T09:00:00Z", "2030-01-01T10:00:00Z", ['CYC1'])
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('CYC2', scheduler.store)
+        self.assertNotIn('CYC2', scheduler.rolling.tasks)
+
+    def test_past_task_is_planned_from_now_by_both_routes(self):
+        started = time.time()
+        self.post('PAST1', "2020-01-01T09:00:00Z", "2020-01-01T09:30:00Z")
+        self.post('PAST2', "2020-01-01T09:00:00Z", "2020-01-01T09:30:00Z", path='/tasks:batch')
+        for task_id in ('PAST1', 'PAST2'):
+            start = scheduler.rolling.to_epoch(scheduler.rolling.plan[task_id][0])
+            self.assertGreaterEqual(start, started - scheduler.rolling.quantum)
+
+    def test_snapshot_on_connect(self):
+        self.post('SNAP1', "2030-01-01T09:00:00Z", "2030-01-01T10:00:00Z")
+        client = scheduler.socketio.test_client(scheduler.app)
+        pages = [event['args'][0] for event in client.get_received() if event['name'] == 'tasks_snapshot']
+        client.disconnect()
+        self.assertEqual(pages[0]['seq'], scheduler.changes.seq)
+        self.assertIn('SNAP1', pages[0]['tasks'])
+
+
+if __name__ == '__main__':
+    unittest.main()
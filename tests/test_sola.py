@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from backend.workload import generate_instance
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SolveJsonTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.plan = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(handle, 'w') as f:
+            json.dump(generate_instance(12, num_equipment=4, seed=1), f)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.plan)
+
+    def solve(self, engine):
+        result = subprocess.run([sys.executable, '-m', 'backend', 'solve', self.plan, '--engine', engine,
+                                 '--budget', '2000', '--json'], cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout)
+
+    def test_json_output_parses(self):
+        for engine in ('heuristic', 'smt', 'components'):
+            with self.subTest(engine=engine):
+                schedule = self.solve(engine)
+                self.assertEqual(len(schedule), 12)
+                self.assertTrue(all(times['start'] < times['end'] for times in schedule.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
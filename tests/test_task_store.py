@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from backend.task_store import MemoryTaskStore, SQLiteTaskStore, TaskStore
+
+
+def record(start_hour, end_hour, equipment=("A",), assigned_to="Ann"):
+    return {"taskName": "t", "startTime": datetime(2024, 6, 23, start_hour, tzinfo=timezone.utc),
+            "endTime": datetime(2024, 6, 23, end_hour, tzinfo=timezone.utc), "equipment": list(equipment),
+            "assignedTo": assigned_to, "priority": "Low", "dependencies": []}
+
+
+def at(hour):
+    return datetime(2024, 6, 23, hour, tzinfo=timezone.utc)
+
+
+class MemoryTaskStoreTest(unittest.TestCase):
+
+    def make_store(self):
+        return MemoryTaskStore()
+
+    def setUp(self):
+        self.store = self.make_store()
+        self.store.add_many([("T1", record(9, 10)), ("T2", record(10, 12, ("B",), "Bob")),
+                             ("T3", record(13, 14, ("A", "B")))])
+
+    def test_query(self):
+        self.assertEqual(set(self.store.query(at(9), at(11))), {"T1", "T2"})
+        self.assertEqual(set(self.store.query(at(11), equipment="B")), {"T2", "T3"})
+        self.assertEqual(set(self.store.query(assigned_to="Bob")), {"T2"})
+        self.assertEqual(set(self.store.query(at(10), at(10))), set())
+
+    def test_replace_and_delete(self):
+        self.store.add("T1", record(15, 16, ("B",)))
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(set(self.store.query(equipment="A")), {"T3"})
+        self.assertTrue(self.store.delete("T1"))
+        self.assertFalse(self.store.delete("T1"))
+        self.assertNotIn("T1", self.store)
+        self.assertEqual(set(self.store.query(equipment="B")), {"T2", "T3"})
+
+    def test_repeated_id_in_one_batch(self):
+        self.store.add_many([("T4", record(9, 10, ("A",))), ("T4", record(9, 10, ("C",)))])
+        self.assertEqual(self.store.get("T4")["equipment"], ["C"])
+        self.assertNotIn("T4", self.store.query(equipment="A"))
+
+    def test_interface(self):
+        with self.assertRaises(TypeError):
+            TaskStore()
+
+
+class SQLiteTaskStoreTest(MemoryTaskStoreTest):
+
+    def make_store(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        return SQLiteTaskStore(self.path)
+
+    def tearDown(self):
+        self.store.db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_reopen(self):
+        self.store.db.close()
+        self.store = SQLiteTaskStore(self.path)
+        self.assertEqual(set(self.store.all()), {"T1", "T2", "T3"})
+        self.assertEqual(self.store.get("T2")["startTime"], at(10))
+
+
+if __name__ == '__main__':
+    unittest.main()
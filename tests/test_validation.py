@@ -0,0 +1,56 @@
+import unittest
+
+from backend.list_scheduler import list_schedule
+from backend.validation import validate_plan
+
+
+def task(task_id, equip, start, end, dependencies=()):
+    return {"taskId": task_id, "taskName": task_id, "equipment": [equip], "dependencies": list(dependencies),
+            "startTime": f"2024-06-23T{start}:00Z", "endTime": f"2024-06-23T{end}:00Z", "priority": "Medium"}
+
+
+def window(start, end):
+    return {"availableFrom": f"2024-06-23T{start}:00Z", "availableTo": f"2024-06-23T{end}:00Z"}
+
+
+AVAILABILITY = {"A": [window("08:00", "10:00"), window("11:00", "20:00")], "B": [window("08:00", "20:00")]}
+CHAIN = [task("T1", "A", "09:00", "10:00"), task("T2", "B", "09:00", "09:30", ["T1"]),
+         task("T3", "A", "09:00", "09:30", ["T2"])]
+
+
+class ValidatePlanTest(unittest.TestCase):
+
+    def test_ok(self):
+        report = validate_plan(CHAIN, AVAILABILITY)
+        self.assertTrue(report.ok, report.errors())
+        self.assertEqual(report.critical_path, ["T1", "T2", "T3"])
+        self.assertGreaterEqual(report.lower_bound * report.timebase.quantum // 60, 120)
+
+    def test_cycle(self):
+        tasks = [dict(CHAIN[0], dependencies=["T3"])] + CHAIN[1:]
+        report = validate_plan(tasks, AVAILABILITY)
+        self.assertFalse(report.ok)
+        self.assertEqual(sorted(report.cycles[0]), ["T1", "T2", "T3"])
+
+    def test_unknown_task_and_equipment(self):
+        report = validate_plan([task("T1", "C", "09:00", "10:00", ["T0"])], AVAILABILITY)
+        self.assertEqual(report.dangling, [("T1", "T0")])
+        self.assertEqual(report.missing_equipment, [("T1", "C")])
+
+
+class ListScheduleTest(unittest.TestCase):
+
+    def test_dependencies_and_windows(self):
+        schedule = list_schedule(CHAIN, AVAILABILITY)
+        minutes = {task_id: schedule.starts[task_id] * schedule.timebase.quantum // 60 for task_id in schedule.starts}
+        # T3 waits for T2, then for A to open again at 11:00
+        self.assertEqual(minutes, {"T1": 0, "T2": 60, "T3": 120})
+
+    def test_cycle(self):
+        tasks = [dict(CHAIN[0], dependencies=["T3"])] + CHAIN[1:]
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            list_schedule(tasks, AVAILABILITY)
+
+
+if __name__ == '__main__':
+    unittest.main()
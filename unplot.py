@@ -2,29 +2,27 @@
 import matplotlib.pyplot as plt
 import random
 
+from backend.live_plot import LivePlot
+
 plt.ion()  # turning interactive mode on
 
-# preparing the data
-y = [random.randint(1,10) for i in range(20)]
-x = [*range(1,21)]
+# rolling window of the last 200 samples, redrawn in place
+fig, ax = plt.subplots()
+plot = LivePlot(ax, capacity=200, ylim=(0, 10), color='g')
 
-# plotting the first frame
-graph = plt.plot(x,y)[0]
-plt.ylim(0,10)
+# preparing the data
+plot.extend(range(1, 21), [random.randint(1, 10) for i in range(20)])
+plt.show()
+plot.draw()
 plt.pause(1)
 
 # the update loop
+x = 20
 while(True):
     # updating the data
-    y.append(random.randint(1,10))
-    x.append(x[-1]+1)
-
-    # removing the older graph
-    graph.remove()
-
-    # plotting newer graph
-    graph = plt.plot(x,y,color = 'g')[0]
-    plt.xlim(x[0], x[-1])
+    x += 1
+    plot.append(x, random.randint(1, 10))
+    plot.draw()
 
     # calling pause function for 0.25 seconds
     plt.pause(0.25)